@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+# benchmarks/bench.py
+# Benchmarks for the /mcp dispatcher and every bundled tool.
+#
+# "dispatch/*" benchmarks drive handle_mcp_request through the Flask test client; "tool/*" benchmarks
+# call a tool's run() directly. ExifTool and Gemini are replaced by local stand-ins
+# (benchmarks/fake_exiftool.py and benchmarks/stubs/google/generativeai), so no network or binaries are needed.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench.py                         run everything and print a table
+#   python benchmarks/bench.py -k file_ -k exiftool    only benchmarks whose name contains one of these
+#   python benchmarks/bench.py --quick                 skip the huge-file cases
+#   python benchmarks/bench.py --save benchmarks/baselines/main.json
+#   python benchmarks/bench.py --compare benchmarks/baselines/main.json --threshold 0.2
+# --compare exits with status 1 if any benchmark's median got slower than the baseline by more than the threshold.
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+STUBS_DIR = os.path.join(BENCH_DIR, "stubs")
+FAKE_EXIFTOOL = os.path.join(BENCH_DIR, "fake_exiftool.py")
+
+BASELINE_VERSION = 1
+SMALL_BYTES = 4 * 1024
+LARGE_BYTES = 8 * 1024 * 1024
+HUGE_BYTES = 128 * 1024 * 1024
+WIDE_DIR_FILES = 10000
+SEARCH_TREE_FILES = 300
+IMAGE_FILES = 100
+
+# ---------- Registry ----------
+
+BENCHMARKS = []
+
+def bench(name, huge=False):
+    """
+    Registers a benchmark. The decorated function receives the Workspace, does any setup, and returns
+    a zero-argument callable to time. The callable's first result is checked with check_result().
+    """
+    def register(fn):
+        BENCHMARKS.append((name, fn, huge))
+        return fn
+    return register
+
+class BenchmarkError(Exception):
+    pass
+
+def check_result(result):
+    """
+    Fails the benchmark when the call didn't do what it was supposed to, so errors aren't timed as successes.
+    """
+    if hasattr(result, "status_code"):
+        if result.status_code != 200:
+            raise BenchmarkError(f"HTTP {result.status_code}: {result.get_data(as_text=True)[:300]}")
+        if result.is_streamed or result.mimetype != "application/json":
+            return
+        result = result.get_json()
+        if result.get("status") != "success":
+            raise BenchmarkError(json.dumps(result)[:300])
+        result = result["tool_response"]["output"]
+    if isinstance(result, dict):
+        if result.get("status") == "error" or result.get("ran_successfully") is False:
+            raise BenchmarkError(json.dumps(result, default=str)[:300])
+
+# ---------- Workspace ----------
+
+def _write_text(path, size):
+    line = "The quick brown fox jumps over the lazy dog 0123456789 lorem ipsum dolor sit amet\n"
+    with open(path, "w", encoding="utf-8") as f:
+        remaining = size
+        block = line * max(1, 65536 // len(line))
+        while remaining > 0:
+            chunk = block[:remaining]
+            f.write(chunk)
+            remaining -= len(chunk)
+    return path
+
+class Workspace:
+    """
+    Temporary files and directories for the benchmarks, plus the server loaded with the stand-ins.
+    """
+
+    def __init__(self, huge):
+        self.root = tempfile.mkdtemp(prefix="mcp-bench-")
+        self.huge = huge
+        self.files = {}
+        self.files["small"] = _write_text(os.path.join(self.root, "small.txt"), SMALL_BYTES)
+        self.files["large"] = _write_text(os.path.join(self.root, "large.txt"), LARGE_BYTES)
+        if huge:
+            self.files["huge"] = _write_text(os.path.join(self.root, "huge.txt"), HUGE_BYTES)
+        self.contents = {size: open(path, encoding="utf-8").read() for size, path in self.files.items()}
+        self.out_dir = os.path.join(self.root, "out")
+        os.makedirs(self.out_dir)
+
+        self.wide_dir = os.path.join(self.root, "wide")
+        os.makedirs(self.wide_dir)
+        for i in range(WIDE_DIR_FILES):
+            open(os.path.join(self.wide_dir, f"file_{i:05d}.txt"), "w").close()
+
+        self.search_dir = os.path.join(self.root, "search")
+        for i in range(SEARCH_TREE_FILES):
+            sub = os.path.join(self.search_dir, f"pkg_{i % 10}")
+            os.makedirs(sub, exist_ok=True)
+            with open(os.path.join(sub, f"module_{i}.py"), "w", encoding="utf-8") as f:
+                for j in range(200):
+                    f.write(f"def function_{i}_{j}(value):\n    return value * {j}  # needle_{i % 50}\n")
+
+        self.image_dir = os.path.join(self.root, "images")
+        os.makedirs(self.image_dir)
+        for i in range(IMAGE_FILES):
+            with open(os.path.join(self.image_dir, f"img_{i:03d}.jpg"), "wb") as f:
+                f.write(b"\xff\xd8\xff\xe0" + os.urandom(1024))
+
+        self.script = os.path.join(self.root, "script.py")
+        with open(self.script, "w", encoding="utf-8") as f:
+            f.write("print('hello from a script')\n")
+
+        self.index_dir = os.path.join(self.root, "index")
+        self.server = None
+
+    def load_server(self):
+        # Must run before mcp and the tools are imported: they read their settings at import time.
+        # Error-path benchmarks would otherwise flood the output with request records.
+        os.environ.setdefault("MCP_LOG_LEVEL", "ERROR")
+        os.environ["MCP_SEARCH_INDEX_DIR"] = self.index_dir
+        os.environ["EXIFTOOL_PATH"] = FAKE_EXIFTOOL
+        # Only ever seen by the stub; never use a real key here.
+        os.environ["GOOGLE_API_KEY"] = "benchmark-key"
+        sys.path.insert(0, STUBS_DIR)
+        sys.path.insert(0, REPO_ROOT)
+        os.chdir(REPO_ROOT)
+
+        import mcp
+        mcp.load_tools()
+        self.server = mcp
+        self.client = mcp.app.test_client()
+
+    def tool(self, name):
+        if name not in self.server.TOOL_MODULES:
+            raise BenchmarkError(f"Tool '{name}' did not load; see the server log.")
+        return self.server.TOOL_MODULES[name].run
+
+    def post(self, name, tool_input, **kwargs):
+        payload = {"model": "benchmark", "context": {"tool_request": {"name": name, "input": tool_input}}}
+        return self.client.post("/mcp", json=payload, **kwargs)
+
+    def cleanup(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+# ---------- Benchmarks: dispatcher ----------
+
+@bench("dispatch/hello_world")
+def _(ws):
+    return lambda: ws.post("hello_world", {})
+
+@bench("dispatch/unknown_tool")
+def _(ws):
+    def call():
+        response = ws.post("no_such_tool", {})
+        if response.status_code != 400:
+            raise BenchmarkError(f"expected HTTP 400, got {response.status_code}")
+    return call
+
+@bench("dispatch/meta_tool_inspector")
+def _(ws):
+    return lambda: ws.post("meta_tool_inspector", {})
+
+@bench("tool/meta_tool_inspector")
+def _(ws):
+    run = ws.tool("meta_tool_inspector")
+    return lambda: run({})
+
+@bench("dispatch/python_executor")
+def _(ws):
+    return lambda: ws.post("python_executor", {"code": "print(sum(range(1000)))"})
+
+@bench("tool/python_executor")
+def _(ws):
+    return lambda: ws.server.execute_python_code("print(sum(range(1000)))")
+
+@bench("tool/python_runner_tool")
+def _(ws):
+    run = ws.tool("python_runner_tool")
+    return lambda: run({"script_path": ws.script})
+
+@bench("dispatch/file_reader_large_gzip")
+def _(ws):
+    return lambda: ws.post("file_reader", {"filepath": ws.files["large"]}, headers={"Accept-Encoding": "gzip"})
+
+@bench("dispatch/file_reader_large_msgpack")
+def _(ws):
+    return lambda: ws.post("file_reader", {"filepath": ws.files["large"]}, headers={"Accept": "application/msgpack"})
+
+# ---------- Benchmarks: file readers and writers, per file size ----------
+
+def _register_size_benchmarks(size):
+    huge = size == "huge"
+
+    @bench(f"tool/file_reader_{size}", huge=huge)
+    def _(ws):
+        run = ws.tool("file_reader")
+        return lambda: run({"filepath": ws.files[size]})
+
+    @bench(f"tool/read_file_content_tool_{size}", huge=huge)
+    def _(ws):
+        run = ws.tool("read_file_content_tool")
+        return lambda: run({"path": ws.files[size]})
+
+    @bench(f"tool/file_writer_overwrite_{size}", huge=huge)
+    def _(ws):
+        run = ws.tool("file_writer")
+        target = os.path.join(ws.out_dir, f"overwrite_{size}.txt")
+        return lambda: run({"filepath": target, "content": ws.contents[size]})
+
+    @bench(f"tool/file_writer_patch_{size}", huge=huge)
+    def _(ws):
+        run = ws.tool("file_writer")
+        target = os.path.join(ws.out_dir, f"patch_{size}.txt")
+        shutil.copyfile(ws.files[size], target)
+        counter = [0]
+        def call():
+            counter[0] += 1
+            return run({"filepath": target, "mode": "patch",
+                        "edits": [{"start_line": 2, "end_line": 2, "replacement": f"edited {counter[0]}\n"}]})
+        return call
+
+    if not huge:
+        @bench(f"dispatch/file_reader_{size}")
+        def _(ws):
+            return lambda: ws.post("file_reader", {"filepath": ws.files[size]})
+
+        @bench(f"dispatch/file_writer_overwrite_{size}")
+        def _(ws):
+            target = os.path.join(ws.out_dir, f"dispatch_overwrite_{size}.txt")
+            return lambda: ws.post("file_writer", {"filepath": target, "content": ws.contents[size]})
+
+for _size in ("small", "large", "huge"):
+    _register_size_benchmarks(_size)
+
+@bench("tool/file_writer_append_small")
+def _(ws):
+    run = ws.tool("file_writer")
+    target = os.path.join(ws.out_dir, "append.txt")
+    return lambda: run({"filepath": target, "mode": "append", "content": "one more line\n"})
+
+@bench("tool/file_writer_batch_50_small")
+def _(ws):
+    run = ws.tool("file_writer")
+    files = [{"filepath": os.path.join(ws.out_dir, f"batch_{i}.txt"), "content": ws.contents["small"]} for i in range(50)]
+    return lambda: run({"files": files})
+
+@bench("tool/read_file_content_tool_glob")
+def _(ws):
+    run = ws.tool("read_file_content_tool")
+    return lambda: run({"path": os.path.join(ws.root, "sm*.txt")})
+
+# ---------- Benchmarks: directory listing and search ----------
+
+@bench("tool/list_files_in_path_wide")
+def _(ws):
+    run = ws.tool("list_files_in_path")
+    return lambda: run({"path": ws.wide_dir, "page_size": WIDE_DIR_FILES})
+
+@bench("tool/list_files_in_path_wide_stat")
+def _(ws):
+    run = ws.tool("list_files_in_path")
+    return lambda: run({"path": ws.wide_dir, "page_size": WIDE_DIR_FILES, "stat": True})
+
+@bench("tool/list_files_in_path_wide_paged")
+def _(ws):
+    run = ws.tool("list_files_in_path")
+    def call():
+        result = run({"path": ws.wide_dir, "page_size": 1000})
+        while result.get("has_more"):
+            result = run({"path": ws.wide_dir, "page_size": 1000, "cursor": result["next_cursor"]})
+        return result
+    return call
+
+@bench("tool/list_files_in_path_recursive_include")
+def _(ws):
+    run = ws.tool("list_files_in_path")
+    return lambda: run({"path": ws.root, "recursive": True, "include": ["*.py"], "page_size": 10000})
+
+@bench("tool/file_search_tool_indexed")
+def _(ws):
+    run = ws.tool("file_search_tool")
+    run({"path": ws.search_dir, "operation": "index"})
+    return lambda: run({"path": ws.search_dir, "query": "needle_42"})
+
+@bench("tool/file_search_tool_regex")
+def _(ws):
+    run = ws.tool("file_search_tool")
+    run({"path": ws.search_dir, "operation": "index"})
+    return lambda: run({"path": ws.search_dir, "query": r"function_1\d_7\(", "regex": True})
+
+# ---------- Benchmarks: exiftool (fake executable) ----------
+
+@bench("tool/exiftool_read_cached")
+def _(ws):
+    run = ws.tool("exiftool_interface")
+    path = os.path.join(ws.image_dir, "img_000.jpg")
+    return lambda: run({"operation": "read", "file_path": path})
+
+@bench("tool/exiftool_read_uncached")
+def _(ws):
+    run = ws.tool("exiftool_interface")
+    module = ws.server.TOOL_MODULES["exiftool_interface"]
+    path = os.path.join(ws.image_dir, "img_001.jpg")
+    def call():
+        module._cache_invalidate([path])
+        return run({"operation": "read", "file_path": path})
+    return call
+
+@bench("tool/exiftool_batch_read_100")
+def _(ws):
+    run = ws.tool("exiftool_interface")
+    module = ws.server.TOOL_MODULES["exiftool_interface"]
+    paths = [os.path.join(ws.image_dir, name) for name in sorted(os.listdir(ws.image_dir))]
+    def call():
+        module._cache_invalidate(paths)
+        return run({"operation": "read", "file_paths": paths})
+    return call
+
+@bench("tool/exiftool_write")
+def _(ws):
+    run = ws.tool("exiftool_interface")
+    path = os.path.join(ws.image_dir, "img_002.jpg")
+    return lambda: run({"operation": "write", "file_path": path, "metadata_to_write": {"Artist": "Benchmark"}})
+
+# ---------- Benchmarks: Gemini tools (local stub) ----------
+
+@bench("tool/gemini_query_tool")
+def _(ws):
+    run = ws.tool("gemini_query_tool")
+    return lambda: run({"question": "What is the capital of France?"})
+
+@bench("tool/gemini_code_generator")
+def _(ws):
+    run = ws.tool("gemini_code_generator")
+    return lambda: run({"prompt": "Write python code that prints hello"})
+
+@bench("tool/joke_generator_tool")
+def _(ws):
+    run = ws.tool("joke_generator_tool")
+    return lambda: run({})
+
+@bench("dispatch/gemini_query_tool")
+def _(ws):
+    return lambda: ws.post("gemini_query_tool", {"question": "What is the capital of France?"})
+
+# ---------- Timing ----------
+
+def measure(func, min_sample_seconds, repeat, max_seconds):
+    """
+    Times func and returns per-call statistics in milliseconds. Each sample runs func enough times to
+    take at least min_sample_seconds; sampling stops after `repeat` samples or max_seconds (minimum 3 samples).
+    """
+    check_result(func())
+
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_sample_seconds or number >= 1_000_000:
+            break
+        number = min(number * 10, max(number * 2, int(number * min_sample_seconds / max(elapsed, 1e-9)) + 1))
+
+    samples = [elapsed / number]
+    deadline = time.perf_counter() + max_seconds
+    while len(samples) < repeat and (len(samples) < 3 or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - started) / number)
+
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "median_ms": round(statistics.median(ms), 4),
+        "min_ms": round(ms[0], 4),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "stdev_ms": round(statistics.stdev(ms), 4) if len(ms) > 1 else 0.0,
+        "p95_ms": round(ms[min(len(ms) - 1, int(round(0.95 * (len(ms) - 1))))], 4),
+        "ops_per_sec": round(1000 / statistics.median(ms), 2) if ms[0] > 0 else None,
+        "samples": len(ms),
+        "calls_per_sample": number,
+    }
+
+def run_benchmarks(ws, selected, args):
+    results = {}
+    for name, setup, _ in selected:
+        try:
+            func = setup(ws)
+            results[name] = measure(func, args.min_sample_seconds, args.repeat, args.max_seconds)
+            print(f"  {name:<48} {results[name]['median_ms']:>12.4f} ms", flush=True)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"  {name:<48} ERROR {results[name]['error']}", flush=True)
+    return results
+
+# ---------- Baselines ----------
+
+def _git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def build_report(results, args):
+    return {
+        "version": BASELINE_VERSION,
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "huge": not args.quick,
+        },
+        "results": results,
+    }
+
+def load_baseline(path):
+    with open(path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    if report.get("version") != BASELINE_VERSION or "results" not in report:
+        raise SystemExit(f"{path} is not a version {BASELINE_VERSION} benchmark baseline.")
+    return report
+
+def compare(results, baseline, threshold):
+    """
+    Returns (rows, regressions) comparing median times; a ratio above 1 + threshold is a regression.
+    """
+    rows, regressions = [], []
+    for name in sorted(set(results) | set(baseline)):
+        current, base = results.get(name), baseline.get(name)
+        if current is None or base is None:
+            rows.append((name, None, None, None, "new" if base is None else "not run"))
+            continue
+        if "error" in current or "error" in base:
+            rows.append((name, base.get("median_ms"), current.get("median_ms"), None, "error"))
+            continue
+        ratio = current["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+        verdict = "ok"
+        if ratio > 1 + threshold:
+            verdict = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            verdict = "improved"
+        rows.append((name, base["median_ms"], current["median_ms"], ratio, verdict))
+    return rows, regressions
+
+def print_comparison(rows):
+    print(f"\n{'benchmark':<48} {'baseline ms':>12} {'current ms':>12} {'ratio':>8}  verdict")
+    for name, base, current, ratio, verdict in rows:
+        fmt = lambda v: f"{v:>12.4f}" if isinstance(v, (int, float)) else f"{'-':>12}"
+        ratio_text = f"{ratio:>8.2f}" if ratio is not None else f"{'-':>8}"
+        print(f"{name:<48} {fmt(base)} {fmt(current)} {ratio_text}  {verdict}")
+
+# ---------- CLI ----------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the /mcp dispatcher and bundled tools.")
+    parser.add_argument("-k", dest="filters", action="append", default=[], help="Only run benchmarks whose name contains this text (repeatable).")
+    parser.add_argument("--list", action="store_true", help="List benchmark names and exit.")
+    parser.add_argument("--quick", action="store_true", help=f"Skip the huge ({HUGE_BYTES // (1024 * 1024)} MiB) file cases.")
+    parser.add_argument("--repeat", type=int, default=15, help="Samples per benchmark (default 15).")
+    parser.add_argument("--min-sample-seconds", type=float, default=0.05, help="Minimum duration of one sample (default 0.05).")
+    parser.add_argument("--max-seconds", type=float, default=5.0, help="Stop sampling a benchmark after this long, once it has 3 samples (default 5).")
+    parser.add_argument("--save", metavar="PATH", help="Write the results as a JSON baseline.")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against a saved baseline; exit 1 on regressions.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before --compare reports a regression (default 0.2 = 20%%).")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    selected = [b for b in BENCHMARKS if (not args.filters or any(f in b[0] for f in args.filters)) and not (args.quick and b[2])]
+    if args.list:
+        for name, _, huge in selected:
+            print(name + ("  (huge)" if huge else ""))
+        return 0
+    if not selected:
+        print("No benchmarks match.", file=sys.stderr)
+        return 2
+
+    baseline = load_baseline(args.compare) if args.compare else None
+    ws = Workspace(huge=any(b[2] for b in selected))
+    try:
+        ws.load_server()
+        print(f"Running {len(selected)} benchmarks (workspace {ws.root})")
+        results = run_benchmarks(ws, selected, args)
+    finally:
+        ws.cleanup()
+
+    report = build_report(results, args)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"\nSaved baseline to {args.save}")
+
+    if baseline is not None:
+        # Benchmarks filtered out of this run aren't "missing".
+        selected_names = {b[0] for b in selected}
+        base_results = {name: r for name, r in baseline["results"].items() if name in selected_names}
+        rows, regressions = compare(results, base_results, args.threshold)
+        print_comparison(rows)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
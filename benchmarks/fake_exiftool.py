@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# benchmarks/fake_exiftool.py
+# A stand-in for the exiftool executable, for benchmarks and load tests.
+#
+# Speaks the parts of the ExifTool command line that tools/exiftool_interface.py uses:
+# -ver, -json reads, -TAG=VALUE writes, and the -stay_open True -@ - protocol (-echo4, -executeN).
+# FAKE_EXIFTOOL_LATENCY (seconds, default 0) is added to every command; FAKE_EXIFTOOL_JITTER adds
+# up to that many seconds more at random.
+
+import os
+import sys
+import json
+import time
+import random
+
+VERSION = "12.70"
+LATENCY = float(os.environ.get("FAKE_EXIFTOOL_LATENCY", "0"))
+JITTER = float(os.environ.get("FAKE_EXIFTOOL_JITTER", "0"))
+
+def _metadata(path):
+    st = os.stat(path)
+    return {
+        "SourceFile": path,
+        "FileName": os.path.basename(path),
+        "Directory": os.path.dirname(path),
+        "FileSize": st.st_size,
+        "FileModifyDate": time.strftime("%Y:%m:%d %H:%M:%S", time.localtime(st.st_mtime)),
+        "MIMEType": "image/jpeg",
+        "ImageWidth": 4032,
+        "ImageHeight": 3024,
+        "Make": "FakeCam",
+        "Model": "Benchmark 1",
+    }
+
+def process(args):
+    """
+    Runs one command and returns (stdout, stderr, exit_code).
+    """
+    if "-ver" in args:
+        return VERSION + "\n", "", 0
+    if LATENCY or JITTER:
+        time.sleep(LATENCY + random.random() * JITTER)
+
+    files = [a for a in args if not a.startswith("-")]
+    writes = [a for a in args if a.startswith("-") and "=" in a]
+    missing = [f for f in files if not os.path.exists(f)]
+    stderr = "".join(f"Error: File not found - {f}\n" for f in missing)
+    present = [f for f in files if f not in missing]
+
+    if writes:
+        for f in present:
+            os.utime(f)
+        return f"    {len(present)} image files updated\n", stderr, 1 if missing else 0
+    return json.dumps([_metadata(f) for f in present]) + "\n", stderr, 1 if missing else 0
+
+def stay_open():
+    args, echo = [], None
+    for line in sys.stdin:
+        arg = line.rstrip("\r\n")
+        if arg.startswith("-execute"):
+            number = arg[len("-execute"):]
+            stdout, stderr, _ = process(args)
+            sys.stdout.write(stdout + "{ready%s}\n" % number)
+            sys.stdout.flush()
+            sys.stderr.write(stderr + (echo + "\n" if echo else ""))
+            sys.stderr.flush()
+            args, echo = [], None
+        elif args and args[-1] == "-echo4":
+            args.pop()
+            echo = arg
+        elif arg == "-stay_open":
+            continue
+        elif arg == "False":
+            break
+        else:
+            args.append(arg)
+
+if __name__ == "__main__":
+    argv = sys.argv[1:]
+    if argv[:2] == ["-stay_open", "True"]:
+        stay_open()
+    else:
+        stdout, stderr, code = process(argv)
+        sys.stdout.write(stdout)
+        sys.stderr.write(stderr)
+        sys.exit(code)
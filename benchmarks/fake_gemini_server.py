@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# benchmarks/fake_gemini_server.py
+# A local HTTP stand-in for the Gemini generateContent endpoint, for load tests.
+#
+# The google.generativeai stub in benchmarks/stubs calls it when FAKE_GEMINI_URL is set, so Gemini tool
+# calls pay a real HTTP round trip with tunable latency, jitter and error rate.
+#
+#   python benchmarks/fake_gemini_server.py --port 8765 --latency 0.4 --jitter 0.2 --error-rate 0.01
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        config = self.server.config
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send(400, {"error": {"code": 400, "message": "Invalid JSON payload."}})
+
+        if not self.path.endswith(":generateContent"):
+            return self._send(404, {"error": {"code": 404, "message": f"Unknown path {self.path}"}})
+
+        delay = config["latency"] + random.random() * config["jitter"]
+        if delay:
+            time.sleep(delay)
+        with self.server.lock:
+            self.server.requests += 1
+        if random.random() < config["error_rate"]:
+            return self._send(503, {"error": {"code": 503, "message": "The model is overloaded. Please try again later."}})
+
+        prompt = " ".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        text = "```python\nprint('hello from the fake endpoint')\n```" if "code" in prompt.lower() else f"Fake answer to: {prompt[:80]}"
+        self._send(200, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": len(prompt.split()), "candidatesTokenCount": len(text.split())},
+        })
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Per-request access logs would dominate a load test's output.
+        pass
+
+def start(host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0):
+    """
+    Starts the fake endpoint in a background thread and returns the server; its URL is server.url.
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.config = {"latency": latency, "jitter": jitter, "error_rate": error_rate}
+    server.requests = 0
+    server.lock = threading.Lock()
+    server.url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Gemini generateContent endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra seconds, at random.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 503.")
+    args = parser.parse_args()
+    server = start(args.host, args.port, args.latency, args.jitter, args.error_rate)
+    print(f"Fake Gemini endpoint listening on {server.url} (set FAKE_GEMINI_URL={server.url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+# benchmarks/loadtest.py
+# Concurrent load generator for a /mcp server, with local stand-ins for external services.
+#
+# By default it starts its own server (mcp.py, threaded) wired to:
+#   - benchmarks/fake_exiftool.py with tunable latency (--exiftool-latency/--exiftool-jitter)
+#   - benchmarks/fake_gemini_server.py over HTTP (--gemini-latency/--gemini-jitter/--gemini-error-rate)
+# and replays a weighted mix of tool calls against it. It reports throughput, latency percentiles,
+# error rates and server RSS over time.
+#
+# Usage (from the repository root):
+#   python benchmarks/loadtest.py --mix default --concurrency 8 --duration 30
+#   python benchmarks/loadtest.py --concurrency 1,2,4,8,16,32 --duration 15     concurrency sweep, finds the knee
+#   python benchmarks/loadtest.py --rate 200 --concurrency 64                    open loop at 200 req/s
+#   python benchmarks/loadtest.py --url http://host:5000 --server-pid 1234       an already running server
+#   python benchmarks/loadtest.py --mix my_mix.json --json results.json
+#
+# A mix file is a JSON list of {"name", "tool", "input", "weight"}. Strings in "input" may use the
+# workspace placeholders {root} {small} {large} {wide} {images} {image} {search} {script} {out}.
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+import urllib.parse
+
+from bench import Workspace, REPO_ROOT, STUBS_DIR, FAKE_EXIFTOOL
+import fake_gemini_server
+
+SATURATION_GAIN = 0.10
+
+# ---------- Tool mixes ----------
+
+MIXES = {
+    "default": [
+        {"name": "hello_world", "tool": "hello_world", "input": {}, "weight": 15},
+        {"name": "python_executor", "tool": "python_executor", "input": {"code": "print(sum(range(10000)))"}, "weight": 10},
+        {"name": "file_reader_small", "tool": "file_reader", "input": {"filepath": "{small}"}, "weight": 15},
+        {"name": "read_file_content_glob", "tool": "read_file_content_tool", "input": {"path": "{root}/sm*.txt"}, "weight": 10},
+        {"name": "file_writer_small", "tool": "file_writer", "input": {"filepath": "{out}/load.txt", "content": "hello\n" * 100}, "weight": 5},
+        {"name": "list_files_page", "tool": "list_files_in_path", "input": {"path": "{wide}", "page_size": 200}, "weight": 10},
+        {"name": "file_search", "tool": "file_search_tool", "input": {"path": "{search}", "query": "needle_7"}, "weight": 5},
+        {"name": "exiftool_read", "tool": "exiftool_interface", "input": {"operation": "read", "file_path": "{image}"}, "weight": 10},
+        {"name": "exiftool_write", "tool": "exiftool_interface", "input": {"operation": "write", "file_path": "{image}", "metadata_to_write": {"Artist": "load"}}, "weight": 5},
+        {"name": "gemini_query", "tool": "gemini_query_tool", "input": {"question": "What is the capital of France?"}, "weight": 10},
+        {"name": "gemini_code", "tool": "gemini_code_generator", "input": {"prompt": "Write python code that prints hello"}, "weight": 5},
+    ],
+    "light": [
+        {"name": "hello_world", "tool": "hello_world", "input": {}, "weight": 1},
+    ],
+    "io": [
+        {"name": "file_reader_small", "tool": "file_reader", "input": {"filepath": "{small}"}, "weight": 30},
+        {"name": "file_reader_large", "tool": "file_reader", "input": {"filepath": "{large}"}, "weight": 5},
+        {"name": "file_writer_small", "tool": "file_writer", "input": {"filepath": "{out}/load.txt", "content": "hello\n" * 100}, "weight": 20},
+        {"name": "list_files_page", "tool": "list_files_in_path", "input": {"path": "{wide}", "page_size": 1000}, "weight": 15},
+        {"name": "exiftool_batch", "tool": "exiftool_interface", "input": {"operation": "read", "file_path": "{images}/*.jpg", "batch": True}, "weight": 10},
+        {"name": "file_search", "tool": "file_search_tool", "input": {"path": "{search}", "query": "function_3_1"}, "weight": 20},
+    ],
+    "external": [
+        {"name": "gemini_query", "tool": "gemini_query_tool", "input": {"question": "What is the capital of France?"}, "weight": 40},
+        {"name": "gemini_code", "tool": "gemini_code_generator", "input": {"prompt": "Write python code that prints hello"}, "weight": 20},
+        {"name": "joke", "tool": "joke_generator_tool", "input": {}, "weight": 10},
+        {"name": "exiftool_read", "tool": "exiftool_interface", "input": {"operation": "read", "file_path": "{image}"}, "weight": 30},
+    ],
+}
+
+def load_mix(spec):
+    if spec in MIXES:
+        return MIXES[spec]
+    with open(spec, "r", encoding="utf-8") as f:
+        mix = json.load(f)
+    if not isinstance(mix, list) or not all(isinstance(e, dict) and "tool" in e for e in mix):
+        raise SystemExit(f"{spec}: a mix must be a JSON list of {{\"name\", \"tool\", \"input\", \"weight\"}} objects.")
+    return mix
+
+def _fill(value, placeholders):
+    if isinstance(value, str):
+        for key, replacement in placeholders.items():
+            value = value.replace("{" + key + "}", replacement)
+        return value
+    if isinstance(value, dict):
+        return {k: _fill(v, placeholders) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, placeholders) for v in value]
+    return value
+
+def prepare_mix(mix, ws):
+    placeholders = {
+        "root": ws.root, "small": ws.files["small"], "large": ws.files["large"], "wide": ws.wide_dir,
+        "images": ws.image_dir, "image": os.path.join(ws.image_dir, "img_000.jpg"), "search": ws.search_dir,
+        "script": ws.script, "out": ws.out_dir,
+    }
+    entries = []
+    for entry in mix:
+        payload = {"model": "loadtest", "context": {"tool_request": {"name": entry["tool"], "input": _fill(entry.get("input", {}), placeholders)}}}
+        entries.append((entry.get("name", entry["tool"]), json.dumps(payload).encode("utf-8"), float(entry.get("weight", 1))))
+    return entries
+
+# ---------- Server under test ----------
+
+_SERVER_BOOTSTRAP = (
+    "import sys, mcp\n"
+    "mcp.load_tools()\n"
+    "mcp.app.run(host=sys.argv[1], port=int(sys.argv[2]), threaded=True, debug=False, use_reloader=False)\n"
+)
+
+def _free_port(host):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+def start_server(ws, args, gemini_url):
+    host = "127.0.0.1"
+    port = _free_port(host)
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": os.pathsep.join([STUBS_DIR, REPO_ROOT, env.get("PYTHONPATH", "")]).rstrip(os.pathsep),
+        "EXIFTOOL_PATH": FAKE_EXIFTOOL,
+        "FAKE_EXIFTOOL_LATENCY": str(args.exiftool_latency),
+        "FAKE_EXIFTOOL_JITTER": str(args.exiftool_jitter),
+        "FAKE_GEMINI_URL": gemini_url,
+        "GOOGLE_API_KEY": "loadtest-key",
+        "MCP_SEARCH_INDEX_DIR": ws.index_dir,
+    })
+    log_path = os.path.join(tempfile.gettempdir(), f"mcp-loadtest-server-{os.getpid()}.log")
+    log = open(log_path, "wb")
+    proc = subprocess.Popen([sys.executable, "-c", _SERVER_BOOTSTRAP, host, str(port)], cwd=REPO_ROOT, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://{host}:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"Server exited with status {proc.returncode}; see {log_path}")
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request("GET", "/metrics")
+            if conn.getresponse().status == 200:
+                conn.close()
+                print(f"Server {url} (pid {proc.pid}), log: {log_path}")
+                return proc, url
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise SystemExit(f"Server did not come up within 60s; see {log_path}")
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+# ---------- RSS sampling ----------
+
+def read_rss(pid):
+    """
+    Resident set size of pid in bytes, or None if it can't be read.
+    """
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        out = subprocess.run(["ps", "-o", "rss=", "-p", str(pid)], capture_output=True, text=True, timeout=5)
+        return int(out.stdout.strip()) * 1024
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid, interval):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+        self.started_at = time.monotonic()
+
+    def run(self):
+        while not self.stopped.is_set():
+            rss = read_rss(self.pid)
+            if rss is not None:
+                self.samples.append((round(time.monotonic() - self.started_at, 3), rss))
+            self.stopped.wait(self.interval)
+
+    def window(self, start, end):
+        return [rss for t, rss in self.samples if start - self.started_at <= t <= end - self.started_at]
+
+# ---------- Load generation ----------
+
+class Pacer:
+    """
+    Hands out request start times. With a rate, starts are spaced evenly (open loop) and latency is
+    measured from the scheduled start, so a stalled server can't hide its queueing delay.
+    """
+
+    def __init__(self, rate, start):
+        self.interval = 1.0 / rate if rate else None
+        self.next = start
+        self.lock = threading.Lock()
+
+    def next_start(self):
+        if self.interval is None:
+            return time.monotonic()
+        with self.lock:
+            scheduled = self.next
+            self.next += self.interval
+        delay = scheduled - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return scheduled
+
+def _classify(status, body):
+    if status != 200:
+        return f"http_{status}"
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return "bad_json"
+    output = (payload.get("tool_response") or {}).get("output")
+    if payload.get("status") != "success":
+        return "server_error"
+    if isinstance(output, dict) and (output.get("status") == "error" or output.get("ran_successfully") is False):
+        return "tool_error"
+    return None
+
+def _worker(url, entries, pacer, stop_at, records, lock, timeout, rng):
+    parsed = urllib.parse.urlsplit(url)
+    path = (parsed.path.rstrip("/") or "") + "/mcp"
+    names = [e[0] for e in entries]
+    bodies = {e[0]: e[1] for e in entries}
+    weights = [e[2] for e in entries]
+    conn = None
+    local = []
+    while True:
+        scheduled = pacer.next_start()
+        if scheduled >= stop_at:
+            break
+        name = rng.choices(names, weights)[0]
+        error = None
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=timeout)
+            conn.request("POST", path, body=bodies[name], headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            error = _classify(response.status, response.read())
+            if response.getheader("Connection", "").lower() == "close" or response.version == 10:
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException) as e:
+            error = f"connection_{type(e).__name__}"
+            if conn is not None:
+                conn.close()
+            conn = None
+        local.append((name, scheduled, time.monotonic(), error))
+    if conn is not None:
+        conn.close()
+    with lock:
+        records.extend(local)
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+def summarize(records, measure_start, measure_end):
+    kept = [r for r in records if r[1] >= measure_start]
+    elapsed = max(measure_end - measure_start, 1e-9)
+    latencies = sorted((end - start) * 1000 for _, start, end, _ in kept)
+    errors = [r for r in kept if r[3]]
+    by_tool = {}
+    for name, start, end, error in kept:
+        stats = by_tool.setdefault(name, {"requests": 0, "errors": 0, "latencies": []})
+        stats["requests"] += 1
+        stats["errors"] += 1 if error else 0
+        stats["latencies"].append((end - start) * 1000)
+    for stats in by_tool.values():
+        lat = sorted(stats.pop("latencies"))
+        stats["p50_ms"] = round(_percentile(lat, 0.50), 3)
+        stats["p99_ms"] = round(_percentile(lat, 0.99), 3)
+    error_kinds = {}
+    for name, _, _, error in errors:
+        key = f"{name}:{error}"
+        error_kinds[key] = error_kinds.get(key, 0) + 1
+    return {
+        "requests": len(kept),
+        "throughput_rps": round(len(kept) / elapsed, 2),
+        "error_rate": round(len(errors) / len(kept), 4) if kept else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.50), 3) if latencies else None,
+        "p90_ms": round(_percentile(latencies, 0.90), 3) if latencies else None,
+        "p99_ms": round(_percentile(latencies, 0.99), 3) if latencies else None,
+        "max_ms": round(latencies[-1], 3) if latencies else None,
+        "errors": error_kinds,
+        "tools": by_tool,
+    }
+
+def run_step(url, entries, concurrency, args, rss):
+    start = time.monotonic()
+    measure_start = start + args.warmup
+    stop_at = measure_start + args.duration
+    pacer = Pacer(args.rate, start)
+    records, lock = [], threading.Lock()
+    seed = random.Random(args.seed)
+    threads = [
+        threading.Thread(target=_worker, args=(url, entries, pacer, stop_at, records, lock, args.timeout, random.Random(seed.random())), daemon=True)
+        for _ in range(concurrency)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Requests still in flight at stop_at finish late; count throughput until the last one ended.
+    measure_end = max([stop_at] + [r[2] for r in records])
+    result = summarize(records, measure_start, measure_end)
+    result["concurrency"] = concurrency
+    if rss is not None:
+        window = rss.window(measure_start, measure_end)
+        if window:
+            result["rss_mib"] = {"start": round(window[0] / 2**20, 1), "peak": round(max(window) / 2**20, 1), "end": round(window[-1] / 2**20, 1)}
+    return result
+
+# ---------- Reporting ----------
+
+def find_knee(steps):
+    """
+    The concurrency after which adding more concurrent requests stops buying SATURATION_GAIN more throughput.
+    """
+    for previous, current in zip(steps, steps[1:]):
+        if previous["throughput_rps"] and current["throughput_rps"] < previous["throughput_rps"] * (1 + SATURATION_GAIN):
+            return previous
+    return None
+
+def print_table(steps):
+    print(f"\n{'conc':>5} {'requests':>9} {'rps':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7} {'rss MiB (start/peak/end)':>26}")
+    for s in steps:
+        fmt = lambda v: f"{v:>9.2f}" if v is not None else f"{'-':>9}"
+        rss = s.get("rss_mib")
+        rss_text = f"{rss['start']}/{rss['peak']}/{rss['end']}" if rss else "-"
+        print(f"{s['concurrency']:>5} {s['requests']:>9} {s['throughput_rps']:>9.1f} {fmt(s['p50_ms'])} {fmt(s['p90_ms'])} "
+              f"{fmt(s['p99_ms'])} {fmt(s['max_ms'])} {s['error_rate']:>7.2%} {rss_text:>26}")
+        for kind, count in sorted(s["errors"].items(), key=lambda kv: -kv[1])[:5]:
+            print(f"{'':>5}   {count} x {kind}")
+
+# ---------- CLI ----------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test a /mcp server with a weighted tool mix.")
+    parser.add_argument("--mix", default="default", help=f"Built-in mix ({', '.join(MIXES)}) or a JSON mix file.")
+    parser.add_argument("--concurrency", default="8", help="Concurrent clients, or a comma-separated list to sweep (e.g. 1,2,4,8,16).")
+    parser.add_argument("--rate", type=float, help="Target total requests/s (open loop). Default: closed loop, as fast as the clients can go.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds per step (default 20).")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before each step (default 3).")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds.")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the tool mix.")
+    parser.add_argument("--url", help="Target an already running server instead of starting one.")
+    parser.add_argument("--server-pid", type=int, help="With --url: pid of the server, for RSS sampling.")
+    parser.add_argument("--rss-interval", type=float, default=0.5, help="Seconds between RSS samples.")
+    parser.add_argument("--exiftool-latency", type=float, default=0.005, help="Seconds the fake exiftool spends per command.")
+    parser.add_argument("--exiftool-jitter", type=float, default=0.0, help="Extra random seconds per exiftool command.")
+    parser.add_argument("--gemini-latency", type=float, default=0.3, help="Seconds the fake Gemini endpoint spends per request.")
+    parser.add_argument("--gemini-jitter", type=float, default=0.2, help="Extra random seconds per Gemini request.")
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0, help="Fraction of Gemini requests that fail with HTTP 503.")
+    parser.add_argument("--json", metavar="PATH", help="Write all results, including the RSS time series, as JSON.")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    levels = [int(c) for c in str(args.concurrency).split(",") if c.strip()]
+    if not levels or any(c < 1 for c in levels):
+        raise SystemExit("--concurrency needs positive integers.")
+
+    mix = load_mix(args.mix)
+    ws = Workspace(huge=False)
+    proc = gemini = None
+    try:
+        if args.url:
+            url, pid = args.url, args.server_pid
+        else:
+            gemini = fake_gemini_server.start(latency=args.gemini_latency, jitter=args.gemini_jitter, error_rate=args.gemini_error_rate)
+            proc, url = start_server(ws, args, gemini.url)
+            pid = proc.pid
+        entries = prepare_mix(mix, ws)
+        rss = RssSampler(pid, args.rss_interval) if pid else None
+        if rss is not None:
+            rss.start()
+
+        steps = []
+        for concurrency in levels:
+            mode = f"{args.rate:g} req/s" if args.rate else "closed loop"
+            print(f"Running concurrency {concurrency} ({mode}) for {args.warmup:g}s warmup + {args.duration:g}s ...", flush=True)
+            steps.append(run_step(url, entries, concurrency, args, rss))
+
+        if rss is not None:
+            rss.stopped.set()
+    finally:
+        if proc is not None:
+            stop_server(proc)
+        if gemini is not None:
+            gemini.shutdown()
+        ws.cleanup()
+
+    print_table(steps)
+    knee = find_knee(steps) if len(steps) > 1 else None
+    if knee is not None:
+        print(f"\nThroughput saturates at about {knee['concurrency']} concurrent requests ({knee['throughput_rps']:.1f} req/s, p99 {knee['p99_ms']:.1f} ms).")
+    elif len(steps) > 1:
+        print("\nNo saturation knee found; throughput was still growing at the highest concurrency.")
+
+    if args.json:
+        report = {
+            "mix": args.mix,
+            "rate": args.rate,
+            "duration": args.duration,
+            "steps": steps,
+            "knee_concurrency": knee["concurrency"] if knee else None,
+            "rss_samples": rss.samples if rss is not None else [],
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.json}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
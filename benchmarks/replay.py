@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# benchmarks/replay.py
+# Replays captured /mcp traffic (see MCP_CAPTURE_PATH in mcp_capture.py) against a server and reports
+# how results and latencies differ from the capture.
+#
+# Usage (from the repository root):
+#   python benchmarks/replay.py capture.jsonl capture.jsonl.1.gz --url http://127.0.0.1:5000
+#   python benchmarks/replay.py capture.jsonl --url http://127.0.0.1:5000 --speed 4      4x faster than captured
+#   python benchmarks/replay.py capture.jsonl --url http://127.0.0.1:5000 --fast         back to back
+#   python benchmarks/replay.py capture.jsonl --url ... --tool file_reader --json report.json --fail-on-diff
+#
+# For each call it compares the HTTP status, the tool's own status and the SHA-256 of its output, and
+# compares the server-side duration (Server-Timing "total") with the captured one. Records whose input
+# was redacted or truncated at capture time are skipped unless --include-modified is given, since they
+# can't reproduce the original call.
+
+import sys
+import gzip
+import json
+import time
+import hashlib
+import argparse
+import threading
+import http.client
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+CAPTURE_VERSION = 1
+
+# ---------- Capture files ----------
+
+def _open(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+def load_capture(paths, tools=None, include_modified=False):
+    """
+    Reads capture files (plain or gzip-compressed) and returns (records sorted by time, skipped counts).
+    """
+    records = []
+    skipped = {"unreadable": 0, "version": 0, "modified": 0, "filtered": 0}
+    for path in paths:
+        with _open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    skipped["unreadable"] += 1
+                    continue
+                if entry.get("v") != CAPTURE_VERSION:
+                    skipped["version"] += 1
+                elif tools and entry.get("tool") not in tools:
+                    skipped["filtered"] += 1
+                elif entry.get("modified") and not include_modified:
+                    skipped["modified"] += 1
+                else:
+                    records.append(entry)
+    records.sort(key=lambda e: e["ts"])
+    return records, skipped
+
+# ---------- Replaying ----------
+
+def output_digest(output):
+    # Same canonical form as mcp_capture.output_digest, applied to the decoded JSON response.
+    canonical = json.dumps(output, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def _output_status(output):
+    if isinstance(output, dict):
+        if "status" in output:
+            return output.get("status")
+        if "ran_successfully" in output:
+            return "success" if output["ran_successfully"] else "error"
+    return None
+
+def _server_total_ms(header):
+    for metric in (header or "").split(","):
+        name, _, params = metric.strip().partition(";")
+        if name == "total":
+            for param in params.split(";"):
+                key, _, value = param.strip().partition("=")
+                if key == "dur":
+                    try:
+                        return float(value)
+                    except ValueError:
+                        return None
+    return None
+
+class _Client:
+    """
+    One keep-alive HTTP connection per replay thread.
+    """
+
+    def __init__(self, url, timeout):
+        parsed = urllib.parse.urlsplit(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.path = (parsed.path.rstrip("/") or "") + "/mcp"
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def post(self, body, headers):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request("POST", self.path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self.local.conn = None
+            raise
+        if response.getheader("Connection", "").lower() == "close":
+            conn.close()
+            self.local.conn = None
+        return response, data
+
+def replay_one(client, entry):
+    """
+    Sends one captured call and returns its result, ready for comparison with the capture.
+    """
+    body = json.dumps({
+        "model": entry.get("model") or "replay",
+        "context": {"tool_request": {"name": entry["tool"], "input": entry.get("input", {})}},
+    }).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if entry.get("request_id"):
+        headers["X-Request-ID"] = f"replay-{entry['request_id']}"
+
+    result = {"request_id": entry.get("request_id"), "tool": entry["tool"]}
+    started = time.perf_counter()
+    try:
+        response, data = client.post(body, headers)
+    except (OSError, http.client.HTTPException) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+    result["client_ms"] = (time.perf_counter() - started) * 1000
+    result["status_code"] = response.status
+    result["server_ms"] = _server_total_ms(response.getheader("Server-Timing"))
+
+    if entry.get("streamed") or response.getheader("Content-Type", "").startswith("application/x-ndjson"):
+        # Streamed outputs aren't digested at capture time; only the final line's status is comparable.
+        lines = [line for line in data.splitlines() if line.strip()]
+        try:
+            result["output_status"] = json.loads(lines[-1]).get("status") if lines else None
+        except ValueError:
+            result["output_status"] = None
+        result["streamed"] = True
+        return result
+    try:
+        output = (json.loads(data).get("tool_response") or {}).get("output")
+    except (ValueError, AttributeError):
+        result["error"] = "response is not JSON"
+        return result
+    result["output_status"] = _output_status(output)
+    result["output_sha256"] = output_digest(output)
+    return result
+
+def compare(entry, result):
+    """
+    Lists how a replayed call differs from its capture; an empty list means it matched.
+    """
+    if "error" in result:
+        return [f"transport: {result['error']}"]
+    diffs = []
+    if result["status_code"] != entry.get("status_code"):
+        diffs.append(f"status_code: {entry.get('status_code')} -> {result['status_code']}")
+    if result.get("output_status") != entry.get("output_status") and not result.get("streamed"):
+        diffs.append(f"output_status: {entry.get('output_status')} -> {result.get('output_status')}")
+    captured_digest = entry.get("output_sha256")
+    if captured_digest and result.get("output_sha256") and captured_digest != result["output_sha256"]:
+        diffs.append("output changed")
+    return diffs
+
+def run_replay(records, client, speed=1.0, fast=False, concurrency=8):
+    """
+    Replays records either back to back or on their captured schedule divided by speed.
+    Returns (per-record results, how far behind schedule each send started, in ms).
+    """
+    results = [None] * len(records)
+    lateness = []
+    lock = threading.Lock()
+
+    def send(index, scheduled):
+        if scheduled is not None:
+            with lock:
+                lateness.append(max(0.0, (time.monotonic() - scheduled) * 1000))
+        results[index] = replay_one(client, records[index])
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if fast:
+            list(pool.map(lambda i: send(i, None), range(len(records))))
+        else:
+            origin = records[0]["ts"] if records else 0
+            start = time.monotonic()
+            futures = []
+            for index, entry in enumerate(records):
+                scheduled = start + (entry["ts"] - origin) / speed
+                delay = scheduled - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(pool.submit(send, index, scheduled))
+            for future in futures:
+                future.result()
+    return results, lateness
+
+# ---------- Reporting ----------
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))], 3)
+
+def summarize(records, results, lateness, show):
+    tools = {}
+    diffs = []
+    counts = {"replayed": len(records), "matched": 0, "changed": 0, "status_changed": 0, "transport_errors": 0}
+    for entry, result in zip(records, results):
+        stats = tools.setdefault(entry["tool"], {"calls": 0, "changed": 0, "captured": [], "replayed": []})
+        stats["calls"] += 1
+        stats["captured"].append(entry.get("duration_ms") or 0.0)
+        if result.get("server_ms") is not None:
+            stats["replayed"].append(result["server_ms"])
+        found = compare(entry, result)
+        if not found:
+            counts["matched"] += 1
+            continue
+        counts["changed"] += 1
+        stats["changed"] += 1
+        if "error" in result:
+            counts["transport_errors"] += 1
+        elif result["status_code"] != entry.get("status_code") or any(d.startswith("output_status") for d in found):
+            counts["status_changed"] += 1
+        diffs.append({"request_id": entry.get("request_id"), "tool": entry["tool"], "diffs": found})
+
+    for stats in tools.values():
+        captured = sorted(stats.pop("captured"))
+        replayed = sorted(stats.pop("replayed"))
+        stats.update({
+            "captured_p50_ms": _percentile(captured, 0.50), "captured_p99_ms": _percentile(captured, 0.99),
+            "replayed_p50_ms": _percentile(replayed, 0.50), "replayed_p99_ms": _percentile(replayed, 0.99),
+        })
+    lateness = sorted(lateness)
+    return {
+        **counts,
+        "schedule_lateness_p99_ms": _percentile(lateness, 0.99),
+        "tools": tools,
+        "diffs": diffs[:show] if show >= 0 else diffs,
+    }
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.2f}"
+
+def print_report(report, skipped):
+    print(f"Replayed {report['replayed']} calls: {report['matched']} matched, {report['changed']} changed "
+          f"({report['status_changed']} status changes, {report['transport_errors']} transport errors)")
+    skipped_text = ", ".join(f"{count} {reason}" for reason, count in skipped.items() if count)
+    if skipped_text:
+        print(f"Skipped: {skipped_text}")
+    if report["schedule_lateness_p99_ms"] is not None:
+        print(f"Schedule lateness p99: {report['schedule_lateness_p99_ms']:.2f} ms")
+    print()
+    print(f"{'tool':<28} {'calls':>6} {'changed':>8} {'cap p50':>9} {'rep p50':>9} {'cap p99':>9} {'rep p99':>9}")
+    for name, stats in sorted(report["tools"].items()):
+        print(f"{name:<28} {stats['calls']:>6} {stats['changed']:>8} {_fmt(stats['captured_p50_ms']):>9} "
+              f"{_fmt(stats['replayed_p50_ms']):>9} {_fmt(stats['captured_p99_ms']):>9} {_fmt(stats['replayed_p99_ms']):>9}")
+    if report["diffs"]:
+        print()
+        for diff in report["diffs"]:
+            print(f"  {diff['tool']} {diff['request_id']}: {'; '.join(diff['diffs'])}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay captured /mcp traffic and diff the results.")
+    parser.add_argument("captures", nargs="+", help="Capture files, oldest segment first (.gz segments are fine).")
+    parser.add_argument("--url", required=True, help="Base URL of the server to replay against.")
+    parser.add_argument("--tool", action="append", help="Only replay calls to this tool (repeatable).")
+    parser.add_argument("--limit", type=int, default=0, help="Replay at most this many calls.")
+    parser.add_argument("--include-modified", action="store_true", help="Also replay calls whose input was redacted or truncated.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay the captured schedule this many times faster.")
+    parser.add_argument("--fast", action="store_true", help="Ignore the captured schedule and send calls back to back.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum calls in flight.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-call timeout in seconds.")
+    parser.add_argument("--show", type=int, default=20, help="How many diffs to list (-1 for all).")
+    parser.add_argument("--json", help="Also write the report to this file.")
+    parser.add_argument("--fail-on-diff", action="store_true", help="Exit with status 1 if any call changed.")
+    args = parser.parse_args(argv)
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    records, skipped = load_capture(args.captures, tools=set(args.tool or ()), include_modified=args.include_modified)
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        print("No replayable calls in the capture.", file=sys.stderr)
+        return 1
+
+    client = _Client(args.url, args.timeout)
+    results, lateness = run_replay(records, client, speed=args.speed, fast=args.fast, concurrency=args.concurrency)
+    report = summarize(records, results, lateness, args.show)
+    report["skipped"] = skipped
+    print_report(report, skipped)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if args.fail_on_diff and report["changed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
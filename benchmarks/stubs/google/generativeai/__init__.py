@@ -0,0 +1,84 @@
+# benchmarks/stubs/google/generativeai/__init__.py
+# A local stand-in for the google.generativeai package, so the Gemini tools can be benchmarked
+# without network access or an API key. Put benchmarks/stubs first on sys.path to use it.
+#
+# FAKE_GEMINI_LATENCY (seconds, default 0) is added to every generate_content() call.
+# With FAKE_GEMINI_URL set (see benchmarks/fake_gemini_server.py), each call is a real HTTP request to it instead.
+
+import os
+import json
+import time
+import urllib.error
+import urllib.request
+
+_CONFIG = {}
+
+def configure(api_key=None, **kwargs):
+    _CONFIG.update(kwargs, api_key=api_key)
+
+class _Part:
+    def __init__(self, text):
+        self.text = text
+
+class _Content:
+    def __init__(self, text):
+        self.parts = [_Part(text)]
+
+class _Candidate:
+    def __init__(self, text):
+        self.content = _Content(text)
+        self.finish_reason = "STOP"
+
+class GenerateContentResponse:
+    def __init__(self, text):
+        self.candidates = [_Candidate(text)]
+        self.usage_metadata = None
+
+    @property
+    def parts(self):
+        return self.candidates[0].content.parts
+
+    @property
+    def text(self):
+        return self.parts[0].text
+
+    def __repr__(self):
+        return f"GenerateContentResponse(text={self.text!r})"
+
+def _canned_reply(prompt):
+    if "python" in prompt.lower() or "code" in prompt.lower():
+        return "```python\nprint('hello from the stub')\n```"
+    return f"Stub answer to: {prompt[:80]}"
+
+class GenerativeModel:
+    def __init__(self, model_name="gemini-2.0-flash", **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, contents, request_options=None, **kwargs):
+        url = os.environ.get("FAKE_GEMINI_URL")
+        if url:
+            return self._generate_over_http(url, contents, (request_options or {}).get("timeout"))
+        latency = float(os.environ.get("FAKE_GEMINI_LATENCY", "0"))
+        if latency:
+            time.sleep(latency)
+        prompt = contents if isinstance(contents, str) else str(contents)
+        return GenerateContentResponse(_canned_reply(prompt))
+
+    def _generate_over_http(self, url, contents, timeout=None):
+        prompt = contents if isinstance(contents, str) else str(contents)
+        body = json.dumps({"contents": [{"role": "user", "parts": [{"text": prompt}]}]}).encode("utf-8")
+        request = urllib.request.Request(
+            f"{url.rstrip('/')}/v1beta/models/{self.model_name}:generateContent",
+            data=body,
+            headers={"Content-Type": "application/json", "x-goog-api-key": _CONFIG.get("api_key") or ""},
+        )
+        try:
+            timeout = timeout or float(os.environ.get("FAKE_GEMINI_TIMEOUT", "60"))
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                payload = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            # The real client raises google.api_core exceptions; the tools only rely on str(e).
+            raise RuntimeError(f"{e.code} {e.reason}: {e.read().decode('utf-8', 'replace')[:200]}") from None
+        result = GenerateContentResponse(payload["candidates"][0]["content"]["parts"][0]["text"])
+        result.usage_metadata = payload.get("usageMetadata")
+        return result
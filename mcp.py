@@ -5,18 +5,80 @@
 # It can now also load newly created tools at runtime without a restart.
 
 import os
+import sys
 import importlib.util
 import traceback
-import io
+import json
+import time
+import logging
+import types
+import weakref
+import threading
 import contextlib
-from flask import Flask, request, jsonify
+from flask import Flask, request, Response, g, send_file
 from flask_cors import CORS
 
+# Shared helper modules in tools/ (tools/_*.py) are imported by name, by tools and the server alike.
+TOOLS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools")
+if TOOLS_PATH not in sys.path:
+    sys.path.insert(0, TOOLS_PATH)
+
+import _deadline
+import _invoke
+import _tool_versions
+import mcp_metrics
+import mcp_tracing
+import mcp_profiling
+import mcp_capture
+import mcp_jobs
+import mcp_cancellation
+import mcp_schema
+import mcp_executors
+import mcp_pyexec
+from mcp_encoding import encode_response, decode_request_body
+
 # --- Global Tool Registry ---
 LOADED_TOOLS = {}
+# Module objects behind LOADED_TOOLS, for optional hooks such as get_stats().
+TOOL_MODULES = {}
+# Compiled input_schema validators (see mcp_schema), built when a tool is loaded or reloaded.
+TOOL_VALIDATORS = {}
+# Thread/process pools of tools that declare a non-inline execution mode (see mcp_executors).
+TOOL_EXECUTORS = {}
+# The version of each tool that new calls get: {"version", "path", "source", "module", "meta", "validator",
+# "executor", "loaded_at"}. A call picks its record once, so replacing a tool never changes the code
+# under a running call; the dicts above mirror the current records.
+TOOL_VERSIONS = {}
+# The record each tool had before it was last replaced, for instant rollback.
+PREVIOUS_VERSIONS = {}
+# Modules of versions that have been replaced twice over; they should be freed once their calls finish.
+_RETIRED_MODULES = []
+# Per tool module: calls running on it, whether it has been retired (then its optional close() hook
+# runs once the last of those calls ends), and replaced executors waiting for those calls to end.
+_MODULE_STATE = weakref.WeakKeyDictionary()
+_MODULE_STATE_LOCK = threading.Lock()
+
+logger = logging.getLogger("mcp.server")
+request_logger = logging.getLogger("mcp.request")
+
+# --- Request size limits ---
+# Largest JSON body accepted on /mcp. Bigger files should use file_writer's chunked upload instead.
+MAX_BODY_BYTES = int(os.environ.get("MCP_MAX_BODY_BYTES", str(64 * 1024 * 1024)))
+# Largest raw body accepted by /mcp/upload/<id> in one request (0 = unlimited); read UPLOAD_CHUNK_BYTES at a time.
+MAX_UPLOAD_BODY_BYTES = int(os.environ.get("MCP_MAX_UPLOAD_BODY_BYTES", "0"))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Set MCP_VALIDATE_INPUT=0 to hand inputs to tools unchecked.
+VALIDATE_INPUT = os.environ.get("MCP_VALIDATE_INPUT", "1").lower() not in ("0", "false", "no", "off")
+PYTHON_EXECUTOR_SCHEMA = {
+    "type": "object",
+    "properties": {"code": {"type": "string", "minLength": 1}},
+    "required": ["code"],
+}
 
 # Initialize the Flask application
 app = Flask(__name__)
+app.config["MAX_CONTENT_LENGTH"] = MAX_BODY_BYTES or None
 CORS(app)
 
 def execute_python_code(code_string):
@@ -24,29 +86,71 @@ def execute_python_code(code_string):
     Executes a string of Python code and captures its stdout output or any exceptions.
     This is treated as a built-in tool.
 
+    Returns (success, output, details); details has output_bytes and truncated, plus output_file when
+    the middle of a long output was spilled to disk (see mcp_pyexec.py).
+
     SECURITY WARNING: Executing arbitrary code is extremely dangerous.
     This should ONLY be used in a sandboxed, secure environment.
     """
-    output_buffer = io.StringIO()
     try:
-        with contextlib.redirect_stdout(output_buffer):
-            exec(code_string, {})
-        return True, output_buffer.getvalue()
+        capture = mcp_pyexec.run_snippet(code_string)
     except Exception:
-        return False, traceback.format_exc()
+        error = traceback.format_exc()
+        return False, error, {"output_bytes": len(error.encode("utf-8", "replace")), "truncated": False}
+    details = {"output_bytes": capture.total_bytes, "truncated": capture.truncated}
+    if capture.spill_path:
+        details["output_file"] = capture.spill_path
+    return True, capture.getvalue(), details
+
+def stream_tool_output(tool_name, generator, deadline=None):
+    """
+    Streams a generator-returning tool as newline-delimited JSON.
+    The first line is a header, followed by one line per yielded item and a final summary line.
+    If the call's deadline passes mid-stream, the stream ends with an error summary line.
+    """
+    def ndjson():
+        yield json.dumps({"status": "success", "tool_name": tool_name, "stream": True}) + "\n"
+        count = 0
+        try:
+            for item in generator:
+                count += 1
+                yield json.dumps(item) + "\n"
+                if deadline is not None:
+                    deadline.check()
+            yield json.dumps({"status": "success", "done": True, "count": count}) + "\n"
+        except _deadline.Aborted as e:
+            generator.close()
+            yield json.dumps({"status": "error", "done": True, "count": count, "message": str(e)}) + "\n"
+        except Exception as e:
+            yield json.dumps({"status": "error", "done": True, "count": count, "message": str(e)}) + "\n"
 
-def load_single_tool(tool_name, tools_directory="tools"):
+    return Response(ndjson(), mimetype="application/x-ndjson")
+
+def load_single_tool(tool_name, tools_directory=TOOLS_PATH):
     """
     Loads or reloads a single, specified tool into the LOADED_TOOLS registry.
     This version is more robust and includes cache invalidation.
+    The new version is swapped in only once it has loaded; if it fails, the current one stays.
     """
+    started = time.perf_counter()
+    loaded = _load_single_tool(tool_name, tools_directory)
+    mcp_metrics.TOOL_LOAD_LATENCY.labels(tool_name).observe(time.perf_counter() - started)
+    mcp_metrics.TOOL_LOADS.labels(tool_name, "success" if loaded else "failure").inc()
+    return loaded
+
+def _load_single_tool(tool_name, tools_directory):
     filename = f"{tool_name}.py"
     module_path = os.path.join(tools_directory, filename)
 
-    print(f"--- Attempting to dynamically load '{tool_name}' ---")
+    # Tools import shared helper modules (tools/_*.py) by name, so the tools directory must be importable.
+    tools_path = os.path.abspath(tools_directory)
+    if tools_path not in sys.path:
+        sys.path.insert(0, tools_path)
+
+    logger.info("Loading tool '%s'", tool_name)
 
     if not os.path.exists(module_path):
-        print(f"  [!] FAILED: File does not exist at '{module_path}'")
+        logger.error("Failed to load tool '%s': file does not exist at '%s'", tool_name, module_path)
         return False
     
     try:
@@ -55,52 +159,511 @@ def load_single_tool(tool_name, tools_directory="tools"):
 
         spec = importlib.util.spec_from_file_location(tool_name, module_path)
         if spec is None:
-            print(f"  [!] FAILED: Could not create module spec for '{module_path}'")
+            logger.error("Failed to load tool '%s': could not create module spec for '%s'", tool_name, module_path)
             return False
         
+        # Compile the bytes that were read, so the version id always matches the code that runs.
+        with open(module_path, 'rb') as f:
+            source = f.read()
         module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
+        exec(compile(source, module_path, "exec"), module.__dict__)
         
         if hasattr(module, "run") and callable(module.run):
-            LOADED_TOOLS[tool_name] = module.run
-            print(f"  [+] SUCCESS: Tool '{tool_name}' is now loaded and ready.")
+            meta = _tool_meta(tool_name, module)
+            record = {
+                "version": _tool_versions.source_version(source),
+                "path": module_path,
+                "source": source,
+                "module": module,
+                "meta": meta,
+                "validator": _compile_validator(tool_name, meta),
+                "loaded_at": time.time(),
+            }
+            _activate_version(tool_name, record)
+            logger.info("Tool '%s' version %s is now loaded and ready", tool_name, record["version"])
             return True
         else:
-            print(f"  [-] FAILED: Tool '{tool_name}' is missing a 'run' function.")
+            logger.error("Failed to load tool '%s': missing a 'run' function", tool_name)
             return False
     except Exception:
-        print(f"  [!] FAILED: An exception occurred while loading '{tool_name}':")
-        print(traceback.format_exc())
+        logger.exception("Failed to load tool '%s': an exception occurred", tool_name)
         return False
 
 
-def load_tools(tools_directory="tools"):
+def _activate_version(tool_name, record):
+    """
+    Makes record the version new calls of tool_name get. Calls already running keep the record they
+    started with; the replaced version's executor is closed once the last of them ends.
+    """
+    record = dict(record, executor=mcp_executors.create(tool_name, record["path"], record["module"].run, record["meta"], record["source"]))
+    # Under the lock, so a call either was counted on the old module or gets the new record (see _enter_version).
+    with _MODULE_STATE_LOCK:
+        previous = TOOL_VERSIONS.get(tool_name)
+        TOOL_VERSIONS[tool_name] = record
+    LOADED_TOOLS[tool_name] = record["module"].run
+    TOOL_MODULES[tool_name] = record["module"]
+    for registry, value in ((TOOL_VALIDATORS, record["validator"]), (TOOL_EXECUTORS, record["executor"])):
+        if value is not None:
+            registry[tool_name] = value
+        else:
+            registry.pop(tool_name, None)
+    if previous is None:
+        return
+    if previous["executor"] is not None:
+        _retire_executor(tool_name, previous)
+    if previous["version"] == record["version"]:
+        # A plain reload; the rollback target stays what it was.
+        _retire_module(tool_name, previous)
+        return
+    displaced = PREVIOUS_VERSIONS.get(tool_name)
+    if displaced is not None and displaced["module"] is not record["module"]:
+        _retire_module(tool_name, displaced)
+    PREVIOUS_VERSIONS[tool_name] = dict(previous, executor=None)
+
+def _module_state(module):
+    return _MODULE_STATE.setdefault(module, {"calls": 0, "retired": False, "executors": []})
+
+def _retire_executor(tool_name, record):
+    """
+    Closes a replaced version's executor, or defers that until the calls running on its module end:
+    a call that picked up the old record must still be able to submit to it.
+    """
+    with _MODULE_STATE_LOCK:
+        state = _module_state(record["module"])
+        idle = state["calls"] == 0
+        if not idle:
+            state["executors"].append(record["executor"])
+    if idle:
+        record["executor"].close()
+
+def _retire_module(tool_name, record):
+    _RETIRED_MODULES[:] = [(name, ref) for name, ref in _RETIRED_MODULES if ref() is not None]
+    _RETIRED_MODULES.append((tool_name, weakref.ref(record["module"])))
+    module = record["module"]
+    with _MODULE_STATE_LOCK:
+        state = _module_state(module)
+        state["retired"] = True
+        idle = state["calls"] == 0
+    if idle:
+        _close_module(tool_name, module)
+
+def _close_module(tool_name, module):
+    """
+    Runs a retired module's optional close() hook, which releases what it holds outside the module
+    (child processes, connections, files); dropping the module alone wouldn't.
+    """
+    close = getattr(module, "close", None)
+    if not callable(close):
+        return
+    try:
+        close()
+        logger.info("Closed retired version of tool '%s'", tool_name)
+    except Exception:
+        logger.exception("close() of a retired version of tool '%s' failed", tool_name)
+
+def _enter_version(tool_name):
+    """
+    The current record of tool_name (or None), counted as a call running on its module until
+    _exit_module, so neither the module nor its executor is closed under the call.
+    """
+    with _MODULE_STATE_LOCK:
+        tool = TOOL_VERSIONS.get(tool_name)
+        if tool is not None:
+            _module_state(tool["module"])["calls"] += 1
+    return tool
+
+def _exit_module(tool_name, module):
+    with _MODULE_STATE_LOCK:
+        state = _MODULE_STATE[module]
+        state["calls"] -= 1
+        executors = []
+        if state["calls"] == 0:
+            executors, state["executors"] = state["executors"], []
+        last = state["retired"] and state["calls"] == 0
+    for executor in executors:
+        executor.close()
+    if last:
+        _close_module(tool_name, module)
+
+def _exit_module_after(tool_name, module, output):
+    """
+    Ends the call on module now, or for a generator, once it is exhausted or closed.
+    """
+    if not isinstance(output, types.GeneratorType):
+        _exit_module(tool_name, module)
+        return output
+    return _exit_module_when_done(tool_name, module, output)
+
+def _exit_module_when_done(tool_name, module, generator):
+    try:
+        yield from generator
+    finally:
+        _exit_module(tool_name, module)
+
+def rollback_tool(tool_name, version):
+    """
+    Swaps the tool's previous version back in without reloading it, if it is the requested version.
+    Returns False when it isn't (the caller then loads the file instead).
+    """
+    previous = PREVIOUS_VERSIONS.get(tool_name)
+    if previous is None or previous["version"] != version:
+        return False
+    _activate_version(tool_name, previous)
+    mcp_metrics.TOOL_LOADS.labels(tool_name, "rollback").inc()
+    logger.info("Tool '%s' rolled back to version %s", tool_name, version)
+    return True
+
+def load_tools(tools_directory=TOOLS_PATH, recover_jobs=True):
     """
     Scans a directory for Python files and registers them on startup.
+    Files starting with an underscore are shared helper modules, not tools, and are skipped.
+    recover_jobs=False is for processes that don't run async jobs (the JSON-RPC transport), so they
+    leave the HTTP server's job queue alone.
     """
-    print(f"--- Loading tools from '{tools_directory}' directory ---")
+    logger.info("Loading tools from '%s'", tools_directory)
     if not os.path.isdir(tools_directory):
-        print(f"Warning: Tools directory '{tools_directory}' not found.")
+        logger.warning("Tools directory '%s' not found", tools_directory)
         return
 
     for filename in os.listdir(tools_directory):
-        if filename.endswith(".py") and not filename.startswith("__"):
+        if filename.endswith(".py") and not filename.startswith("_"):
             tool_name = filename[:-3]
             load_single_tool(tool_name, tools_directory)
-    print("--- Tool loading complete ---")
+    logger.info("Tool loading complete: %d tools", len(LOADED_TOOLS))
+    # Jobs queued before a restart can only run once their tools are loaded.
+    if recover_jobs:
+        mcp_jobs.recover()
+
+
+def _tool_meta(tool_name, module):
+    """
+    The tool's get_meta(), or {} when it has none (or it fails; that is logged).
+    """
+    get_meta = getattr(module, "get_meta", None)
+    if not callable(get_meta):
+        return {}
+    try:
+        return get_meta() or {}
+    except Exception:
+        logger.exception("Tool '%s' get_meta() failed", tool_name)
+        return {}
+
+def _compile_validator(tool_name, meta):
+    """
+    Compiles the tool's get_meta()["input_schema"]. A tool without one, or with a schema that can't be
+    compiled, is loaded anyway and its input goes unchecked.
+    """
+    try:
+        schema = meta.get("input_schema")
+        return mcp_schema.compile_schema(schema) if schema is not None else None
+    except Exception as e:
+        logger.warning("Tool '%s' input_schema can't be used for validation: %s", tool_name, e)
+        return None
+
+TOOL_VALIDATORS['python_executor'] = mcp_schema.compile_schema(PYTHON_EXECUTOR_SCHEMA)
+
+class InvalidToolInput(ValueError):
+    """
+    tool_input doesn't match the tool's input_schema. errors lists {"path", "keyword", "message"}.
+    """
+
+    def __init__(self, tool_name, errors):
+        super().__init__(f"Invalid input for tool '{tool_name}': {mcp_schema.format_errors(errors)}")
+        self.tool_name = tool_name
+        self.errors = errors
+
+def validate_input(tool_name, tool_input, validator=None):
+    """
+    Raises InvalidToolInput if tool_input doesn't match the tool's compiled input_schema
+    (validator defaults to the current version's).
+    """
+    if validator is None:
+        validator = TOOL_VALIDATORS.get(tool_name)
+    if VALIDATE_INPUT and validator is not None:
+        errors = validator(tool_input)
+        if errors:
+            raise InvalidToolInput(tool_name, errors)
+
+def _invalid_input_output(error):
+    return {"status": "error", "message": str(error), "errors": error.errors}
+
+def dispatch_tool(tool_name, tool_input):
+    """
+    Runs one tool call (the built-in python_executor or a LOADED_TOOLS entry, on its executor if it declares
+    one) and returns its output. The whole call uses the tool version that was current when it started.
+    Raises ValueError for unknown tools and InvalidToolInput before run() for input that fails validation.
+    """
+    if tool_name == 'python_executor':
+        validate_input(tool_name, tool_input)
+        with _invoke.calling(tool_name):
+            return _run_python_executor(tool_input)
+    tool = _enter_version(tool_name)
+    if tool is None:
+        raise ValueError(f"Tool '{tool_name}' not found.")
+    module = tool["module"]
+    try:
+        if tool["validator"] is not None:
+            validate_input(tool_name, tool_input, tool["validator"])
+        with _invoke.calling(tool_name):
+            executor = tool["executor"]
+            if executor is not None:
+                with mcp_tracing.span("tool.run", tool=tool_name, version=tool["version"], mode=executor.mode):
+                    output = executor.call(tool_input)
+            else:
+                with mcp_tracing.span("tool.run", tool=tool_name, version=tool["version"]):
+                    output = module.run(tool_input)
+    except BaseException:
+        _exit_module(tool_name, module)
+        raise
+    return _exit_module_after(tool_name, module, output)
+
+def _run_python_executor(tool_input):
+    code_to_run = tool_input['code']
+    # exec'd snippets never check their deadline, so they are interrupted from outside.
+    with mcp_tracing.span("tool.run", tool='python_executor'), _deadline.interrupt_on_abort():
+        success, result, details = execute_python_code(code_to_run)
+    return dict({"ran_successfully": success, "output": result}, **details)
+
+def _call_from_tool(tool_name, tool_input):
+    """
+    Dispatcher behind tools/_invoke.py: a tool calling another tool in-process.
+    """
+    callers = _invoke.stack()
+    mcp_metrics.NESTED_TOOL_CALLS.labels(metrics_label(tool_name)).inc()
+    with mcp_tracing.span("tool.call", tool=tool_name, caller=callers[-1] if callers else None):
+        try:
+            return dispatch_tool(tool_name, tool_input)
+        except InvalidToolInput as e:
+            # The caller passed bad input, not the client; don't let it surface as the outer call's 400.
+            raise _invoke.InvalidInput(str(e), e.errors) from None
+
+_invoke.install(_call_from_tool)
+
+def _reload_created_tool(tool_name, tool_output):
+    # --- DYNAMIC RELOAD LOGIC ---
+    if tool_name == 'tool_creator' and tool_output.get('status') == 'success':
+        new_tool_name = tool_output.get('created_tool_name')
+        if new_tool_name:
+            if tool_output.get('rolled_back') and rollback_tool(new_tool_name, tool_output.get('version')):
+                return
+            if not load_single_tool(new_tool_name):
+                # The file is in place but didn't load here; the version that was running still serves calls.
+                tool_output['loaded'] = False
+
+def metrics_label(tool_name):
+    # Unknown names come straight from clients; don't let them create unbounded label values.
+    return tool_name if tool_name == 'python_executor' or tool_name in LOADED_TOOLS else "unknown"
+
+def _collect_cache_stats():
+    """
+    Scrape-time collector for the optional get_stats() hook of tools and shared helper modules (tools/_*.py).
+    get_stats() returns {"caches": {"<cache>": {"hits": n, "misses": m}}}.
+    """
+    sources = dict(TOOL_MODULES)
+    tools_path = TOOLS_PATH
+    for name, module in list(sys.modules.items()):
+        module_file = getattr(module, "__file__", None) or ""
+        if name.startswith("_") and os.path.dirname(os.path.abspath(module_file)) == tools_path:
+            sources[name] = module
+    for source, module in sources.items():
+        get_stats = getattr(module, "get_stats", None)
+        if callable(get_stats):
+            yield from mcp_metrics.cache_samples(source, get_stats().get("caches", {}))
+    yield from mcp_metrics.cache_samples("python_executor", mcp_pyexec.get_stats()["caches"])
+
+mcp_metrics.REGISTRY.register_collector(_collect_cache_stats)
+
+def _collect_tool_versions():
+    """
+    Scrape-time collector: each tool's current version, and replaced versions still held in memory
+    (normally only while calls that started on them are running).
+    """
+    for tool_name, record in list(TOOL_VERSIONS.items()):
+        yield "mcp_tool_version_info", "gauge", "The version (source hash) of each loaded tool that new calls use.", {"tool": tool_name, "version": record["version"]}, 1
+    alive = {}
+    for tool_name, ref in list(_RETIRED_MODULES):
+        if ref() is not None:
+            alive[tool_name] = alive.get(tool_name, 0) + 1
+    for tool_name, count in alive.items():
+        yield "mcp_tool_retired_versions", "gauge", "Replaced tool versions not yet freed (excluding the one kept for rollback).", {"tool": tool_name}, count
+
+mcp_metrics.REGISTRY.register_collector(_collect_tool_versions)
+
+# --- Tracing and request logging ---
+mcp_tracing.configure_logging()
+
+def _annotate(**attrs):
+    trace = mcp_tracing.current_trace()
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+@app.before_request
+def _start_trace():
+    g.trace = mcp_tracing.trace_from_headers(request.headers)
+    g.trace_token = mcp_tracing.activate(g.trace)
+
+@app.after_request
+def _finish_trace(response):
+    trace = g.get("trace")
+    if trace is None:
+        return response
+    response.headers.update(trace.headers())
+    if request.endpoint != "handle_metrics":
+        _log_request(trace, response)
+    return response
+
+@app.teardown_request
+def _end_trace(exc):
+    token = g.pop("trace_token", None)
+    if token is not None:
+        mcp_tracing.deactivate(token)
+
+def _log_request(trace, response):
+    """
+    Emits one structured record per request (sampled, see mcp_tracing) with its spans and redacted input.
+    """
+    duration_ms = trace.elapsed_ms()
+    error = response.status_code >= 400 or trace.attrs.get("outcome", "ok") != "ok"
+    if not mcp_tracing.should_log(duration_ms, error):
+        return
+    fields = {
+        "method": request.method,
+        "path": request.path,
+        "status_code": response.status_code,
+        "duration_ms": round(duration_ms, 3),
+        "span_id": trace.span_id,
+        "spans": list(trace.spans),
+    }
+    if trace.parent_span_id:
+        fields["parent_span_id"] = trace.parent_span_id
+    # Tool input and error messages come from clients and tools; cap and redact them like everything else.
+    fields.update(mcp_tracing.redact(trace.attrs))
+    if response.is_streamed:
+        fields["streamed"] = True
+    request_logger.log(logging.WARNING if error else logging.INFO, "request", extra={"fields": fields})
+
+def _capture_call(data, tool_name, tool_input, response, dispatch_ms, output=None, streamed=False):
+    """
+    Hands a finished tool call to mcp_capture (only when MCP_CAPTURE_PATH is set).
+    """
+    if not mcp_capture.enabled():
+        return
+    trace = mcp_tracing.current_trace()
+    mcp_capture.record(
+        data.get('model'), tool_name, tool_input, response.status_code,
+        trace.elapsed_ms() if trace else dispatch_ms, dispatch_ms,
+        request.content_length, None if streamed else response.content_length,
+        output=output, streamed=streamed,
+    )
+
+# --- Asynchronous jobs ---
+
+def run_tool_call(tool_name, tool_input, deadline, trace, record, **log_fields):
+    """
+    Runs one tool call outside a Flask request (async jobs, the JSON-RPC transport), traced, metered and
+    logged (as `record`, with log_fields) like a request. A generator output is collected into a list,
+    since these results are sent whole.
+    """
+    label = metrics_label(tool_name)
+    token = mcp_tracing.activate(trace)
+    in_flight = mcp_metrics.TOOL_IN_FLIGHT.labels(label)
+    in_flight.inc()
+    outcome = "ok"
+    try:
+        with mcp_tracing.span("dispatch", tool=tool_name), _deadline.scope(deadline):
+            tool_output = dispatch_tool(tool_name, tool_input)
+            if isinstance(tool_output, types.GeneratorType):
+                items = []
+                for item in tool_output:
+                    items.append(item)
+                    deadline.check()
+                tool_output = items
+        if isinstance(tool_output, dict) and tool_output.get('status') == 'error':
+            mcp_metrics.TOOL_ERRORS.labels(label, "status").inc()
+            outcome = "status"
+        _reload_created_tool(tool_name, tool_output)
+        return tool_output
+    except _deadline.Aborted as e:
+        e = deadline.aborted() or e
+        outcome = "deadline" if isinstance(e, _deadline.DeadlineExceeded) else "cancelled"
+        mcp_metrics.TOOL_ERRORS.labels(label, outcome).inc()
+        raise
+    except InvalidToolInput:
+        mcp_metrics.TOOL_ERRORS.labels(label, "invalid_input").inc()
+        outcome = "invalid_input"
+        raise
+    except Exception:
+        mcp_metrics.TOOL_ERRORS.labels(label, "exception").inc()
+        outcome = "exception"
+        raise
+    finally:
+        duration_ms = trace.elapsed_ms()
+        mcp_metrics.TOOL_LATENCY.labels(label).observe(duration_ms / 1000)
+        in_flight.dec()
+        if mcp_tracing.should_log(duration_ms, outcome != "ok"):
+            fields = dict(log_fields, tool=tool_name, outcome=outcome, duration_ms=round(duration_ms, 3), spans=list(trace.spans))
+            fields["input"] = mcp_tracing.redact(tool_input)
+            request_logger.log(logging.WARNING if outcome != "ok" else logging.INFO, record, extra={"fields": fields})
+        mcp_tracing.deactivate(token)
+
+def _run_job(job):
+    """
+    mcp_jobs runner: executes one job on a worker thread.
+    """
+    seconds = max(0.0, job["expires"] - time.time()) if job["expires"] is not None else None
+    deadline = _deadline.Deadline(seconds, job["cancel_event"])
+    trace = mcp_tracing.Trace(job["trace_id"], job["id"])
+    return run_tool_call(job["tool"], job["input"], deadline, trace, "job", job_id=job["id"])
+
+mcp_jobs.init(_run_job)
+
+def _job_payload(job):
+    return dict(job, url=f"/mcp/jobs/{job['id']}")
+
+def _submit_job(data, tool_name, tool_input, deadline_seconds=None):
+    """
+    Queues a tool call as a job and answers 202 with its id; see the /mcp/jobs routes.
+    """
+    if tool_name != 'python_executor' and tool_name not in LOADED_TOOLS:
+        return encode_response({"status": "error", "message": f"Tool '{tool_name}' not found."}, 400)
+    try:
+        validate_input(tool_name, tool_input)
+    except InvalidToolInput as e:
+        mcp_metrics.TOOL_ERRORS.labels(metrics_label(tool_name), "invalid_input").inc()
+        _annotate(outcome="invalid_input", error=str(e))
+        return encode_response({"status": "error", "tool_response": {"tool_name": tool_name, "output": _invalid_input_output(e)}}, 400)
+    trace = mcp_tracing.current_trace()
+    try:
+        job = mcp_jobs.submit(tool_name, tool_input, data.get('model'), trace.trace_id if trace else None, deadline_seconds)
+    except mcp_jobs.QueueFull as e:
+        _annotate(outcome="rejected", error=str(e))
+        return encode_response({"status": "error", "message": str(e)}, 503)
+    _annotate(job_id=job["id"])
+    response = encode_response({"status": "accepted", "job": _job_payload(job)}, 202)
+    response.headers["Location"] = f"/mcp/jobs/{job['id']}"
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def handle_metrics():
+    """
+    Exposes server and tool metrics in the Prometheus text format.
+    """
+    return Response(mcp_metrics.REGISTRY.expose(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route('/mcp', methods=['POST'])
 def handle_mcp_request():
     """
     Handles requests for all tools and dynamically loads new tools created by tool_creator.
+    Responses are JSON unless the client negotiates MessagePack and/or compression (see mcp_encoding).
     """
-    if not request.is_json:
-        return jsonify({"status": "error", "message": "Request must be JSON"}), 400
+    with mcp_tracing.span("parse"):
+        data = decode_request_body()
+    if data is None:
+        return encode_response({"status": "error", "message": "Request must be JSON"}, 400)
 
-    data = request.get_json()
-    if 'model' not in data or 'context' not in data:
-        return jsonify({"status": "error", "message": "Payload must contain 'model' and 'context' keys"}), 400
+    if not isinstance(data, dict) or 'model' not in data or 'context' not in data:
+        return encode_response({"status": "error", "message": "Payload must contain 'model' and 'context' keys"}, 400)
 
     context_data = data['context']
 
@@ -109,52 +672,261 @@ def handle_mcp_request():
         tool_input = context_data['tool_request'].get('input', {})
 
         if not tool_name:
-            return jsonify({"status": "error", "message": "tool_request must specify a 'name'"}), 400
+            return encode_response({"status": "error", "message": "tool_request must specify a 'name'"}, 400)
 
-        print(f"Processing a '{tool_name}' tool request...")
+        profile_modes, tool_input, profile_error = mcp_profiling.requested_modes(request.headers, tool_input)
+        _annotate(tool=tool_name, input=tool_input)
+
+        is_async = bool(context_data['tool_request'].get('async'))
+        # Async jobs are meant to outlive requests, so only an explicit deadline_ms applies to them.
+        deadline, deadline_error = mcp_cancellation.deadline_from_request(
+            context_data['tool_request'], default_seconds=0 if is_async else mcp_cancellation.DEFAULT_DEADLINE_SECONDS
+        )
+        if deadline_error:
+            return encode_response({"status": "error", "message": deadline_error}, 400)
+        if deadline.seconds is not None:
+            _annotate(deadline_ms=round(deadline.seconds * 1000, 3))
 
         response_payload = {"status": "success"}
         status_code = 200
 
+        label = metrics_label(tool_name)
+        mcp_metrics.TOOL_CALLS.labels(label).inc()
+        if request.content_length is not None:
+            mcp_metrics.REQUEST_BYTES.labels(label).observe(request.content_length)
+
+        if is_async:
+            return _submit_job(data, tool_name, tool_input, deadline.seconds)
+
+        profile = None
+        dispatch_ms = None
+        tool_output = None
         try:
-            tool_output = None
-            if tool_name == 'python_executor':
-                code_to_run = tool_input.get('code')
-                if not code_to_run:
-                    raise ValueError("No 'code' provided for python_executor tool")
-                success, result = execute_python_code(code_to_run)
-                tool_output = {"ran_successfully": success, "output": result}
-            elif tool_name in LOADED_TOOLS:
-                tool_function = LOADED_TOOLS[tool_name]
-                tool_output = tool_function(tool_input)
-            else:
-                raise ValueError(f"Tool '{tool_name}' not found.")
-            
+            in_flight = mcp_metrics.TOOL_IN_FLIGHT.labels(label)
+            in_flight.inc()
+            started = time.perf_counter()
+            try:
+                profiler = contextlib.nullcontext()
+                if profile_modes:
+                    trace = mcp_tracing.current_trace()
+                    profiler = mcp_profiling.profile(profile_modes, trace.request_id if trace else None)
+                with mcp_tracing.span("dispatch", tool=tool_name), _deadline.scope(deadline), \
+                        mcp_cancellation.watching_disconnect(request.environ, deadline), profiler as profile:
+                    tool_output = dispatch_tool(tool_name, tool_input)
+            finally:
+                elapsed = time.perf_counter() - started
+                dispatch_ms = elapsed * 1000
+                mcp_metrics.TOOL_LATENCY.labels(label).observe(elapsed)
+                in_flight.dec()
+
+            if isinstance(tool_output, dict) and tool_output.get('status') == 'error':
+                mcp_metrics.TOOL_ERRORS.labels(label, "status").inc()
+                _annotate(outcome="status", error=tool_output.get('message'))
+
+            # Tools may return a generator to stream large results instead of building one big payload.
+            if isinstance(tool_output, types.GeneratorType):
+                response = stream_tool_output(tool_name, tool_output, deadline)
+                _capture_call(data, tool_name, tool_input, response, dispatch_ms, streamed=True)
+                return response
+
             response_payload["tool_response"] = {
                 "tool_name": tool_name, "output": tool_output
             }
 
-            # --- DYNAMIC RELOAD LOGIC ---
-            if tool_name == 'tool_creator' and tool_output.get('status') == 'success':
-                new_tool_name = tool_output.get('created_tool_name')
-                if new_tool_name:
-                    load_single_tool(new_tool_name)
+            _reload_created_tool(tool_name, tool_output)
 
+        except _deadline.Aborted as e:
+            # Exceptions raised asynchronously (python_executor) carry no reason; the deadline knows it.
+            e = deadline.aborted() or e
+            # 504 when the deadline passed; 499 (client closed request) when the call was cancelled.
+            kind = "deadline" if isinstance(e, _deadline.DeadlineExceeded) else "cancelled"
+            mcp_metrics.TOOL_ERRORS.labels(label, kind).inc()
+            _annotate(outcome=kind, error=str(e))
+            tool_output = str(e)
+            response_payload["status"] = "error"
+            response_payload["tool_response"] = {
+                "tool_name": tool_name, "output": str(e)
+            }
+            status_code = 504 if kind == "deadline" else 499
+        except InvalidToolInput as e:
+            mcp_metrics.TOOL_ERRORS.labels(label, "invalid_input").inc()
+            _annotate(outcome="invalid_input", error=str(e))
+            tool_output = _invalid_input_output(e)
+            response_payload["status"] = "error"
+            response_payload["tool_response"] = {
+                "tool_name": tool_name, "output": tool_output
+            }
+            status_code = 400
         except Exception as e:
+            mcp_metrics.TOOL_ERRORS.labels(label, "exception").inc()
+            _annotate(outcome="exception", error=str(e))
+            tool_output = str(e)
             response_payload["status"] = "error"
             response_payload["tool_response"] = {
                 "tool_name": tool_name, "output": str(e)
             }
             status_code = 400
 
-        return jsonify(response_payload), status_code
+        if profile is not None:
+            response_payload["profile"] = profile
+        elif profile_error:
+            response_payload["profile"] = {"error": profile_error}
+
+        with mcp_tracing.span("serialize"):
+            response = encode_response(response_payload, status_code)
+        mcp_metrics.RESPONSE_BYTES.labels(label).observe(response.content_length or 0)
+        _capture_call(data, tool_name, tool_input, response, dispatch_ms, tool_output)
+        return response
 
     else:
         response_message = f"Hello World! Received context for model '{data['model']}'."
-        return jsonify({"status": "success", "message": response_message}), 200
+        return encode_response({"status": "success", "message": response_message}, 200)
+
+
+@app.route('/mcp/profiles/<artifact_id>', methods=['GET'])
+def handle_profile_artifact(artifact_id):
+    """
+    Returns a stored profile summary, or the raw cProfile data with ?format=pstats (for pstats/snakeviz).
+    Artifact ids are the X-Request-ID of the profiled request.
+    """
+    if not mcp_profiling.authorized(request.headers):
+        return encode_response({"status": "error", "message": "Profiling is disabled or the profile token is missing."}, 403)
+
+    if request.args.get('format') == 'pstats':
+        path = mcp_profiling.load_artifact(artifact_id, raw=True)
+        if path is None:
+            return encode_response({"status": "error", "message": f"No cpu profile '{artifact_id}'."}, 404)
+        return send_file(path, mimetype="application/octet-stream", as_attachment=True, download_name=f"{artifact_id}.prof")
+
+    summary = mcp_profiling.load_artifact(artifact_id)
+    if summary is None:
+        return encode_response({"status": "error", "message": f"No profile '{artifact_id}'."}, 404)
+    return encode_response({"status": "success", "profile": summary}, 200)
+
+
+@app.route('/mcp/jobs', methods=['GET'])
+def handle_job_list():
+    """
+    Lists recent jobs (without outputs), newest first. Filters: ?state=, ?tool=, ?limit=.
+    """
+    jobs = mcp_jobs.list_jobs(request.args.get('state'), request.args.get('tool'), request.args.get('limit', 100, type=int))
+    return encode_response({"status": "success", "jobs": [_job_payload(job) for job in jobs]}, 200)
+
+
+@app.route('/mcp/jobs/<job_id>', methods=['GET'])
+def handle_job_status(job_id):
+    """
+    Returns a job, with its output once completed. ?wait=<seconds> long-polls until the job finishes.
+    """
+    wait = request.args.get('wait', 0, type=float)
+    job = mcp_jobs.wait(job_id, wait) if wait > 0 else mcp_jobs.get(job_id)
+    if job is None:
+        return encode_response({"status": "error", "message": f"No job '{job_id}'."}, 404)
+    return encode_response({"status": "success", "job": _job_payload(job)}, 200)
+
+
+@app.route('/mcp/jobs/<job_id>/events', methods=['GET'])
+def handle_job_events(job_id):
+    """
+    Streams a job as newline-delimited JSON: one line per state change, the last one with the result.
+    Idle periods get {"heartbeat": true} lines so proxies keep the connection open.
+    """
+    if mcp_jobs.get(job_id, with_output=False) is None:
+        return encode_response({"status": "error", "message": f"No job '{job_id}'."}, 404)
+
+    def ndjson():
+        for job in mcp_jobs.watch(job_id):
+            yield json.dumps({"heartbeat": True} if job is None else {"job": _job_payload(job)}) + "\n"
+
+    return Response(ndjson(), mimetype="application/x-ndjson")
+
+
+@app.route('/mcp/jobs/<job_id>', methods=['DELETE'])
+def handle_job_delete(job_id):
+    """
+    Cancels a queued job, asks a running one to stop, or deletes a finished one and its result.
+    """
+    try:
+        job = mcp_jobs.cancel(job_id)
+    except mcp_jobs.JobRunning as e:
+        return encode_response({"status": "error", "message": str(e)}, 409)
+    if job is None:
+        return encode_response({"status": "error", "message": f"No job '{job_id}'."}, 404)
+    if job["state"] == mcp_jobs.RUNNING:
+        return encode_response({"status": "accepted", "message": "Cancellation requested.", "job": _job_payload(job)}, 202)
+    return encode_response({"status": "success", "job": _job_payload(job)}, 200)
+
+
+@app.route('/mcp/upload/<upload_id>', methods=['PUT', 'POST'])
+def handle_upload_chunk(upload_id):
+    """
+    Streams a raw request body into a file_writer upload session, UPLOAD_CHUNK_BYTES at a time,
+    so large files never have to be held in memory or wrapped in JSON.
+    """
+    # The JSON size limit doesn't apply here; uploads have their own (Flask 3.1+ per-request override).
+    request.max_content_length = MAX_UPLOAD_BODY_BYTES or None
+
+    tool_function = LOADED_TOOLS.get('file_writer')
+    if tool_function is None:
+        return encode_response({"status": "error", "message": "Tool 'file_writer' not found."}, 404)
+
+    offset = request.args.get('offset', type=int)
+    # Metered, traced and captured as one file_writer call, like /mcp; the raw bytes are not logged.
+    tool_input = {"upload": {"action": "append", "upload_id": upload_id, "offset": offset}}
+    _annotate(tool='file_writer', input=tool_input)
+    label = metrics_label('file_writer')
+    mcp_metrics.TOOL_CALLS.labels(label).inc()
+    if request.content_length is not None:
+        mcp_metrics.REQUEST_BYTES.labels(label).observe(request.content_length)
+
+    tool_output = {"status": "success", "message": "Received 0 bytes.", "size": offset or 0}
+    received = 0
+    status_code = 200
+    in_flight = mcp_metrics.TOOL_IN_FLIGHT.labels(label)
+    in_flight.inc()
+    started = time.perf_counter()
+    try:
+        with mcp_tracing.span("dispatch", tool='file_writer', upload=True):
+            while True:
+                chunk = request.stream.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                upload = {"action": "append", "upload_id": upload_id, "chunk": chunk}
+                if offset is not None:
+                    upload["offset"] = offset + received
+                tool_output = tool_function({"upload": upload})
+                if tool_output.get('status') != 'success':
+                    status_code = 400
+                    break
+                received += len(chunk)
+    except Exception as e:
+        mcp_metrics.TOOL_ERRORS.labels(label, "exception").inc()
+        _annotate(outcome="exception", error=str(e))
+        tool_output = {"status": "error", "message": str(e)}
+        status_code = 400
+    else:
+        if status_code != 200:
+            mcp_metrics.TOOL_ERRORS.labels(label, "status").inc()
+            _annotate(outcome="status", error=tool_output.get('message'))
+        else:
+            tool_output = dict(tool_output, message=f"Received {received} bytes.")
+    finally:
+        elapsed = time.perf_counter() - started
+        mcp_metrics.TOOL_LATENCY.labels(label).observe(elapsed)
+        in_flight.dec()
 
+    response = encode_response({
+        "status": "success" if status_code == 200 else "error",
+        "tool_response": {"tool_name": "file_writer", "output": tool_output},
+    }, status_code)
+    mcp_metrics.RESPONSE_BYTES.labels(label).observe(response.content_length or 0)
+    _capture_call({}, 'file_writer', tool_input, response, elapsed * 1000, tool_output)
+    return response
 
 if __name__ == '__main__':
-    load_tools()
+    # debug=True runs this twice: in the reloader's watcher process, which never serves requests, and
+    # in the child it starts (WERKZEUG_RUN_MAIN=true). Only the child may take over the job queue;
+    # recovering in both would run every queued job twice.
+    load_tools(recover_jobs=os.environ.get("WERKZEUG_RUN_MAIN") == "true")
     app.run(host='0.0.0.0', port=5000, debug=True)
 
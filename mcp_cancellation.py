@@ -0,0 +1,108 @@
+# mcp_cancellation.py
+# Server side of tool-call deadlines (see tools/_deadline.py for the part tools use).
+#
+# A tool_request may carry "deadline_ms": the time budget for the call, counted from when the server
+# receives it. MCP_DEFAULT_DEADLINE_SECONDS applies when it is absent (0 = no deadline) and
+# MCP_MAX_DEADLINE_SECONDS caps it (0 = no cap). While a synchronous call runs, its client connection is
+# watched; if the client goes away the call is cancelled instead of finishing for nobody.
+
+import os
+import time
+import select
+import socket
+import threading
+import contextlib
+
+import _deadline
+
+DEFAULT_DEADLINE_SECONDS = float(os.environ.get("MCP_DEFAULT_DEADLINE_SECONDS", "0"))
+MAX_DEADLINE_SECONDS = float(os.environ.get("MCP_MAX_DEADLINE_SECONDS", "0"))
+# How often watched connections are checked for a disconnect (0 disables the watcher).
+DISCONNECT_POLL_SECONDS = float(os.environ.get("MCP_DISCONNECT_POLL_SECONDS", "0.25"))
+
+def deadline_from_request(tool_request, default_seconds=DEFAULT_DEADLINE_SECONDS, cancel_event=None):
+    """
+    Returns (Deadline, error) for a tool_request. error is a message for a malformed deadline_ms.
+    """
+    value = tool_request.get("deadline_ms")
+    if value is None:
+        seconds = default_seconds or None
+    elif isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        return None, "deadline_ms must be a positive number of milliseconds."
+    else:
+        seconds = value / 1000.0
+    if MAX_DEADLINE_SECONDS and (seconds is None or seconds > MAX_DEADLINE_SECONDS):
+        seconds = MAX_DEADLINE_SECONDS
+    return _deadline.Deadline(seconds, cancel_event), None
+
+def client_socket(environ):
+    """
+    The client connection behind a WSGI request, where the server exposes it (werkzeug, gunicorn).
+    """
+    return environ.get("werkzeug.socket") or environ.get("gunicorn.socket")
+
+def peer_closed(sock):
+    """
+    True once the client has closed its end. Unread data (a pipelined request) means it is still there.
+    """
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        return sock.recv(1, socket.MSG_PEEK) == b""
+    except (ValueError, BlockingIOError, InterruptedError):
+        # ValueError: a descriptor select() can't handle; assume the client is still there.
+        return False
+    except OSError:
+        return True
+
+class DisconnectWatcher:
+    """
+    One background thread that polls every watched connection and cancels the deadline of calls
+    whose client has gone.
+    """
+
+    def __init__(self, interval=DISCONNECT_POLL_SECONDS):
+        self.interval = interval
+        self._watched = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def watch(self, sock, deadline):
+        key = object()
+        with self._lock:
+            self._watched[key] = (sock, deadline)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="mcp-disconnect-watch", daemon=True)
+                self._thread.start()
+        return key
+
+    def unwatch(self, key):
+        with self._lock:
+            self._watched.pop(key, None)
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                watched = list(self._watched.values())
+            for sock, deadline in watched:
+                if not deadline.cancelled and peer_closed(sock):
+                    deadline.cancel("The client disconnected.")
+
+_WATCHER = DisconnectWatcher()
+
+@contextlib.contextmanager
+def watching_disconnect(environ, deadline):
+    """
+    Cancels deadline if the request's client disconnects during the block.
+    """
+    sock = client_socket(environ)
+    if sock is None or not DISCONNECT_POLL_SECONDS:
+        yield
+        return
+    key = _WATCHER.watch(sock, deadline)
+    try:
+        yield
+    finally:
+        _WATCHER.unwatch(key)
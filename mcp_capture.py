@@ -0,0 +1,120 @@
+# mcp_capture.py
+# Optional capture of /mcp tool calls for later replay (see benchmarks/replay.py).
+#
+# Enabled by MCP_CAPTURE_PATH. Each tool call becomes one compact JSON line with its payload (redacted
+# and size-capped), timings, response size and a digest of the tool output. The file rotates at
+# MCP_CAPTURE_MAX_BYTES, keeping MCP_CAPTURE_BACKUPS gzip-compressed segments. Records are written by a
+# background thread, so capture never blocks a request on disk I/O.
+
+import os
+import gzip
+import json
+import time
+import random
+import shutil
+import hashlib
+import logging
+import threading
+import logging.handlers
+
+import mcp_tracing
+from mcp_encoding import json_default
+
+CAPTURE_VERSION = 1
+CAPTURE_PATH = os.environ.get("MCP_CAPTURE_PATH", "")
+CAPTURE_MAX_BYTES = int(os.environ.get("MCP_CAPTURE_MAX_BYTES", str(64 * 1024 * 1024)))
+CAPTURE_BACKUPS = int(os.environ.get("MCP_CAPTURE_BACKUPS", "5"))
+CAPTURE_SAMPLE_RATE = float(os.environ.get("MCP_CAPTURE_SAMPLE_RATE", "1.0"))
+# Longest string value kept in a captured input; longer values are cut and the record is marked "truncated".
+CAPTURE_MAX_FIELD_CHARS = int(os.environ.get("MCP_CAPTURE_MAX_FIELD_CHARS", "65536"))
+CAPTURE_MAX_ITEMS = 1000
+CAPTURE_MAX_DEPTH = 16
+
+_logger = logging.getLogger("mcp_capture")
+_logger.propagate = False
+_configured = False
+_configure_lock = threading.Lock()
+
+class _CaptureFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.capture, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+def enabled():
+    return bool(CAPTURE_PATH)
+
+def _configure():
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(CAPTURE_PATH)), exist_ok=True)
+        writer = logging.handlers.RotatingFileHandler(CAPTURE_PATH, maxBytes=CAPTURE_MAX_BYTES, backupCount=CAPTURE_BACKUPS, encoding="utf-8")
+        writer.namer = _gzip_namer
+        writer.rotator = _gzip_rotator
+        writer.setFormatter(_CaptureFormatter())
+        handler, _ = mcp_tracing.queued(writer)
+        _logger.addHandler(handler)
+        _logger.setLevel(logging.INFO)
+        _configured = True
+
+def output_digest(output):
+    """
+    SHA-256 of the tool output as it appears in a JSON response, so replays can tell whether results changed.
+    """
+    try:
+        canonical = json.dumps(output, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=json_default)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def _output_status(output):
+    if isinstance(output, dict):
+        if "status" in output:
+            return output.get("status")
+        if "ran_successfully" in output:
+            return "success" if output["ran_successfully"] else "error"
+    return None
+
+def record(model, tool_name, tool_input, status_code, duration_ms, dispatch_ms, request_bytes, response_bytes, output=None, streamed=False):
+    """
+    Captures one tool call. A no-op unless MCP_CAPTURE_PATH is set.
+    """
+    if not CAPTURE_PATH or (CAPTURE_SAMPLE_RATE < 1.0 and random.random() >= CAPTURE_SAMPLE_RATE):
+        return
+    _configure()
+
+    notes = set()
+    captured_input = mcp_tracing.redact(
+        tool_input, max_chars=CAPTURE_MAX_FIELD_CHARS, max_items=CAPTURE_MAX_ITEMS, max_depth=CAPTURE_MAX_DEPTH, notes=notes
+    )
+    trace = mcp_tracing.current_trace()
+    entry = {
+        "v": CAPTURE_VERSION,
+        "ts": round(trace.wall_started if trace else time.time(), 6),
+        "request_id": trace.request_id if trace else None,
+        "model": model,
+        "tool": tool_name,
+        "input": captured_input,
+        "status_code": status_code,
+        "output_status": _output_status(output),
+        "duration_ms": round(duration_ms, 3),
+        "dispatch_ms": round(dispatch_ms, 3) if dispatch_ms is not None else None,
+        "request_bytes": request_bytes,
+        "response_bytes": response_bytes,
+    }
+    if streamed:
+        entry["streamed"] = True
+    else:
+        entry["output_sha256"] = output_digest(output)
+    if notes:
+        # The stored input no longer matches what was sent; replays should treat results as approximate.
+        entry["modified"] = sorted(notes)
+    _logger.info("capture", extra={"capture": entry})
@@ -0,0 +1,151 @@
+# mcp_encoding.py
+# Response encoding and content negotiation for the /mcp endpoint.
+#
+# JSON stays the default. Clients can ask for:
+#   - MessagePack (Accept: application/msgpack), which carries bytes values as raw binary
+#   - gzip or zstd compression (Accept-Encoding) for bodies above MCP_COMPRESS_MIN_BYTES
+# orjson, msgpack and zstandard are optional; without them the matching feature quietly falls back.
+
+import os
+import gzip
+import json
+import uuid
+import base64
+import decimal
+import datetime
+import dataclasses
+
+from flask import Response, request
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+# Bodies smaller than this are sent uncompressed; compressing them costs more than it saves.
+COMPRESS_MIN_BYTES = int(os.environ.get("MCP_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("MCP_GZIP_LEVEL", "5"))
+ZSTD_LEVEL = int(os.environ.get("MCP_ZSTD_LEVEL", "3"))
+
+def json_default(obj):
+    # JSON has no binary type, so bytes travel base64-encoded; use MessagePack to get them raw.
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(obj)).decode("ascii")
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    # The rest is what Flask's jsonify did for tool outputs, so the JSON contract stays the same.
+    if isinstance(obj, datetime.date):
+        return http_date(obj)
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _has_non_finite(obj):
+    if isinstance(obj, float):
+        return obj != obj or obj in (float("inf"), float("-inf"))
+    if isinstance(obj, dict):
+        return any(_has_non_finite(v) for v in obj.values())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return any(_has_non_finite(v) for v in obj)
+    return False
+
+def _stdlib_dumps(payload):
+    return json.dumps(payload, default=json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+def dumps_json(payload):
+    """
+    Serializes payload to JSON bytes, with orjson when it is installed. Payloads orjson can't encode
+    like the stdlib does (integers beyond 64 bits, NaN/Infinity, which it turns into null) go through
+    the stdlib encoder instead, so the output doesn't depend on whether orjson is installed.
+    """
+    if orjson is not None:
+        try:
+            # Dates and dataclasses go to json_default too; orjson's own formats differ from the stdlib path.
+            body = orjson.dumps(payload, default=json_default, option=_ORJSON_OPTIONS)
+        except TypeError:
+            return _stdlib_dumps(payload)
+        # NaN and Infinity come out as null; only look for them when there is a null at all.
+        if b"null" in body and _has_non_finite(payload):
+            return _stdlib_dumps(payload)
+        return body
+    return _stdlib_dumps(payload)
+
+def _msgpack_default(obj):
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not MessagePack serializable")
+
+def _accepts(accept, value):
+    """
+    True if a parsed Accept-style header names value explicitly with a non-zero quality.
+    Wildcards don't count: a browser's */* must keep getting JSON.
+    """
+    return any(item == value and quality > 0 for item, quality in accept)
+
+def wants_msgpack():
+    return msgpack is not None and any(_accepts(request.accept_mimetypes, m) for m in MSGPACK_MIMETYPES)
+
+def decode_request_body():
+    """
+    Returns the parsed request payload for JSON or MessagePack bodies, or None for anything else.
+    """
+    if request.is_json:
+        return request.get_json(silent=True)
+    if msgpack is not None and request.mimetype in MSGPACK_MIMETYPES:
+        try:
+            return msgpack.unpackb(request.get_data(cache=False), raw=False)
+        except Exception:
+            return None
+    return None
+
+def _compress(body):
+    """
+    Returns (body, content_encoding) using the best encoding the client accepts, or (body, None).
+    """
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    if zstandard is not None and _accepts(request.accept_encodings, "zstd"):
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body), "zstd"
+    if _accepts(request.accept_encodings, "gzip"):
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+    return body, None
+
+def encode_response(payload, status_code=200):
+    """
+    Builds the /mcp response for payload in the format and compression the client negotiated.
+    """
+    if wants_msgpack():
+        body = msgpack.packb(payload, use_bin_type=True, default=_msgpack_default)
+        mimetype = MSGPACK_MIMETYPES[0]
+    else:
+        body = dumps_json(payload)
+        mimetype = JSON_MIMETYPE
+
+    body, content_encoding = _compress(body)
+    response = Response(body, status=status_code, mimetype=mimetype)
+    if content_encoding:
+        response.headers["Content-Encoding"] = content_encoding
+    response.vary.add("Accept")
+    response.vary.add("Accept-Encoding")
+    return response
@@ -0,0 +1,324 @@
+# mcp_executors.py
+# Where a tool's run() executes. A tool picks its execution mode in get_meta():
+#
+#   "execution": {"mode": "inline"}                      # default: on the request thread
+#   "execution": {"mode": "thread", "workers": 4}        # a dedicated thread pool
+#   "execution": {"mode": "process", "workers": 2,       # a pool of worker processes (mcp_worker.py)
+#                 "max_memory_mb": 512,                  #   address-space cap per worker (0 = none)
+#                 "max_calls_per_worker": 100}           #   recycle a worker after N calls (0 = never)
+#
+# Thread pools bound how many calls of one tool run at once. Process pools move CPU-bound or leaky
+# tools off the server's GIL and heap: each worker is a long-lived process that loads the tool once,
+# takes calls over a pipe, and is killed and replaced when a call is aborted, it crashes, hits its
+# memory cap or reaches max_calls_per_worker.
+
+import os
+import sys
+import time
+import queue
+import signal
+import atexit
+import logging
+import weakref
+import threading
+import subprocess
+import contextvars
+import concurrent.futures
+
+import _deadline
+import mcp_metrics
+from mcp_worker import read_message, write_message
+
+DEFAULT_WORKERS = int(os.environ.get("MCP_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+# How long a new worker process may take to import its tool.
+WORKER_START_SECONDS = float(os.environ.get("MCP_WORKER_START_SECONDS", "30"))
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_worker.py")
+
+MODES = ("inline", "thread", "process")
+
+logger = logging.getLogger("mcp.executors")
+
+_ABORTS = {"DeadlineExceeded": _deadline.DeadlineExceeded, "Cancelled": _deadline.Cancelled}
+
+class ExecutionConfigError(ValueError):
+    """
+    get_meta()["execution"] is malformed. The tool is not loaded.
+    """
+
+class ToolProcessError(Exception):
+    """
+    A call in a worker process failed. str() is the tool's own error message, like an in-process call;
+    exception_type and remote_traceback describe the original exception.
+    """
+
+    def __init__(self, message, exception_type=None, remote_traceback="", fatal=False):
+        super().__init__(message)
+        self.exception_type = exception_type
+        self.remote_traceback = remote_traceback
+        self.fatal = fatal
+
+def _count(spec, key, default, tool_name, minimum):
+    value = spec.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+        raise ExecutionConfigError(f"Tool '{tool_name}': execution.{key} must be an integer >= {minimum}, not {value!r}")
+    return value
+
+def parse_execution(tool_name, meta):
+    """
+    Returns the normalized execution settings from get_meta(): {"mode", "workers", "max_memory_mb",
+    "max_calls_per_worker"}. A bare string is shorthand for {"mode": <string>}.
+    """
+    spec = (meta or {}).get("execution") or {}
+    if isinstance(spec, str):
+        spec = {"mode": spec}
+    if not isinstance(spec, dict):
+        raise ExecutionConfigError(f"Tool '{tool_name}': execution must be an object or a mode name")
+    mode = spec.get("mode", "inline")
+    if mode not in MODES:
+        raise ExecutionConfigError(f"Tool '{tool_name}': unknown execution mode {mode!r} (expected one of {', '.join(MODES)})")
+    return {
+        "mode": mode,
+        "workers": _count(spec, "workers", DEFAULT_WORKERS, tool_name, 1),
+        "max_memory_mb": _count(spec, "max_memory_mb", 0, tool_name, 0),
+        "max_calls_per_worker": _count(spec, "max_calls_per_worker", 0, tool_name, 0),
+    }
+
+def create(tool_name, module_path, run, meta, source):
+    """
+    The executor for a freshly loaded tool version, or None for inline tools (call run() directly).
+    source is the code that was loaded; process workers run exactly that, even if the file has changed
+    since. Raises ExecutionConfigError for malformed settings.
+    """
+    settings = parse_execution(tool_name, meta)
+    if settings["mode"] == "thread":
+        return ThreadExecutor(tool_name, run, settings["workers"])
+    if settings["mode"] == "process":
+        return ProcessExecutor(tool_name, module_path, source, settings["workers"], settings["max_memory_mb"], settings["max_calls_per_worker"])
+    return None
+
+def _wait_for_slot(slots):
+    while not slots.acquire(timeout=_deadline.POLL_SECONDS):
+        _deadline.check()
+
+class ThreadExecutor:
+    """
+    Runs calls on a dedicated pool of `workers` threads. The caller's deadline and trace travel with
+    the call (contextvars are copied), so the tool's own _deadline.check() calls still work. An aborted
+    call returns immediately; the thread finishes in the background at its next check.
+    """
+    mode = "thread"
+
+    def __init__(self, tool_name, run, workers):
+        self.tool_name = tool_name
+        self.run = run
+        self.workers = workers
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"tool-{tool_name}")
+
+    def call(self, tool_input):
+        future = self.pool.submit(contextvars.copy_context().run, self.run, tool_input)
+        while True:
+            done, _ = concurrent.futures.wait([future], timeout=_deadline.POLL_SECONDS)
+            if done:
+                return future.result()
+            try:
+                _deadline.check()
+            except _deadline.Aborted:
+                future.cancel()
+                raise
+
+    def close(self):
+        # Calls already queued still run: they belong to the version being replaced.
+        self.pool.shutdown(wait=False)
+
+class _WorkerProcess:
+    """
+    One `python mcp_worker.py` process hosting the tool. A pump thread turns its stdout into a queue of
+    replies, so waits can be short and notice an aborted call.
+    """
+
+    def __init__(self, tool_name, module_path, source, max_memory_mb):
+        self.tool_name = tool_name
+        self.calls = 0
+        self.proc = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT, tool_name, module_path, str(max_memory_mb)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            # Its own process group, so killing it also stops any subprocesses the tool started.
+            start_new_session=os.name == "posix",
+        )
+        self.replies = queue.Queue()
+        threading.Thread(target=self._pump, name=f"tool-{tool_name}-pump", daemon=True).start()
+        try:
+            write_message(self.proc.stdin, ("load", source))
+            reply = self._reply(WORKER_START_SECONDS)
+        except BaseException:
+            self.kill()
+            raise
+        if reply[0] != "ready":
+            self.kill()
+            raise ToolProcessError(f"Tool '{tool_name}' failed to load in a worker process: {reply[2]}", reply[1], reply[3], fatal=True)
+        self.pid = reply[1]
+
+    def _pump(self):
+        try:
+            while True:
+                message = read_message(self.proc.stdout)
+                self.replies.put(message)
+                if message is None:
+                    return
+        except Exception:
+            self.replies.put(None)
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def call(self, tool_input):
+        deadline = _deadline.current()
+        seconds = deadline.remaining() if deadline is not None else None
+        try:
+            write_message(self.proc.stdin, ("call", tool_input, seconds))
+        except (BrokenPipeError, OSError):
+            raise self._exited()
+        self.calls += 1
+        reply = self._reply()
+        if reply[0] == "ok":
+            return reply[1]
+        if reply[0] == "aborted":
+            raise _ABORTS.get(reply[1], _deadline.Aborted)(reply[2])
+        _, exception_type, message, remote_traceback, fatal = reply
+        raise ToolProcessError(message, exception_type, remote_traceback, fatal)
+
+    def _reply(self, timeout=None):
+        wait_until = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                reply = self.replies.get(timeout=_deadline.POLL_SECONDS)
+                break
+            except queue.Empty:
+                _deadline.check()
+                if wait_until is not None and time.monotonic() >= wait_until:
+                    raise ToolProcessError(f"Worker process for tool '{self.tool_name}' did not start within {timeout:g}s.", fatal=True)
+        if reply is None:
+            raise self._exited()
+        return reply
+
+    def _exited(self):
+        try:
+            code = self.proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            code = None
+        return ToolProcessError(f"Worker process for tool '{self.tool_name}' exited unexpectedly (exit code {code}).", fatal=True)
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=2)
+        except Exception:
+            pass
+        self.kill()
+
+    def kill(self):
+        if not self.alive():
+            return
+        try:
+            if os.name == "posix":
+                os.killpg(self.proc.pid, signal.SIGKILL)
+            else:
+                self.proc.kill()
+        except OSError:
+            pass
+        self.proc.wait()
+
+class ProcessExecutor:
+    """
+    Hands calls to idle worker processes, starting new ones on demand up to `workers`. A worker whose
+    call was aborted, that crashed or failed fatally is killed; one that reached max_calls_per_worker
+    is retired. Either way the next call starts a fresh one.
+    """
+    mode = "process"
+
+    def __init__(self, tool_name, module_path, source, workers, max_memory_mb=0, max_calls_per_worker=0):
+        self.tool_name = tool_name
+        self.module_path = os.path.abspath(module_path)
+        self.source = source
+        self.workers = workers
+        self.max_memory_mb = max_memory_mb
+        self.max_calls_per_worker = max_calls_per_worker
+        self.slots = threading.BoundedSemaphore(workers)
+        self.idle = queue.LifoQueue()
+        self.all = []
+        self.lock = threading.Lock()
+        self.closed = False
+        _OPEN.add(self)
+
+    def call(self, tool_input):
+        _wait_for_slot(self.slots)
+        try:
+            worker = self._checkout()
+            try:
+                output = worker.call(tool_input)
+            except ToolProcessError as e:
+                self._release(worker, "crashed" if e.fatal else None)
+                raise
+            except BaseException:
+                # Killed mid-call: its reply (if any) would answer the next caller.
+                self._release(worker, "aborted")
+                raise
+            self._release(worker)
+            return output
+        finally:
+            self.slots.release()
+
+    def _checkout(self):
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                worker = _WorkerProcess(self.tool_name, self.module_path, self.source, self.max_memory_mb)
+                with self.lock:
+                    self.all.append(worker)
+                mcp_metrics.TOOL_WORKERS.labels(self.tool_name).inc()
+                return worker
+            if worker.alive():
+                return worker
+            self._retire(worker, "crashed")
+
+    def _release(self, worker, discard_reason=None):
+        if discard_reason is None and self.max_calls_per_worker and worker.calls >= self.max_calls_per_worker:
+            discard_reason = "recycled"
+        if discard_reason is None and self.closed:
+            discard_reason = "closed"
+        if discard_reason is None:
+            self.idle.put(worker)
+        else:
+            self._retire(worker, discard_reason)
+
+    def _retire(self, worker, reason):
+        with self.lock:
+            if worker not in self.all:
+                return
+            self.all.remove(worker)
+        mcp_metrics.TOOL_WORKERS.labels(self.tool_name).dec()
+        mcp_metrics.TOOL_WORKER_EXITS.labels(self.tool_name, reason).inc()
+        if reason in ("recycled", "closed"):
+            worker.close()
+        else:
+            worker.kill()
+
+    def close(self):
+        """
+        Stops idle workers now; busy ones exit when their current call returns.
+        """
+        self.closed = True
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            self._retire(worker, "closed")
+
+_OPEN = weakref.WeakSet()
+
+@atexit.register
+def _close_all():
+    for executor in list(_OPEN):
+        executor.close()
@@ -0,0 +1,337 @@
+# mcp_jobs.py
+# Asynchronous tool calls: a /mcp request with "async": true returns a job id at once and the tool runs
+# on a worker pool. Jobs live in a SQLite database (MCP_JOB_DB), so results survive the client
+# disconnecting and the server restarting.
+#
+# States: queued -> running -> completed | failed | cancelled, or queued -> cancelled. A completed job's
+# output is exactly what the synchronous call would have returned (including {"status": "error", ...}
+# outputs); failed means the tool raised or ran past the job's deadline. Finished jobs are deleted
+# MCP_JOB_RETENTION_SECONDS after they finish.
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import tempfile
+import threading
+import concurrent.futures
+
+import mcp_metrics
+from mcp_encoding import json_default
+
+JOB_DB = os.environ.get("MCP_JOB_DB") or os.path.join(tempfile.gettempdir(), "mcp_jobs.sqlite3")
+JOB_WORKERS = int(os.environ.get("MCP_JOB_WORKERS", "4"))
+# Submissions beyond this many queued jobs are refused (HTTP 503) rather than piling up.
+JOB_MAX_QUEUED = int(os.environ.get("MCP_JOB_MAX_QUEUED", "1000"))
+JOB_RETENTION_SECONDS = float(os.environ.get("MCP_JOB_RETENTION_SECONDS", str(24 * 3600)))
+# Longest a single long-poll (?wait=) may hold a request open.
+JOB_MAX_WAIT_SECONDS = float(os.environ.get("MCP_JOB_MAX_WAIT_SECONDS", "60"))
+CLEANUP_INTERVAL_SECONDS = 60
+
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = "queued", "running", "completed", "failed", "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    tool TEXT NOT NULL,
+    model TEXT,
+    input TEXT,
+    state TEXT NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    output TEXT,
+    error TEXT,
+    trace_id TEXT,
+    expires REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state_finished ON jobs (state, finished);
+"""
+
+logger = logging.getLogger("mcp.jobs")
+
+class QueueFull(Exception):
+    pass
+
+class JobRunning(Exception):
+    pass
+
+# Columns added after the first release, created on older databases at startup.
+_ADDED_COLUMNS = {"expires": "REAL"}
+
+_runner = None
+_executor = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+_schema_ready = False
+_schema_lock = threading.Lock()
+# Notified whenever any job changes state; long-polls and streams wait on it. _version counts the changes.
+_changed = threading.Condition()
+_version = 0
+_last_cleanup = 0.0
+# Cancellation flags of the jobs this process is running, by id.
+_running = {}
+_running_lock = threading.Lock()
+
+def init(runner):
+    """
+    Registers runner(job) -> output, which executes a job's tool call on a worker thread.
+    job carries id, tool, model, input and trace_id.
+    """
+    global _runner
+    _runner = runner
+
+def _db():
+    global _schema_ready
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(os.path.abspath(JOB_DB)), exist_ok=True)
+        conn = sqlite3.connect(JOB_DB, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+    if not _schema_ready:
+        with _schema_lock:
+            if not _schema_ready:
+                conn.executescript(_SCHEMA)
+                columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+                for name, kind in _ADDED_COLUMNS.items():
+                    if name not in columns:
+                        conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+                _schema_ready = True
+    return conn
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="mcp-job")
+        return _executor
+
+def _notify():
+    global _version
+    with _changed:
+        _version += 1
+        _changed.notify_all()
+
+def view(row, with_output=True):
+    """
+    The client-facing form of a job row.
+    """
+    job = {
+        "id": row["id"],
+        "tool": row["tool"],
+        "state": row["state"],
+        "created": row["created"],
+        "started": row["started"],
+        "finished": row["finished"],
+    }
+    if with_output and row["state"] == COMPLETED and row["output"] is not None:
+        job["output"] = json.loads(row["output"])
+    if row["error"] is not None:
+        job["error"] = row["error"]
+    return job
+
+def submit(tool_name, tool_input, model=None, trace_id=None, deadline_seconds=None):
+    """
+    Stores a queued job and schedules it. Returns the job view. Raises QueueFull past JOB_MAX_QUEUED.
+    deadline_seconds counts from submission, so time spent queued uses up the job's budget.
+    """
+    _maybe_cleanup()
+    conn = _db()
+    queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE state = ?", (QUEUED,)).fetchone()[0]
+    if queued >= JOB_MAX_QUEUED:
+        raise QueueFull(f"Too many queued jobs ({queued}); try again later.")
+    job_id = uuid.uuid4().hex
+    created = time.time()
+    expires = created + deadline_seconds if deadline_seconds is not None else None
+    conn.execute(
+        "INSERT INTO jobs (id, tool, model, input, state, created, trace_id, expires) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (job_id, tool_name, model, json.dumps(tool_input, default=json_default), QUEUED, created, trace_id, expires),
+    )
+    mcp_metrics.JOBS_QUEUED.labels().inc()
+    _pool().submit(_run, job_id)
+    return get(job_id)
+
+def _claim(job_id):
+    # The conditional update makes the queued -> running transition happen once, even if two server
+    # processes share the database or a cancel races with a worker.
+    conn = _db()
+    now = time.time()
+    expired = conn.execute(
+        "UPDATE jobs SET state = ?, finished = ?, error = ?, input = NULL WHERE id = ? AND state = ? AND expires <= ?",
+        (FAILED, now, "The job's deadline passed before it started.", job_id, QUEUED, now),
+    ).rowcount
+    if expired:
+        mcp_metrics.JOBS_QUEUED.labels().dec()
+        mcp_metrics.JOBS.labels(conn.execute("SELECT tool FROM jobs WHERE id = ?", (job_id,)).fetchone()["tool"], FAILED).inc()
+        _notify()
+        return None
+    claimed = conn.execute(
+        "UPDATE jobs SET state = ?, started = ? WHERE id = ? AND state = ?", (RUNNING, time.time(), job_id, QUEUED)
+    ).rowcount
+    if not claimed:
+        return None
+    mcp_metrics.JOBS_QUEUED.labels().dec()
+    return conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+def _run(job_id):
+    row = _claim(job_id)
+    if row is None:
+        return
+    cancel_event = threading.Event()
+    with _running_lock:
+        _running[job_id] = cancel_event
+    _notify()
+    job = {
+        "id": row["id"], "tool": row["tool"], "model": row["model"], "input": json.loads(row["input"]),
+        "trace_id": row["trace_id"], "expires": row["expires"], "cancel_event": cancel_event,
+    }
+    state, output, error = COMPLETED, None, None
+    try:
+        output = json.dumps(_runner(job), default=json_default)
+    except BaseException as e:
+        # Cancellation is a BaseException (see tools/_deadline.py); whatever stopped the tool, the job
+        # must still be finished.
+        state = CANCELLED if cancel_event.is_set() else FAILED
+        error = str(e) or type(e).__name__
+    finally:
+        with _running_lock:
+            _running.pop(job_id, None)
+    # Inputs can hold secrets and large payloads; they are only needed until the job has run.
+    _db().execute(
+        "UPDATE jobs SET state = ?, finished = ?, output = ?, error = ?, input = NULL WHERE id = ?",
+        (state, time.time(), output, error, job_id),
+    )
+    mcp_metrics.JOBS.labels(row["tool"], state).inc()
+    _notify()
+
+def get(job_id, with_output=True):
+    row = _db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return view(row, with_output) if row is not None else None
+
+def wait(job_id, timeout):
+    """
+    Long-poll: returns the job once it has finished, or as it is when timeout (capped at
+    JOB_MAX_WAIT_SECONDS) runs out. None if there is no such job.
+    """
+    deadline = time.monotonic() + max(0.0, min(timeout, JOB_MAX_WAIT_SECONDS))
+    with _changed:
+        # Reading under the condition's lock means a change can't slip in between the read and the wait.
+        while True:
+            job = get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["state"] in FINISHED_STATES or remaining <= 0:
+                return job
+            # Bounded waits also pick up jobs finished by another process sharing the database.
+            _changed.wait(min(remaining, 1.0))
+
+def watch(job_id, heartbeat=15.0):
+    """
+    Yields the job each time its state changes, ending with its finished form; yields None as a
+    heartbeat when nothing changed for heartbeat seconds.
+    """
+    last_state = None
+    idle_since = time.monotonic()
+    while True:
+        seen = _version
+        job = get(job_id, with_output=False)
+        if job is None:
+            return
+        if job["state"] in FINISHED_STATES:
+            yield get(job_id)
+            return
+        if job["state"] != last_state:
+            last_state = job["state"]
+            idle_since = time.monotonic()
+            yield job
+        elif time.monotonic() - idle_since >= heartbeat:
+            idle_since = time.monotonic()
+            yield None
+        with _changed:
+            _changed.wait_for(lambda: _version != seen, timeout=1.0)
+
+def list_jobs(state=None, tool=None, limit=100):
+    query, params = "SELECT * FROM jobs", []
+    clauses = []
+    if state:
+        clauses.append("state = ?")
+        params.append(state)
+    if tool:
+        clauses.append("tool = ?")
+        params.append(tool)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY created DESC LIMIT ?"
+    params.append(max(1, min(int(limit), 1000)))
+    return [view(row, with_output=False) for row in _db().execute(query, params)]
+
+def cancel(job_id):
+    """
+    Cancels a queued job, asks a job running in this process to stop (it ends as cancelled once the
+    tool notices), or deletes a finished one. Returns the job, or None if there is no such job.
+    Raises JobRunning for a job another process is running.
+    """
+    conn = _db()
+    cancelled = conn.execute(
+        "UPDATE jobs SET state = ?, finished = ?, input = NULL WHERE id = ? AND state = ?",
+        (CANCELLED, time.time(), job_id, QUEUED),
+    ).rowcount
+    if cancelled:
+        mcp_metrics.JOBS_QUEUED.labels().dec()
+        _notify()
+        return get(job_id)
+    job = get(job_id, with_output=False)
+    if job is None:
+        return None
+    if job["state"] == RUNNING:
+        with _running_lock:
+            cancel_event = _running.get(job_id)
+        if cancel_event is None:
+            raise JobRunning(f"Job '{job_id}' is running in another server process.")
+        cancel_event.set()
+        return job
+    conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+    return job
+
+def recover():
+    """
+    Called at startup: reschedules jobs left queued by a previous run and fails the ones it was
+    running, since their tools may have been interrupted halfway.
+    """
+    conn = _db()
+    interrupted = conn.execute(
+        "UPDATE jobs SET state = ?, finished = ?, error = ?, input = NULL WHERE state = ?",
+        (FAILED, time.time(), "The server stopped while this job was running.", RUNNING),
+    ).rowcount
+    queued = [row["id"] for row in conn.execute("SELECT id FROM jobs WHERE state = ? ORDER BY created", (QUEUED,))]
+    for job_id in queued:
+        mcp_metrics.JOBS_QUEUED.labels().inc()
+        _pool().submit(_run, job_id)
+    if interrupted or queued:
+        logger.warning("Recovered jobs: %d requeued, %d interrupted", len(queued), interrupted)
+    cleanup()
+
+def cleanup(now=None):
+    """
+    Deletes jobs that finished more than JOB_RETENTION_SECONDS ago. Returns how many were removed.
+    """
+    global _last_cleanup
+    now = time.time() if now is None else now
+    _last_cleanup = now
+    placeholders = ",".join("?" * len(FINISHED_STATES))
+    removed = _db().execute(
+        f"DELETE FROM jobs WHERE state IN ({placeholders}) AND finished < ?",
+        (*FINISHED_STATES, now - JOB_RETENTION_SECONDS),
+    ).rowcount
+    if removed:
+        logger.info("Removed %d expired jobs", removed)
+    return removed
+
+def _maybe_cleanup():
+    if time.time() - _last_cleanup >= CLEANUP_INTERVAL_SECONDS:
+        cleanup()
@@ -0,0 +1,217 @@
+# mcp_metrics.py
+# A small in-process metrics registry with Prometheus text exposition, served on /metrics.
+
+import bisect
+import threading
+
+# Seconds. Covers in-memory tools (sub-millisecond) up to long subprocess/Gemini calls.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+# Bytes, 64 B .. 256 MiB in powers of four.
+SIZE_BUCKETS = tuple(64 * 4 ** i for i in range(12))
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + [f'{n}="{_escape(v)}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def labels(self, *values):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        key = tuple(str(v) for v in values)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+            return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in sorted(children):
+            lines.extend(child.expose(self.name, self.labelnames, key))
+        return lines
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def expose(self, name, labelnames, key):
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(self.value)}"]
+
+class _GaugeChild(_CounterChild):
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if index < len(self.counts):
+                self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def expose(self, name, labelnames, key):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        lines = []
+        cumulative = 0
+        for bound, c in zip(self.buckets, counts):
+            cumulative += c
+            lines.append(f"{name}_bucket{_format_labels(labelnames, key, [('le', _format_value(float(bound)))])} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labelnames, key, [('le', '+Inf')])} {count}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(float(total))}")
+        lines.append(f"{name}_count{_format_labels(labelnames, key)} {count}")
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+class Registry:
+    """
+    Holds metrics plus collector callbacks that produce extra samples at scrape time.
+    A collector returns an iterable of (name, kind, help, labels_dict, value).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Re-importing a module (e.g. a hot reload) must not reset or duplicate its metrics.
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def register_collector(self, collector):
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def expose(self):
+        """
+        Returns all metrics in the Prometheus text exposition format (version 0.0.4).
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+
+        collected = {}
+        for collector in collectors:
+            try:
+                samples = list(collector())
+            except Exception:
+                # A broken collector must not take the whole endpoint down.
+                continue
+            for name, kind, help_text, labels, value in samples:
+                collected.setdefault((name, kind, help_text), []).append((labels, value))
+        for (name, kind, help_text), samples in sorted(collected.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# --- Server metrics ---
+TOOL_CALLS = REGISTRY.counter("mcp_tool_calls_total", "Tool calls dispatched through /mcp or the JSON-RPC transport (mcp_rpc.py).", ["tool"])
+TOOL_ERRORS = REGISTRY.counter("mcp_tool_errors_total", "Tool calls that raised (kind=exception), returned status=error (kind=status), ran out of time (kind=deadline), were cancelled (kind=cancelled) or failed input_schema validation (kind=invalid_input).", ["tool", "kind"])
+TOOL_LATENCY = REGISTRY.histogram("mcp_tool_duration_seconds", "Time spent running a tool call.", ["tool"])
+NESTED_TOOL_CALLS = REGISTRY.counter("mcp_nested_tool_calls_total", "Tool calls made by other tools through tools/_invoke.py.", ["tool"])
+TOOL_IN_FLIGHT = REGISTRY.gauge("mcp_tool_in_flight", "Tool calls currently running.", ["tool"])
+REQUEST_BYTES = REGISTRY.histogram("mcp_request_bytes", "Size of /mcp request bodies.", ["tool"], buckets=SIZE_BUCKETS)
+RESPONSE_BYTES = REGISTRY.histogram("mcp_response_bytes", "Size of /mcp response bodies as sent (after compression).", ["tool"], buckets=SIZE_BUCKETS)
+TOOL_LOADS = REGISTRY.counter("mcp_tool_loads_total", "Tool module loads and reloads.", ["tool", "outcome"])
+TOOL_LOAD_LATENCY = REGISTRY.histogram("mcp_tool_load_duration_seconds", "Time spent loading or reloading a tool module.", ["tool"])
+TOOL_WORKERS = REGISTRY.gauge("mcp_tool_worker_processes", "Live worker processes of tools using the process execution mode.", ["tool"])
+TOOL_WORKER_EXITS = REGISTRY.counter("mcp_tool_worker_exits_total", "Worker processes stopped, by reason (recycled, aborted, crashed, closed).", ["tool", "reason"])
+JOBS = REGISTRY.counter("mcp_jobs_total", "Asynchronous jobs that finished, by final state.", ["tool", "state"])
+JOBS_QUEUED = REGISTRY.gauge("mcp_jobs_queued", "Asynchronous jobs waiting for a worker.")
+LOG_RECORDS_DROPPED = REGISTRY.counter("mcp_log_records_dropped_total", "Log records dropped because the background log queue was full.")
+
+def cache_samples(source, caches):
+    """
+    Turns {"cache_name": {"hits": n, "misses": m}} into collector samples, including a hit ratio gauge.
+    """
+    for cache, stats in caches.items():
+        hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+        labels = {"source": source, "cache": cache}
+        yield "mcp_cache_hits_total", "counter", "Cache hits reported by tools and shared helpers.", labels, hits
+        yield "mcp_cache_misses_total", "counter", "Cache misses reported by tools and shared helpers.", labels, misses
+        if hits + misses:
+            yield "mcp_cache_hit_ratio", "gauge", "Cache hits / (hits + misses) since process start.", labels, hits / (hits + misses)
@@ -0,0 +1,215 @@
+# mcp_profiling.py
+# Opt-in profiling of single /mcp tool calls with cProfile (cpu) and tracemalloc (mem).
+#
+# Off unless the server sets MCP_PROFILING=1. A client then asks for a profile with an
+# X-MCP-Profile header (e.g. "cpu", "mem" or "cpu,mem") or a "_profile" key in tool_input.
+# If MCP_PROFILING_TOKEN is set, the request must also carry it in X-MCP-Profile-Token.
+
+import os
+import re
+import hmac
+import json
+import pstats
+import cProfile
+import tempfile
+import threading
+import contextlib
+import tracemalloc
+
+PROFILING_ENABLED = os.environ.get("MCP_PROFILING", "").lower() in ("1", "true", "yes", "on")
+PROFILING_TOKEN = os.environ.get("MCP_PROFILING_TOKEN", "")
+PROFILE_TOP_N = int(os.environ.get("MCP_PROFILE_TOP_N", "20"))
+PROFILE_DIR = os.environ.get("MCP_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "mcp_profiles")
+# Oldest artifacts beyond this many are deleted.
+PROFILE_KEEP = int(os.environ.get("MCP_PROFILE_KEEP", "50"))
+# tracemalloc frames kept per allocation; more frames cost more overhead while profiling.
+TRACEMALLOC_FRAMES = 1
+
+MODES = ("cpu", "mem")
+INPUT_FLAG = "_profile"
+_ARTIFACT_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+# cProfile and tracemalloc are process-wide, so only one request is profiled at a time.
+_PROFILE_LOCK = threading.Lock()
+
+def parse_modes(value):
+    """
+    Turns a header or tool_input flag value into a set of modes. True/"1"/"all" means every mode.
+    Raises ValueError for unknown modes.
+    """
+    if value is None or value is False:
+        return set()
+    if value is True or (isinstance(value, str) and value.strip().lower() in ("1", "true", "all")):
+        return set(MODES)
+    items = value.split(",") if isinstance(value, str) else value
+    modes = {str(item).strip().lower() for item in items if str(item).strip()}
+    unknown = modes.difference(MODES)
+    if unknown:
+        raise ValueError(f"Unknown profile mode(s): {', '.join(sorted(unknown))}. Use one of {MODES}.")
+    return modes
+
+def authorized(headers):
+    if not PROFILING_ENABLED:
+        return False
+    if not PROFILING_TOKEN:
+        return True
+    return hmac.compare_digest(headers.get("X-MCP-Profile-Token", ""), PROFILING_TOKEN)
+
+def requested_modes(headers, tool_input):
+    """
+    Returns (modes, tool_input without the profile flag, error). error is set when profiling was asked
+    for but is disabled, unauthorized or malformed; the tool call itself still runs unprofiled.
+    """
+    flag = None
+    if isinstance(tool_input, dict) and INPUT_FLAG in tool_input:
+        tool_input = dict(tool_input)
+        flag = tool_input.pop(INPUT_FLAG)
+    header = headers.get("X-MCP-Profile")
+    if header is None and flag is None:
+        return set(), tool_input, None
+
+    try:
+        modes = parse_modes(header) | parse_modes(flag)
+    except ValueError as e:
+        return set(), tool_input, str(e)
+    if not modes:
+        return set(), tool_input, None
+    if not PROFILING_ENABLED:
+        return set(), tool_input, "Profiling is disabled on this server (set MCP_PROFILING=1)."
+    if not authorized(headers):
+        return set(), tool_input, "Profiling requires a valid X-MCP-Profile-Token header."
+    return modes, tool_input, None
+
+# ---------- Summaries ----------
+
+def _cpu_summary(profiler, top_n):
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, func), (primitive, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({func})",
+            "calls": calls,
+            "primitive_calls": primitive,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        })
+    rows.sort(key=lambda r: r["cumtime_ms"], reverse=True)
+    return {
+        "total_calls": stats.total_calls,
+        "total_time_ms": round(stats.total_tt * 1000, 3),
+        "top_cumulative": rows[:top_n],
+    }
+
+def _mem_summary(before, after, peak, top_n):
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+    diffs = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+    top = []
+    for diff in diffs[:top_n]:
+        frame = diff.traceback[0]
+        top.append({
+            "location": f"{frame.filename}:{frame.lineno}",
+            "size_diff_bytes": diff.size_diff,
+            "count_diff": diff.count_diff,
+            "size_bytes": diff.size,
+        })
+    return {
+        "allocated_bytes": sum(d.size_diff for d in diffs),
+        "peak_bytes": peak,
+        "top_allocations": top,
+    }
+
+# ---------- Profiling ----------
+
+@contextlib.contextmanager
+def profile(modes, artifact_id=None, top_n=PROFILE_TOP_N):
+    """
+    Profiles the enclosed block and fills the yielded dict with a top-N summary.
+    With an artifact_id, the summary (and the raw cpu profile) are also stored for later retrieval.
+    """
+    result = {"modes": sorted(modes)}
+    if not _PROFILE_LOCK.acquire(blocking=False):
+        result["error"] = "Another request is being profiled; this call ran unprofiled."
+        yield result
+        return
+
+    try:
+        profiler = cProfile.Profile() if "cpu" in modes else None
+        started_tracing = False
+        before = None
+        if "mem" in modes:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                started_tracing = True
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield result
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            if before is not None:
+                after = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                if started_tracing:
+                    tracemalloc.stop()
+                result["mem"] = _mem_summary(before, after, peak, top_n)
+            if profiler is not None:
+                result["cpu"] = _cpu_summary(profiler, top_n)
+            if artifact_id:
+                _store_artifact(artifact_id, result, profiler)
+    finally:
+        _PROFILE_LOCK.release()
+
+# ---------- Artifacts ----------
+
+def _artifact_paths(artifact_id):
+    if not _ARTIFACT_ID.match(artifact_id or ""):
+        return None, None
+    return os.path.join(PROFILE_DIR, f"{artifact_id}.json"), os.path.join(PROFILE_DIR, f"{artifact_id}.prof")
+
+def _store_artifact(artifact_id, summary, profiler):
+    summary_path, pstats_path = _artifact_paths(artifact_id)
+    if summary_path is None:
+        return
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if profiler is not None:
+            profiler.dump_stats(pstats_path)
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f)
+        summary["artifact_id"] = artifact_id
+        _prune_artifacts()
+    except OSError as e:
+        summary["artifact_error"] = str(e)
+
+def _prune_artifacts():
+    try:
+        with os.scandir(PROFILE_DIR) as it:
+            summaries = [e for e in it if e.name.endswith(".json") and e.is_file()]
+    except OSError:
+        return
+    summaries.sort(key=lambda e: e.stat().st_mtime)
+    for entry in summaries[:max(0, len(summaries) - PROFILE_KEEP)]:
+        for path in (entry.path, entry.path[:-len(".json")] + ".prof"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def load_artifact(artifact_id, raw=False):
+    """
+    Returns the stored summary dict, or the raw pstats file path when raw is true. None if it doesn't exist.
+    """
+    summary_path, pstats_path = _artifact_paths(artifact_id)
+    if summary_path is None:
+        return None
+    if raw:
+        return pstats_path if os.path.isfile(pstats_path) else None
+    try:
+        with open(summary_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,252 @@
+# mcp_pyexec.py
+# The machinery behind the built-in python_executor tool.
+#
+# Compiled snippets are kept in an LRU cache keyed by the hash of their source, so code that agents
+# resubmit (retries, re-runs) skips parsing and compilation. Output is captured per call rather than by
+# swapping sys.stdout for the whole process: sys.stdout is replaced once by a proxy that writes to the
+# current call's capture, so concurrent snippets don't steal each other's output (or the server's).
+#
+# A capture keeps the first MCP_PYEXEC_HEAD_BYTES and the last MCP_PYEXEC_TAIL_BYTES of the output in
+# memory. Whatever falls in between is spilled to a temp file (up to MCP_PYEXEC_SPILL_MAX_BYTES), so a
+# print loop costs disk, not server memory.
+
+import io
+import os
+import sys
+import time
+import hashlib
+import tempfile
+import threading
+import contextvars
+from collections import OrderedDict
+
+CACHE_SIZE = int(os.environ.get("MCP_PYEXEC_CACHE_SIZE", "256"))
+HEAD_BYTES = int(os.environ.get("MCP_PYEXEC_HEAD_BYTES", str(64 * 1024)))
+TAIL_BYTES = int(os.environ.get("MCP_PYEXEC_TAIL_BYTES", str(64 * 1024)))
+# Largest spill file per call (0 = don't spill; the middle of long output is dropped).
+SPILL_MAX_BYTES = int(os.environ.get("MCP_PYEXEC_SPILL_MAX_BYTES", str(256 * 1024 * 1024)))
+SPILL_DIR = os.environ.get("MCP_PYEXEC_SPILL_DIR") or tempfile.gettempdir()
+# Spill files older than this are deleted when a new one is created.
+SPILL_RETENTION_SECONDS = float(os.environ.get("MCP_PYEXEC_SPILL_RETENTION_SECONDS", "3600"))
+SPILL_PREFIX = "mcp-pyexec-"
+
+_CODE_CACHE = OrderedDict()
+_CODE_CACHE_LOCK = threading.Lock()
+_CODE_CACHE_STATS = {"hits": 0, "misses": 0}
+
+def compile_snippet(source):
+    """
+    The code object for source, compiled once per distinct source. SyntaxErrors are not cached.
+    """
+    key = hashlib.sha256(source.encode("utf-8", "surrogatepass")).digest()
+    with _CODE_CACHE_LOCK:
+        code = _CODE_CACHE.get(key)
+        if code is not None:
+            _CODE_CACHE_STATS["hits"] += 1
+            _CODE_CACHE.move_to_end(key)
+            return code
+        _CODE_CACHE_STATS["misses"] += 1
+    # Same filename as exec(str), so tracebacks read as they always have.
+    code = compile(source, "<string>", "exec")
+    if CACHE_SIZE > 0:
+        with _CODE_CACHE_LOCK:
+            _CODE_CACHE[key] = code
+            _CODE_CACHE.move_to_end(key)
+            while len(_CODE_CACHE) > CACHE_SIZE:
+                _CODE_CACHE.popitem(last=False)
+    return code
+
+def get_stats():
+    """
+    Cache counters in the shape the server's /metrics collector expects.
+    """
+    with _CODE_CACHE_LOCK:
+        return {"caches": {"bytecode": dict(_CODE_CACHE_STATS, size=len(_CODE_CACHE))}}
+
+class BoundedCapture(io.TextIOBase):
+    """
+    A text sink that keeps the head and tail of what is written (as UTF-8) and spills the middle to a
+    temp file. total_bytes counts everything written. Threads the snippet started may write to it too.
+    """
+
+    def __init__(self, head_bytes=HEAD_BYTES, tail_bytes=TAIL_BYTES, spill_max_bytes=SPILL_MAX_BYTES):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.spill_max_bytes = spill_max_bytes
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total_bytes = 0
+        self.spilled_bytes = 0
+        self.spill = None
+        self.spill_path = None
+        self.lock = threading.Lock()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        data = text.encode("utf-8", "replace")
+        with self.lock:
+            if self.closed:
+                # A thread the snippet started, still printing after the call returned.
+                return len(text)
+            self.total_bytes += len(data)
+            room = self.head_bytes - len(self.head)
+            if room > 0:
+                self.head += data[:room]
+                data = data[room:]
+            if data:
+                self.tail += data
+                overflow = len(self.tail) - self.tail_bytes
+                if overflow > 0:
+                    self._spill(self.tail[:overflow])
+                    del self.tail[:overflow]
+        return len(text)
+
+    def _spill(self, data):
+        room = self.spill_max_bytes - self.spilled_bytes
+        if room <= 0:
+            return
+        if self.spill is None:
+            _remove_old_spills()
+            fd, self.spill_path = tempfile.mkstemp(prefix=SPILL_PREFIX, suffix=".txt", dir=SPILL_DIR)
+            self.spill = os.fdopen(fd, "wb")
+            # The head is part of the full output too; the file holds everything up to the tail.
+            self.spill.write(self.head)
+        data = data[:room]
+        self.spill.write(data)
+        self.spilled_bytes += len(data)
+
+    @property
+    def truncated(self):
+        return self.total_bytes > len(self.head) + len(self.tail)
+
+    def getvalue(self):
+        """
+        The captured text. When the middle was cut, a marker line says how much and where it went.
+        """
+        # A cut can fall inside a multi-byte character; drop the partial bytes at the edges.
+        head = self.head.decode("utf-8", "ignore")
+        tail = self.tail.decode("utf-8", "ignore")
+        if not self.truncated:
+            return head + tail
+        omitted = self.total_bytes - len(self.head) - len(self.tail)
+        where = f"; written to {self.spill_path}" if self.spill_path else ""
+        if self.spill_path and self.spilled_bytes < omitted:
+            where += f" (first {self.spilled_bytes} bytes only)"
+        return f"{head}\n... [{omitted} bytes of output omitted{where}] ...\n{tail}"
+
+    def close(self):
+        with self.lock:
+            if self.spill is not None:
+                # The tail completes the spill file, so it holds the output from the start.
+                if self.spilled_bytes < self.spill_max_bytes:
+                    self.spill.write(self.tail)
+                self.spill.close()
+                self.spill = None
+            super().close()
+
+    def discard(self):
+        """
+        Closes the capture and deletes its spill file, for output nobody will see.
+        """
+        self.close()
+        if self.spill_path:
+            try:
+                os.remove(self.spill_path)
+            except OSError:
+                pass
+            self.spill_path = None
+
+def _remove_old_spills():
+    cutoff = time.time() - SPILL_RETENTION_SECONDS
+    try:
+        entries = list(os.scandir(SPILL_DIR))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.startswith(SPILL_PREFIX):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+_SINK = contextvars.ContextVar("mcp_pyexec_stdout", default=None)
+
+class _StdoutProxy:
+    """
+    Stands in for sys.stdout: writes go to the running snippet's capture, or to the real stdout when
+    there is none (the server's own output, other tools) or it has been closed (a thread the snippet
+    started that outlives the call).
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def _target(self):
+        sink = _SINK.get()
+        return sink if sink is not None and not sink.closed else self._stream
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def writelines(self, lines):
+        target = self._target()
+        for line in lines:
+            target.write(line)
+
+    def flush(self):
+        target = self._target()
+        if target is self._stream:
+            target.flush()
+
+    def __getattr__(self, name):
+        # encoding, fileno(), isatty(), buffer, ... come from the real stream.
+        return getattr(self._stream, name)
+
+_INSTALL_LOCK = threading.Lock()
+_thread_start = threading.Thread.start
+
+def _start_with_sink(thread):
+    """
+    Thread.start() that hands the starting thread's capture to the new thread: threads don't inherit
+    contextvars, so a snippet's worker threads would otherwise print to the server's stdout.
+    """
+    sink = _SINK.get()
+    if sink is not None:
+        run = thread.run
+
+        def run_with_sink():
+            _SINK.set(sink)
+            run()
+
+        thread.run = run_with_sink
+    return _thread_start(thread)
+
+def _install_proxy():
+    with _INSTALL_LOCK:
+        if not isinstance(sys.stdout, _StdoutProxy):
+            sys.stdout = _StdoutProxy(sys.stdout)
+            threading.Thread.start = _start_with_sink
+
+def run_snippet(source):
+    """
+    Executes source in fresh globals with its stdout captured, and returns the closed capture. If the
+    snippet raises, its capture is discarded and the exception propagates.
+    """
+    code = compile_snippet(source)
+    _install_proxy()
+    capture = BoundedCapture()
+    token = _SINK.set(capture)
+    try:
+        exec(code, {})
+    except BaseException:
+        capture.discard()
+        raise
+    finally:
+        _SINK.reset(token)
+    capture.close()
+    return capture
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+
+# mcp_rpc.py
+# A second transport for the same tool registry: JSON-RPC 2.0 over stdio or a Unix socket, for local
+# agents that would otherwise pay for an HTTP request per tool call.
+#
+#   python mcp_rpc.py                         # serve one client on stdin/stdout
+#   python mcp_rpc.py --socket /tmp/mcp.sock  # serve any number of local clients
+#
+# One JSON message per line. Requests are pipelined: each one is started as soon as it is read, and its
+# response is written when it finishes, so responses can arrive out of order (match them by "id").
+#
+# Methods:
+#   tools/list                                 -> {"tools": [{"name", "description", "inputSchema", "version"}]}
+#   tools/call {"name", "arguments", "deadline_ms"}  -> {"output": <what run() returned>}
+#   ping                                       -> {}
+# Notification "notifications/cancelled" {"requestId", "reason"} cancels a call that is still running.
+
+import os
+import sys
+import json
+import socket
+import signal
+import logging
+import argparse
+import threading
+import socketserver
+import concurrent.futures
+
+import mcp
+import mcp_metrics
+import mcp_tracing
+import mcp_cancellation
+import _deadline
+from mcp_encoding import dumps_json
+
+# Calls running at once, across all connections; later requests wait for a free worker.
+RPC_WORKERS = int(os.environ.get("MCP_RPC_WORKERS", "16"))
+MAX_MESSAGE_BYTES = int(os.environ.get("MCP_RPC_MAX_MESSAGE_BYTES", str(mcp.MAX_BODY_BYTES)))
+
+# JSON-RPC 2.0 error codes, plus the ones this server uses for tool failures.
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+TOOL_ERROR = -32000
+DEADLINE_EXCEEDED = -32001
+REQUEST_CANCELLED = -32800
+
+logger = logging.getLogger("mcp.rpc")
+
+class RpcError(Exception):
+    def __init__(self, code, message, data=None):
+        super().__init__(message)
+        self.code = code
+        self.data = data
+
+def list_tools():
+    tools = [{
+        "name": "python_executor",
+        "description": "Executes a string of Python code and returns what it printed.",
+        "inputSchema": mcp.PYTHON_EXECUTOR_SCHEMA,
+        "version": "builtin",
+    }]
+    for tool_name, record in sorted(mcp.TOOL_VERSIONS.items()):
+        tools.append({
+            "name": tool_name,
+            "description": record["meta"].get("description", ""),
+            "inputSchema": record["meta"].get("input_schema", {"type": "object"}),
+            "version": record["version"],
+        })
+    return {"tools": tools}
+
+def _valid_id(request_id):
+    """
+    request_id if JSON-RPC allows it as an id (a string or a number), else None.
+    """
+    if isinstance(request_id, str) or (isinstance(request_id, (int, float)) and not isinstance(request_id, bool)):
+        return request_id
+    return None
+
+class Session:
+    """
+    One client connection: reads requests, runs them on the shared worker pool, writes responses as
+    they complete. At end of input it waits for the calls still running and answers them; once a
+    response can't be written (the client is gone) the remaining calls are cancelled.
+    """
+
+    def __init__(self, reader, writer, pool, name="stdio"):
+        self.reader = reader
+        self.writer = writer
+        self.pool = pool
+        self.name = name
+        self.write_lock = threading.Lock()
+        self.running = {}
+        self.running_lock = threading.Lock()
+        self.drained = threading.Condition(self.running_lock)
+        self.gone = False
+
+    def serve(self):
+        try:
+            while not self.gone:
+                line = self._read_line()
+                if line is None:
+                    break
+                if line.strip():
+                    self._receive(line)
+        except (ConnectionError, OSError):
+            self._disconnected()
+        with self.running_lock:
+            self.drained.wait_for(lambda: not self.running)
+
+    def _disconnected(self):
+        with self.running_lock:
+            self.gone = True
+            deadlines = list(self.running.values())
+        for deadline in deadlines:
+            if deadline is not None and not deadline.cancelled:
+                deadline.cancel("The client disconnected.")
+
+    def _read_line(self):
+        """
+        The next line, or None at end of input. A line over MAX_MESSAGE_BYTES is skipped and answered
+        with an error.
+        """
+        line = self.reader.readline(MAX_MESSAGE_BYTES + 1)
+        if not line:
+            return None
+        if len(line) > MAX_MESSAGE_BYTES and not line.endswith(b"\n"):
+            while True:
+                rest = self.reader.readline(1024 * 1024)
+                if not rest or rest.endswith(b"\n"):
+                    break
+            self._send_error(None, INVALID_REQUEST, f"Message larger than {MAX_MESSAGE_BYTES} bytes.")
+            return b"\n"
+        return line
+
+    def _receive(self, line):
+        try:
+            self._dispatch(line)
+        except Exception as e:
+            # One bad message must not end the session for the requests that follow it.
+            logger.exception("JSON-RPC message could not be handled")
+            self._send_error(None, TOOL_ERROR, f"Internal error: {e}")
+
+    def _dispatch(self, line):
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            self._send_error(None, PARSE_ERROR, f"Parse error: {e}")
+            return
+        if isinstance(message, list):
+            self._send_error(None, INVALID_REQUEST, "Batch requests are not supported; send requests one per line instead, they are pipelined.")
+            return
+        if not isinstance(message, dict) or message.get("jsonrpc") != "2.0" or not isinstance(message.get("method"), str):
+            self._send_error(_valid_id(message.get("id")) if isinstance(message, dict) else None, INVALID_REQUEST, "Invalid JSON-RPC 2.0 request.")
+            return
+        request_id = message.get("id")
+        if request_id is not None and _valid_id(request_id) is None:
+            self._send_error(None, INVALID_REQUEST, "The request id must be a string, a number or null.")
+            return
+        params = message.get("params") or {}
+        if not isinstance(params, dict):
+            if "id" in message:
+                self._send_error(request_id, INVALID_PARAMS, "params must be an object.")
+            return
+
+        if "id" not in message:
+            self._notification(message["method"], params)
+            return
+        deadline = None
+        if message["method"] == "tools/call":
+            # The deadline counts from when the request was read, not from when a worker picks it up.
+            deadline, error = mcp_cancellation.deadline_from_request(params)
+            if error:
+                self._send_error(request_id, INVALID_PARAMS, error)
+                return
+        with self.running_lock:
+            # A second call under the same id would make the first one impossible to cancel or wait for.
+            duplicate = request_id in self.running
+            if not duplicate:
+                self.running[request_id] = deadline
+        if duplicate:
+            self._send_error(request_id, INVALID_REQUEST, f"Request id {request_id!r} is already in use by a request still running.")
+            return
+        self.pool.submit(self._handle, request_id, message["method"], params, deadline)
+
+    def _notification(self, method, params):
+        if method == "notifications/cancelled":
+            with self.running_lock:
+                deadline = self.running.get(_valid_id(params.get("requestId")))
+            if deadline is not None and not deadline.cancelled:
+                deadline.cancel(params.get("reason") or "Cancelled by the client.")
+
+    def _handle(self, request_id, method, params, deadline):
+        try:
+            if method == "tools/call":
+                result = self._call_tool(request_id, params, deadline)
+            elif method == "tools/list":
+                result = list_tools()
+            elif method == "ping":
+                result = {}
+            else:
+                raise RpcError(METHOD_NOT_FOUND, f"Method '{method}' not found.")
+            self._send({"jsonrpc": "2.0", "id": request_id, "result": result})
+        except RpcError as e:
+            self._send_error(request_id, e.code, str(e), e.data)
+        except Exception as e:
+            logger.exception("JSON-RPC request %r failed", request_id)
+            self._send_error(request_id, TOOL_ERROR, f"Internal error: {e}")
+        finally:
+            with self.running_lock:
+                self.running.pop(request_id, None)
+                self.drained.notify_all()
+
+    def _call_tool(self, request_id, params, deadline):
+        tool_name = params.get("name")
+        tool_input = params.get("arguments", {})
+        if not isinstance(tool_name, str) or not tool_name:
+            raise RpcError(INVALID_PARAMS, "tools/call needs a tool 'name'.")
+        if tool_name != 'python_executor' and tool_name not in mcp.LOADED_TOOLS:
+            raise RpcError(INVALID_PARAMS, f"Tool '{tool_name}' not found.")
+        mcp_metrics.TOOL_CALLS.labels(mcp.metrics_label(tool_name)).inc()
+
+        trace = mcp_tracing.Trace(request_id=f"rpc-{self.name}-{request_id}")
+        try:
+            output = mcp.run_tool_call(tool_name, tool_input, deadline, trace, "rpc", rpc_id=request_id, connection=self.name)
+        except mcp.InvalidToolInput as e:
+            raise RpcError(INVALID_PARAMS, str(e), {"errors": e.errors})
+        except _deadline.Aborted as e:
+            e = deadline.aborted() or e
+            if isinstance(e, _deadline.DeadlineExceeded):
+                raise RpcError(DEADLINE_EXCEEDED, str(e))
+            raise RpcError(REQUEST_CANCELLED, str(e))
+        except Exception as e:
+            raise RpcError(TOOL_ERROR, str(e), {"type": type(e).__name__})
+        return {"output": output}
+
+    def _send_error(self, request_id, code, message, data=None):
+        error = {"code": code, "message": message}
+        if data is not None:
+            error["data"] = data
+        self._send({"jsonrpc": "2.0", "id": request_id, "error": error})
+
+    def _send(self, payload):
+        try:
+            body = dumps_json(payload) + b"\n"
+        except (TypeError, ValueError) as e:
+            body = dumps_json({"jsonrpc": "2.0", "id": payload.get("id"), "error": {"code": TOOL_ERROR, "message": f"The tool output can't be encoded as JSON: {e}"}}) + b"\n"
+        try:
+            with self.write_lock:
+                self.writer.write(body)
+                self.writer.flush()
+        except (ConnectionError, OSError, ValueError):
+            self._disconnected()
+
+def _worker_pool():
+    return concurrent.futures.ThreadPoolExecutor(max_workers=RPC_WORKERS, thread_name_prefix="mcp-rpc")
+
+def serve_stdio():
+    """
+    Serves one client on stdin/stdout until stdin closes.
+    """
+    # The protocol owns the real stdout; anything tools print (python_executor included) goes to stderr.
+    reader = os.fdopen(os.dup(0), "rb")
+    writer = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    os.dup2(2, 1)
+    pool = _worker_pool()
+    try:
+        Session(reader, writer, pool).serve()
+    finally:
+        pool.shutdown(wait=True)
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+def serve_socket(path):
+    """
+    Serves clients on a Unix socket (owner-only permissions) until interrupted.
+    """
+    pool = _worker_pool()
+    connections = iter(range(1, sys.maxsize))
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            Session(self.rfile, self.wfile, pool, name=f"conn{next(connections)}").serve()
+
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX)
+        try:
+            probe.connect(path)
+            raise SystemExit(f"Another server is already listening on {path}.")
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(path)
+        finally:
+            probe.close()
+    # No authentication, like /mcp: only the owner may connect.
+    old_umask = os.umask(0o177)
+    try:
+        server = _UnixServer(path, Handler)
+    finally:
+        os.umask(old_umask)
+    logger.info("JSON-RPC server listening on %s", path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.remove(path)
+        pool.shutdown(wait=False)
+
+def _exit_on_sigterm(signum, frame):
+    # Unwinds serve_forever() so the socket file is removed.
+    raise SystemExit(0)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the MCP tools over JSON-RPC 2.0 (stdio or a Unix socket).")
+    parser.add_argument("--socket", help="listen on this Unix socket path instead of stdin/stdout")
+    parser.add_argument("--tools-dir", default=mcp.TOOLS_PATH, help="directory to load tools from (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    mcp.load_tools(args.tools_dir, recover_jobs=False)
+    if args.socket:
+        signal.signal(signal.SIGTERM, _exit_on_sigterm)
+        try:
+            serve_socket(args.socket)
+        except KeyboardInterrupt:
+            pass
+    else:
+        serve_stdio()
+
+if __name__ == "__main__":
+    main()
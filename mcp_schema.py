@@ -0,0 +1,284 @@
+# mcp_schema.py
+# Compiles a tool's input_schema (a JSON Schema subset) into a validator function, so /mcp can reject bad
+# input before calling run().
+#
+# Supported keywords: type, enum, const, properties, required, additionalProperties, items, minItems,
+# maxItems, minLength, maxLength, pattern, minimum, maximum, exclusiveMinimum, exclusiveMaximum,
+# allOf, anyOf, oneOf, not. Annotations (description, default, title, examples, ...) are ignored, as are
+# keywords outside the subset (they are logged once at compile time).
+#
+# Deliberate differences from JSON Schema: "integer" means a Python int (not 2.0), booleans are never
+# numbers, and bytes (sent as binary in MessagePack requests) count as "string".
+
+import re
+import json
+import logging
+import functools
+
+MAX_ERRORS = 20
+
+_ANNOTATIONS = {"$schema", "$id", "$comment", "title", "description", "default", "examples", "deprecated", "readOnly", "writeOnly", "format"}
+
+_TYPES = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, (str, bytes, bytearray)),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+logger = logging.getLogger("mcp.schema")
+
+class SchemaError(ValueError):
+    """
+    The schema itself is malformed (not the input).
+    """
+
+class _Errors(list):
+    def add(self, path, keyword, message):
+        if len(self) < MAX_ERRORS:
+            self.append({"path": path or "/", "keyword": keyword, "message": message})
+
+    @property
+    def full(self):
+        return len(self) >= MAX_ERRORS
+
+def _pointer(path, key):
+    return f"{path}/{str(key).replace('~', '~0').replace('/', '~1')}"
+
+def _type_name(value):
+    for name in ("boolean", "integer", "number", "string", "array", "object", "null"):
+        if _TYPES[name](value):
+            return name
+    return type(value).__name__
+
+def _compile(schema, where):
+    """
+    Returns check(value, path, errors) for one (sub)schema. Each keyword becomes one closure, built once.
+    """
+    if schema is True or schema == {}:
+        return lambda value, path, errors: None
+    if schema is False:
+        return lambda value, path, errors: errors.add(path, "false", "no value is allowed here")
+    if not isinstance(schema, dict):
+        raise SchemaError(f"{where or '/'}: a schema must be an object or a boolean, not {type(schema).__name__}")
+
+    checks = []
+    unsupported = sorted(set(schema) - _ANNOTATIONS - set(_KEYWORDS))
+    if unsupported:
+        logger.info("Ignoring unsupported schema keywords at %s: %s", where or "/", ", ".join(unsupported))
+
+    for keyword in _KEYWORD_ORDER:
+        if keyword in schema:
+            checks.append(_KEYWORDS[keyword](schema[keyword], schema, where))
+
+    if len(checks) == 1:
+        return checks[0]
+
+    def check(value, path, errors):
+        for part in checks:
+            part(value, path, errors)
+    return check
+
+def _kw_type(expected, schema, where):
+    names = [expected] if isinstance(expected, str) else expected
+    if not isinstance(names, list) or not names or any(n not in _TYPES for n in names):
+        raise SchemaError(f"{where or '/'}: unknown type {expected!r}")
+    tests = [_TYPES[n] for n in names]
+    label = " or ".join(names)
+
+    def check(value, path, errors):
+        if not any(test(value) for test in tests):
+            errors.add(path, "type", f"must be {label}, not {_type_name(value)}")
+    return check
+
+def _kw_enum(options, schema, where):
+    if not isinstance(options, list) or not options:
+        raise SchemaError(f"{where or '/'}: enum must be a non-empty array")
+    # bool is an int subclass, so compare (type, value) to keep True from matching 1.
+    allowed = [(isinstance(o, bool), o) for o in options]
+    shown = ", ".join(json.dumps(o) for o in options[:10])
+
+    def check(value, path, errors):
+        if (isinstance(value, bool), value) not in allowed:
+            errors.add(path, "enum", f"must be one of {shown}")
+    return check
+
+def _kw_const(expected, schema, where):
+    def check(value, path, errors):
+        if isinstance(value, bool) != isinstance(expected, bool) or value != expected:
+            errors.add(path, "const", f"must be {json.dumps(expected)}")
+    return check
+
+def _kw_properties(properties, schema, where):
+    if not isinstance(properties, dict):
+        raise SchemaError(f"{where or '/'}: properties must be an object")
+    compiled = {name: _compile(sub, _pointer(f"{where}/properties", name)) for name, sub in properties.items()}
+
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            return
+        for name, sub in compiled.items():
+            if name in value and not errors.full:
+                sub(value[name], _pointer(path, name), errors)
+    return check
+
+def _kw_required(names, schema, where):
+    if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+        raise SchemaError(f"{where or '/'}: required must be an array of strings")
+    if not names:
+        return lambda value, path, errors: None
+
+    def check(value, path, errors):
+        if isinstance(value, dict):
+            for name in names:
+                if name not in value:
+                    errors.add(_pointer(path, name), "required", "is required")
+    return check
+
+def _kw_additional_properties(extra, schema, where):
+    known = set(schema.get("properties") or ())
+    sub = _compile(extra, f"{where}/additionalProperties")
+
+    def check(value, path, errors):
+        if isinstance(value, dict):
+            for name, item in value.items():
+                if name not in known:
+                    if extra is False:
+                        errors.add(_pointer(path, name), "additionalProperties", "is not an allowed property")
+                    else:
+                        sub(item, _pointer(path, name), errors)
+    return check
+
+def _kw_items(items, schema, where):
+    sub = _compile(items, f"{where}/items")
+
+    def check(value, path, errors):
+        if isinstance(value, list):
+            for index, item in enumerate(value):
+                if errors.full:
+                    return
+                sub(item, _pointer(path, index), errors)
+    return check
+
+def _bound(keyword, applies, measure, compare, message):
+    def factory(limit, schema, where):
+        if isinstance(limit, bool) or not isinstance(limit, (int, float)):
+            raise SchemaError(f"{where or '/'}: {keyword} must be a number")
+
+        def check(value, path, errors):
+            if applies(value) and not compare(measure(value), limit):
+                errors.add(path, keyword, message.format(limit=limit))
+        return check
+    return factory
+
+def _is_number(value):
+    return _TYPES["number"](value)
+
+def _kw_pattern(pattern, schema, where):
+    try:
+        regex = re.compile(pattern)
+    except (re.error, TypeError) as e:
+        raise SchemaError(f"{where or '/'}: invalid pattern {pattern!r}: {e}")
+
+    def check(value, path, errors):
+        if isinstance(value, str) and not regex.search(value):
+            errors.add(path, "pattern", f"must match {pattern!r}")
+    return check
+
+def _subschemas(keyword, subs, where):
+    if not isinstance(subs, list) or not subs:
+        raise SchemaError(f"{where or '/'}: {keyword} must be a non-empty array")
+    return [_compile(sub, f"{where}/{keyword}/{i}") for i, sub in enumerate(subs)]
+
+def _passes(sub, value, path):
+    trial = _Errors()
+    sub(value, path, trial)
+    return not trial
+
+def _kw_all_of(subs, schema, where):
+    compiled = _subschemas("allOf", subs, where)
+
+    def check(value, path, errors):
+        for sub in compiled:
+            sub(value, path, errors)
+    return check
+
+def _kw_any_of(subs, schema, where):
+    compiled = _subschemas("anyOf", subs, where)
+
+    def check(value, path, errors):
+        if not any(_passes(sub, value, path) for sub in compiled):
+            errors.add(path, "anyOf", "must match at least one of the allowed schemas")
+    return check
+
+def _kw_one_of(subs, schema, where):
+    compiled = _subschemas("oneOf", subs, where)
+
+    def check(value, path, errors):
+        matched = sum(1 for sub in compiled if _passes(sub, value, path))
+        if matched != 1:
+            errors.add(path, "oneOf", f"must match exactly one of the allowed schemas (matched {matched})")
+    return check
+
+def _kw_not(sub_schema, schema, where):
+    sub = _compile(sub_schema, f"{where}/not")
+
+    def check(value, path, errors):
+        if _passes(sub, value, path):
+            errors.add(path, "not", "must not match the excluded schema")
+    return check
+
+_KEYWORDS = {
+    "type": _kw_type,
+    "enum": _kw_enum,
+    "const": _kw_const,
+    "required": _kw_required,
+    "properties": _kw_properties,
+    "additionalProperties": _kw_additional_properties,
+    "items": _kw_items,
+    "minItems": _bound("minItems", lambda v: isinstance(v, list), len, lambda n, limit: n >= limit, "must have at least {limit} items"),
+    "maxItems": _bound("maxItems", lambda v: isinstance(v, list), len, lambda n, limit: n <= limit, "must have at most {limit} items"),
+    "minLength": _bound("minLength", lambda v: isinstance(v, str), len, lambda n, limit: n >= limit, "must be at least {limit} characters long"),
+    "maxLength": _bound("maxLength", lambda v: isinstance(v, str), len, lambda n, limit: n <= limit, "must be at most {limit} characters long"),
+    "minimum": _bound("minimum", _is_number, lambda v: v, lambda v, limit: v >= limit, "must be >= {limit}"),
+    "maximum": _bound("maximum", _is_number, lambda v: v, lambda v, limit: v <= limit, "must be <= {limit}"),
+    "exclusiveMinimum": _bound("exclusiveMinimum", _is_number, lambda v: v, lambda v, limit: v > limit, "must be > {limit}"),
+    "exclusiveMaximum": _bound("exclusiveMaximum", _is_number, lambda v: v, lambda v, limit: v < limit, "must be < {limit}"),
+    "pattern": _kw_pattern,
+    "allOf": _kw_all_of,
+    "anyOf": _kw_any_of,
+    "oneOf": _kw_one_of,
+    "not": _kw_not,
+}
+# Cheap, shape-level checks first, so a wrong type reports one error instead of a cascade.
+_KEYWORD_ORDER = list(_KEYWORDS)
+
+@functools.lru_cache(maxsize=256)
+def _compile_cached(canonical):
+    check = _compile(json.loads(canonical), "")
+
+    def validate(value):
+        errors = _Errors()
+        check(value, "", errors)
+        return list(errors)
+    return validate
+
+def compile_schema(schema):
+    """
+    Returns validate(value) -> list of {"path", "keyword", "message"} errors (empty when valid).
+    Raises SchemaError for a malformed schema. Identical schemas share one compiled validator.
+    """
+    try:
+        canonical = json.dumps(schema, sort_keys=True)
+    except (TypeError, ValueError) as e:
+        raise SchemaError(f"schema is not JSON-serializable: {e}")
+    return _compile_cached(canonical)
+
+def format_errors(errors):
+    """
+    One line per error, e.g. "/edits/0/start_line: must be integer, not string".
+    """
+    return "; ".join(f"{e['path']}: {e['message']}" for e in errors)
@@ -0,0 +1,271 @@
+# mcp_tracing.py
+# Request/trace IDs, lightweight spans and structured JSON logging for the request path.
+#
+# Log records are queued and written by a background thread, so a slow stderr never stalls a request.
+# Every record logged while a request is active carries its request_id and trace_id, including records
+# logged by tools (use logging.getLogger("mcp.tools.<name>")).
+
+import os
+import re
+import sys
+import copy
+import json
+import time
+import uuid
+import queue
+import atexit
+import random
+import logging
+import threading
+import contextlib
+import contextvars
+import logging.handlers
+
+import mcp_metrics
+
+LOG_LEVEL = os.environ.get("MCP_LOG_LEVEL", "INFO").upper()
+# Fraction of successful, fast requests that get a request log record. Errors and slow requests are always logged.
+LOG_SAMPLE_RATE = float(os.environ.get("MCP_LOG_SAMPLE_RATE", "1.0"))
+LOG_SLOW_MS = float(os.environ.get("MCP_LOG_SLOW_MS", "1000"))
+# Caps applied to logged tool input: long strings and lists are cut, nesting is flattened past LOG_MAX_DEPTH.
+LOG_MAX_FIELD_CHARS = int(os.environ.get("MCP_LOG_MAX_FIELD_CHARS", "200"))
+LOG_MAX_ITEMS = 20
+LOG_MAX_DEPTH = 4
+LOG_QUEUE_SIZE = 10000
+REDACT_KEYS = re.compile(
+    os.environ.get("MCP_LOG_REDACT_KEYS", r"pass(word)?|secret|token|api[_-]?key|auth|cookie|credential"),
+    re.IGNORECASE,
+)
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+_CURRENT = contextvars.ContextVar("mcp_trace", default=None)
+
+# ---------- Traces and spans ----------
+
+def _span_id():
+    return uuid.uuid4().hex[:16]
+
+class Trace:
+    """
+    One request's identity plus the spans recorded while it runs.
+    """
+
+    def __init__(self, trace_id=None, request_id=None, parent_span_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.request_id = request_id or uuid.uuid4().hex
+        self.span_id = _span_id()
+        self.parent_span_id = parent_span_id
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.spans = []
+        self.attrs = {}
+        self._stack = []
+        self._lock = threading.Lock()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def headers(self):
+        """
+        Response headers that let a client correlate its call with server logs, plus a Server-Timing
+        breakdown (total and top-level spans) so clients can see server-side time without the network.
+        """
+        timings = [f"total;dur={self.elapsed_ms():.3f}"]
+        timings.extend(f"{s['name']};dur={s['duration_ms']:.3f}" for s in self.spans if s["parent_id"] == self.span_id)
+        return {
+            "X-Request-ID": self.request_id,
+            "traceparent": f"00-{self.trace_id}-{self.span_id}-01",
+            "Server-Timing": ", ".join(timings),
+        }
+
+def trace_from_headers(headers):
+    """
+    Builds a Trace that continues the caller's W3C traceparent and X-Request-ID when they are valid.
+    """
+    trace_id = parent = None
+    match = _TRACEPARENT.match((headers.get("traceparent") or "").strip().lower())
+    if match and match.group(1) != "0" * 32:
+        trace_id, parent = match.group(1), match.group(2)
+    request_id = (headers.get("X-Request-ID") or "").strip()
+    if not _REQUEST_ID.match(request_id):
+        request_id = None
+    return Trace(trace_id, request_id, parent)
+
+def current_trace():
+    return _CURRENT.get()
+
+def activate(trace):
+    """
+    Makes trace the current one for this context. Returns a token for deactivate().
+    """
+    return _CURRENT.set(trace)
+
+def deactivate(token):
+    _CURRENT.reset(token)
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """
+    Times a block as a span of the current trace. A no-op outside a request.
+    """
+    trace = _CURRENT.get()
+    if trace is None:
+        yield None
+        return
+
+    record = {"name": name, "span_id": _span_id(), **attrs}
+    with trace._lock:
+        record["parent_id"] = trace._stack[-1] if trace._stack else trace.span_id
+        trace._stack.append(record["span_id"])
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["start_ms"] = round((started - trace.started) * 1000, 3)
+        record["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        with trace._lock:
+            if record["span_id"] in trace._stack:
+                trace._stack.remove(record["span_id"])
+            trace.spans.append(record)
+
+# ---------- Redaction ----------
+
+def redact(value, depth=0, max_chars=None, max_items=None, max_depth=None, notes=None):
+    """
+    Returns a copy of value that is safe and small enough to log: secret-looking keys are masked,
+    long strings and lists are truncated, and bytes are replaced by their length.
+    Limits default to the LOG_MAX_* settings. If notes is a set, "redacted" and/or "truncated" are added to it.
+    """
+    max_chars = LOG_MAX_FIELD_CHARS if max_chars is None else max_chars
+    max_items = LOG_MAX_ITEMS if max_items is None else max_items
+    max_depth = LOG_MAX_DEPTH if max_depth is None else max_depth
+    note = notes.add if notes is not None else (lambda _: None)
+
+    def walk(value, depth):
+        if isinstance(value, dict):
+            if depth >= max_depth:
+                note("truncated")
+                return f"<dict with {len(value)} keys>"
+            out = {}
+            for i, (key, item) in enumerate(value.items()):
+                if i == max_items:
+                    note("truncated")
+                    out["..."] = f"+{len(value) - max_items} keys"
+                    break
+                if REDACT_KEYS.search(str(key)):
+                    note("redacted")
+                    out[str(key)] = "[REDACTED]"
+                else:
+                    out[str(key)] = walk(item, depth + 1)
+            return out
+        if isinstance(value, (list, tuple)):
+            if depth >= max_depth:
+                note("truncated")
+                return f"<list of {len(value)}>"
+            out = [walk(item, depth + 1) for item in value[:max_items]]
+            if len(value) > max_items:
+                note("truncated")
+                out.append(f"... +{len(value) - max_items} items")
+            return out
+        if isinstance(value, str):
+            if len(value) > max_chars:
+                note("truncated")
+                return value[:max_chars] + f"... (+{len(value) - max_chars} chars)"
+            return value
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            note("truncated")
+            return f"<{len(value)} bytes>"
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        return walk(repr(value), depth)
+
+    return walk(value, depth)
+
+def should_log(duration_ms, error):
+    return error or duration_ms >= LOG_SLOW_MS or random.random() < LOG_SAMPLE_RATE
+
+# ---------- Background JSON logging ----------
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line. Structured data goes in extra={"fields": {...}}.
+    """
+
+    def format(self, record):
+        out = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in ("request_id", "trace_id"):
+            value = getattr(record, key, None)
+            if value:
+                out[key] = value
+        fields = getattr(record, "fields", None)
+        if fields:
+            out.update(fields)
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, default=str, ensure_ascii=False)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Stamps the caller's trace IDs onto the record (the listener thread can't see them) and drops
+    records instead of blocking when the queue is full.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        trace = _CURRENT.get()
+        if trace is not None:
+            record.request_id = trace.request_id
+            record.trace_id = trace.trace_id
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            mcp_metrics.LOG_RECORDS_DROPPED.labels().inc()
+
+def queued(handler, maxsize=LOG_QUEUE_SIZE):
+    """
+    Puts handler behind a bounded queue drained by a background thread (stopped at exit).
+    Returns (queue_handler, listener); attach queue_handler to a logger.
+    """
+    log_queue = queue.Queue(maxsize)
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return _QueueHandler(log_queue), listener
+
+_listener = None
+_listener_lock = threading.Lock()
+
+def configure_logging(stream=None):
+    """
+    Routes the "mcp" logger hierarchy through a bounded queue to a background JSON writer. Idempotent.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+        writer = logging.StreamHandler(stream or sys.stderr)
+        writer.setFormatter(JsonFormatter())
+        handler, _listener = queued(writer)
+
+        logger = logging.getLogger("mcp")
+        logger.setLevel(LOG_LEVEL)
+        logger.addHandler(handler)
+        logger.propagate = False
@@ -0,0 +1,131 @@
+# mcp_worker.py
+# Child side of the "process" execution mode (see mcp_executors.py). One worker process hosts one tool:
+#
+#   python mcp_worker.py <tool_name> <module_path> <max_memory_mb>
+#
+# It loads the tool module, then answers calls over stdin/stdout until stdin closes. Messages are
+# length-prefixed pickles, so inputs and outputs (including bytes) cross the pipe without re-encoding:
+#   server -> worker: ("load", source) once: the tool version's code, run as if read from module_path
+#                     ("call", tool_input, deadline_seconds)
+#   worker -> server: ("ready", pid) once, then per call one of
+#                     ("ok", output)
+#                     ("aborted", "DeadlineExceeded" | "Cancelled", message)
+#                     ("error", exception_type, message, traceback, fatal)
+# A fatal error (e.g. MemoryError under the memory cap) means the worker exits after replying.
+
+import os
+import sys
+import struct
+import pickle
+import traceback
+
+_HEADER = struct.Struct(">I")
+
+def write_message(stream, message):
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    stream.write(_HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+def read_message(stream):
+    """
+    The next message, or None once the other side has closed the pipe.
+    """
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    size, = _HEADER.unpack(header)
+    payload = stream.read(size)
+    if len(payload) < size:
+        return None
+    return pickle.loads(payload)
+
+def _limit_memory(max_memory_mb):
+    if max_memory_mb <= 0:
+        return
+    try:
+        import resource
+    except ImportError:
+        sys.stderr.write("mcp_worker: memory caps need the resource module (POSIX only); running uncapped\n")
+        return
+    limit = max_memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _load_tool(tool_name, module_path, source):
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location(tool_name, module_path)
+    if spec is None:
+        raise ImportError(f"could not create module spec for '{module_path}'")
+    module = importlib.util.module_from_spec(spec)
+    exec(compile(source, module_path, "exec"), module.__dict__)
+    if not callable(getattr(module, "run", None)):
+        raise ImportError(f"tool '{tool_name}' is missing a 'run' function")
+    return module
+
+def _error(e, fatal=False):
+    # Some exceptions (MemoryError in particular) have no message of their own.
+    return ("error", type(e).__name__, str(e) or type(e).__name__, traceback.format_exc(), fatal)
+
+def _call(module, tool_input, seconds):
+    import types
+    import _deadline
+
+    deadline = _deadline.Deadline(seconds)
+    try:
+        with _deadline.scope(deadline):
+            output = module.run(tool_input)
+            # Generators can't cross the pipe; stream them into a list here instead.
+            if isinstance(output, types.GeneratorType):
+                items = []
+                for item in output:
+                    items.append(item)
+                    deadline.check()
+                output = items
+        return ("ok", output)
+    except _deadline.Aborted as e:
+        return ("aborted", type(e).__name__, str(e))
+    except MemoryError as e:
+        return _error(e, fatal=True)
+    except Exception as e:
+        return _error(e)
+
+def main(argv):
+    tool_name, module_path, max_memory_mb = argv[1], os.path.abspath(argv[2]), int(argv[3])
+
+    # The protocol owns the original stdin/stdout; anything the tool prints goes to stderr instead.
+    requests = os.fdopen(os.dup(0), "rb")
+    replies = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    os.dup2(2, 1)
+
+    # Tools import their shared helpers (tools/_*.py) by name, from their own directory or the server's.
+    for path in (os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools"), os.path.dirname(module_path)):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    _limit_memory(max_memory_mb)
+    try:
+        _, source = read_message(requests)
+        module = _load_tool(tool_name, module_path, source)
+    except BaseException as e:
+        write_message(replies, _error(e, fatal=True))
+        return 1
+    write_message(replies, ("ready", os.getpid()))
+
+    while True:
+        message = read_message(requests)
+        if message is None:
+            return 0
+        _, tool_input, seconds = message
+        reply = _call(module, tool_input, seconds)
+        try:
+            write_message(replies, reply)
+        except Exception as e:
+            # The output itself couldn't be pickled; the caller still gets an answer.
+            write_message(replies, ("error", type(e).__name__, f"Tool output can't be returned from a worker process: {e}", "", False))
+        if reply[0] == "error" and reply[4]:
+            return 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,215 @@
+# tools/_deadline.py
+# Per-call deadlines and cancellation, shared by the server and the tools.
+#
+# The server runs every tool call under a Deadline: the request's "deadline_ms" (or the server default),
+# cancelled early if the client disconnects or the async job is cancelled. Tools cooperate by
+#   - calling _deadline.check() between units of work,
+#   - bounding their own waits with _deadline.timeout(limit),
+#   - starting subprocesses with _deadline.run(), which kills them when the call is aborted.
+# Outside the server no deadline is set and all of these are no-ops.
+
+import time
+import ctypes
+import threading
+import contextlib
+import contextvars
+import subprocess
+
+# How often waits wake up to notice cancellation.
+POLL_SECONDS = 0.05
+
+class Aborted(BaseException):
+    """
+    The tool call was stopped. Like asyncio.CancelledError this derives from BaseException, so a
+    tool's catch-all `except Exception` doesn't swallow it.
+    """
+    default_message = "The tool call was aborted."
+
+    def __str__(self):
+        return str(self.args[0]) if self.args else self.default_message
+
+class DeadlineExceeded(Aborted):
+    default_message = "The tool call's deadline was exceeded."
+
+class Cancelled(Aborted):
+    default_message = "The tool call was cancelled."
+
+class Deadline:
+    """
+    A point in time (monotonic) after which the call should stop, plus a cancellation flag.
+    seconds=None means no time limit; cancel_event lets the owner share an existing Event.
+    """
+
+    def __init__(self, seconds=None, cancel_event=None):
+        self.seconds = seconds
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+        self.cancel_event = cancel_event or threading.Event()
+        self.reason = None
+
+    def remaining(self):
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self, reason=None):
+        self.reason = reason
+        self.cancel_event.set()
+
+    def aborted(self):
+        """
+        The exception this call should stop with, or None while it may continue.
+        """
+        if self.cancelled:
+            return Cancelled(self.reason) if self.reason else Cancelled()
+        if self.expired():
+            return DeadlineExceeded(f"Deadline of {self.seconds:g}s exceeded.")
+        return None
+
+    def check(self):
+        error = self.aborted()
+        if error is not None:
+            raise error
+
+_CURRENT = contextvars.ContextVar("mcp_deadline", default=None)
+
+def current():
+    return _CURRENT.get()
+
+def activate(deadline):
+    return _CURRENT.set(deadline)
+
+def deactivate(token):
+    _CURRENT.reset(token)
+
+@contextlib.contextmanager
+def scope(deadline):
+    """
+    Makes deadline the current one for the block.
+    """
+    token = _CURRENT.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _CURRENT.reset(token)
+
+def check():
+    """
+    Raises DeadlineExceeded or Cancelled if the current call should stop.
+    """
+    deadline = _CURRENT.get()
+    if deadline is not None:
+        deadline.check()
+
+def remaining():
+    """
+    Seconds left for the current call, or None without a time limit.
+    """
+    deadline = _CURRENT.get()
+    return deadline.remaining() if deadline is not None else None
+
+def timeout(limit=None):
+    """
+    A tool's own timeout (or None) bounded by the time left for the call. Raises if already aborted,
+    so a zero timeout is never handed to a blocking call.
+    """
+    check()
+    left = remaining()
+    if left is None:
+        return limit
+    return left if limit is None else min(limit, left)
+
+def sleep(seconds):
+    """
+    time.sleep() that wakes up as soon as the call is aborted.
+    """
+    deadline = _CURRENT.get()
+    if deadline is None:
+        time.sleep(seconds)
+        return
+    end = time.monotonic() + seconds
+    while True:
+        deadline.check()
+        left = end - time.monotonic()
+        if left <= 0:
+            return
+        deadline.cancel_event.wait(min(left, POLL_SECONDS))
+
+def run(args, *, timeout=None, input=None, capture_output=False, check=False, **kwargs):
+    """
+    subprocess.run() that also kills the process when the current call is aborted.
+    timeout keeps its usual meaning and raises subprocess.TimeoutExpired.
+    """
+    deadline = _CURRENT.get()
+    if deadline is None:
+        return subprocess.run(args, timeout=timeout, input=input, capture_output=capture_output, check=check, **kwargs)
+    deadline.check()
+    if capture_output:
+        kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
+    if input is not None:
+        kwargs["stdin"] = subprocess.PIPE
+    limit = None if timeout is None else time.monotonic() + timeout
+    with subprocess.Popen(args, **kwargs) as proc:
+        while True:
+            wait = POLL_SECONDS if limit is None else min(POLL_SECONDS, max(0.0, limit - time.monotonic()))
+            try:
+                stdout, stderr = proc.communicate(input, timeout=wait)
+                break
+            except subprocess.TimeoutExpired:
+                # communicate() keeps feeding the remaining input itself; it must only be passed once.
+                input = None
+            error = deadline.aborted()
+            if error is not None or (limit is not None and time.monotonic() >= limit):
+                proc.kill()
+                stdout, stderr = proc.communicate()
+                if error is not None:
+                    raise error
+                raise subprocess.TimeoutExpired(proc.args, timeout, output=stdout, stderr=stderr)
+    if check and proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args, output=stdout, stderr=stderr)
+    return subprocess.CompletedProcess(proc.args, proc.returncode, stdout, stderr)
+
+def _set_async_exc(thread_id, exc_type):
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(thread_id), ctypes.py_object(exc_type) if exc_type else None)
+
+@contextlib.contextmanager
+def interrupt_on_abort():
+    """
+    For code that never calls check() (e.g. python_executor snippets): when the call is aborted, raise
+    DeadlineExceeded/Cancelled inside this thread asynchronously. It lands at the next Python bytecode,
+    so a blocking C call (time.sleep, a socket read) finishes first.
+    """
+    deadline = _CURRENT.get()
+    if deadline is None:
+        yield
+        return
+    target = threading.get_ident()
+    done = threading.Event()
+    lock = threading.Lock()
+    fired = []
+
+    def watch():
+        while not done.wait(POLL_SECONDS):
+            error = deadline.aborted()
+            if error is not None:
+                with lock:
+                    if not done.is_set():
+                        fired.append(type(error))
+                        _set_async_exc(target, type(error))
+                return
+
+    threading.Thread(target=watch, name="mcp-deadline-watch", daemon=True).start()
+    try:
+        yield
+    finally:
+        with lock:
+            done.set()
+            if fired:
+                # Drop the exception if it hasn't been delivered yet, so it can't surface after the block.
+                _set_async_exc(target, None)
@@ -0,0 +1,86 @@
+# tools/_invoke.py
+# Lets a tool call other loaded tools in-process, e.g. "find the files, then read each one":
+#
+#   import _invoke
+#   found = _invoke.call_tool("file_search_tool", {"path": "~/notes", "query": "TODO"})
+#   for path in sorted({m["path"] for m in found["matches"]}):
+#       text = _invoke.call_tool("file_reader", {"filepath": os.path.join(found["root"], path)})
+#
+# The nested call goes through the server's dispatcher, so it is validated against the callee's
+# input_schema, runs on the callee's executor, and shares the caller's deadline (cancellation included)
+# and trace (its spans nest under the caller's). A tool that (indirectly) calls itself raises
+# ToolCallError instead of recursing until the deadline or the stack runs out.
+
+import os
+import contextlib
+import contextvars
+
+import _deadline
+
+MAX_DEPTH = int(os.environ.get("MCP_MAX_TOOL_CALL_DEPTH", "8"))
+
+class ToolCallError(RuntimeError):
+    """
+    A nested call was refused: a cycle, too deep, invalid input, or no dispatcher in this process.
+    """
+
+class InvalidInput(ToolCallError):
+    """
+    The callee rejected tool_input against its input_schema. errors lists {"path", "keyword", "message"}.
+    """
+
+    def __init__(self, message, errors):
+        super().__init__(message)
+        self.errors = errors
+
+_STACK = contextvars.ContextVar("mcp_tool_stack", default=())
+_DISPATCH = None
+
+def install(dispatch):
+    """
+    Called by the server with dispatch(tool_name, tool_input) -> output.
+    """
+    global _DISPATCH
+    _DISPATCH = dispatch
+
+def stack():
+    """
+    Names of the tools currently running in this context, outermost first.
+    """
+    return _STACK.get()
+
+@contextlib.contextmanager
+def calling(tool_name):
+    """
+    Marks tool_name as running for the block (used by the server's dispatcher).
+    """
+    token = _STACK.set(_STACK.get() + (tool_name,))
+    try:
+        yield
+    finally:
+        _STACK.reset(token)
+
+def call_tool(tool_name, tool_input=None, deadline_ms=None):
+    """
+    Runs another loaded tool and returns its output as-is (a dict, or a generator for streaming tools).
+    deadline_ms can only shorten the caller's deadline. The callee's exceptions propagate unchanged.
+    """
+    if _DISPATCH is None:
+        raise ToolCallError("Tool calls are only available inside the MCP server process (not in process-mode workers).")
+    current = _STACK.get()
+    if tool_name in current:
+        raise ToolCallError(f"Tool call cycle: {' -> '.join(current + (tool_name,))}")
+    if len(current) >= MAX_DEPTH:
+        raise ToolCallError(f"Tool calls nested deeper than {MAX_DEPTH}: {' -> '.join(current + (tool_name,))}")
+    _deadline.check()
+    if deadline_ms is None:
+        return _DISPATCH(tool_name, tool_input if tool_input is not None else {})
+
+    parent = _deadline.current()
+    seconds = deadline_ms / 1000.0
+    left = parent.remaining() if parent is not None else None
+    if left is not None:
+        seconds = min(seconds, left)
+    # Share the caller's cancel event, so cancelling the outer call also stops this one.
+    with _deadline.scope(_deadline.Deadline(seconds, parent.cancel_event if parent is not None else None)):
+        return _DISPATCH(tool_name, tool_input if tool_input is not None else {})
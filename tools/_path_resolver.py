@@ -0,0 +1,264 @@
+# tools/_path_resolver.py
+# Shared, memoized path expansion and glob resolution for the file tools.
+# Modules whose name starts with "_" are helpers, not tools: the server and meta_tool_inspector skip them.
+
+import os
+import re
+import time
+import fnmatch
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Tuple, Union, Iterator
+
+# How long glob and resolve results may be reused. Glob results are also dropped as soon as
+# the mtime of any directory they were computed from changes.
+CACHE_TTL_SECONDS = float(os.environ.get('MCP_PATH_CACHE_TTL', '2'))
+CACHE_MAX_ENTRIES = 4096
+
+GLOB_CHARS = ('*', '?', '[')
+
+# ---------- ~ expansion ----------
+
+@lru_cache(maxsize=None)
+def _pwd_home_for_uid(uid: int) -> Union[str, None]:
+    try:
+        import pwd  # POSIX only
+        return pwd.getpwuid(uid).pw_dir
+    except Exception:
+        return None
+
+@lru_cache(maxsize=256)
+def _pwd_home_for_name(user: str) -> Union[str, None]:
+    try:
+        import pwd
+        return pwd.getpwnam(user).pw_dir
+    except Exception:
+        return None
+
+def expand_user(p: str) -> str:
+    """
+    Robust ~ expansion:
+      - ~ or ~/... using $HOME, $USERPROFILE, or pwd (POSIX)
+      - ~username on POSIX (pwd)
+    Password-database lookups are cached for the life of the process.
+    """
+    p = (p or '').strip().strip('"').strip("'")
+    if not p.startswith('~'):
+        return p
+
+    # Handle "~" and "~/...":
+    if p == '~' or p.startswith('~/'):
+        home = os.environ.get('HOME') or os.environ.get('USERPROFILE')
+        if not home and hasattr(os, 'getuid'):
+            home = _pwd_home_for_uid(os.getuid())
+        if home:
+            return home + p[1:]
+        # As a last resort, let pathlib try
+        return str(Path(p).expanduser())
+
+    # Handle "~username"
+    if os.name != 'nt':  # Windows has no pwd users
+        user = p[1:].split('/', 1)[0]
+        home = _pwd_home_for_name(user)
+        if home:
+            return home + p[1 + len(user):]  # keep leading slash if present
+
+    return str(Path(p).expanduser())
+
+def expand_path(p: str) -> str:
+    # Expand ~ first (our robust handler), then env vars, then normalize
+    p = expand_user(p)
+    p = os.path.expandvars(p)
+    return os.path.normpath(p)
+
+def has_glob(p: str) -> bool:
+    return any(ch in p for ch in GLOB_CHARS)
+
+# ---------- Cached glob ----------
+
+# (pattern, limit, cwd for relative patterns) -> (expires_at, matches, {directory: mtime_ns})
+_GLOB_CACHE: Dict[tuple, Tuple[float, List[str], Dict[str, int]]] = {}
+# (candidate, cwd for relative candidates) -> (expires_at, resolved path, is_file)
+_RESOLVE_CACHE: Dict[tuple, Tuple[float, str, bool]] = {}
+_CACHE_LOCK = threading.Lock()
+_STATS = {'glob_hits': 0, 'glob_misses': 0, 'resolve_hits': 0, 'resolve_misses': 0}
+
+@lru_cache(maxsize=1024)
+def _compile_component(component: str):
+    return re.compile(fnmatch.translate(os.path.normcase(component)))
+
+def _dir_mtime(directory: str) -> Union[int, None]:
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+def _iter_glob(pattern: str, scanned: Dict[str, int]) -> Iterator[str]:
+    """
+    Yields files matching pattern, one directory level at a time with os.scandir.
+    Follows glob.glob() semantics (no recursive **, hidden names only match patterns starting with '.').
+    Records the mtime of every directory it lists in `scanned`, for cache invalidation.
+    """
+    drive, rest = os.path.splitdrive(pattern)
+    absolute = rest.startswith(os.sep) or (os.altsep is not None and rest.startswith(os.altsep))
+    parts = [part for part in re.split(r'[\\/]' if os.altsep else re.escape(os.sep), rest) if part]
+    start = drive + os.sep if absolute else (drive or os.curdir)
+    # Relative patterns yield relative matches, like glob.glob().
+    yield from _glob_level(start, '' if not absolute else start, parts, scanned)
+
+def _glob_level(directory: str, prefix: str, parts: List[str], scanned: Dict[str, int]) -> Iterator[str]:
+    part, remaining = parts[0], parts[1:]
+    last = not remaining
+
+    if not has_glob(part):
+        mtime = _dir_mtime(directory)
+        if mtime is not None:
+            scanned[directory] = mtime
+        path = os.path.join(directory, part)
+        shown = os.path.join(prefix, part) if prefix else part
+        if last:
+            if os.path.isfile(path):
+                yield shown
+        elif os.path.isdir(path):
+            yield from _glob_level(path, shown, remaining, scanned)
+        return
+
+    regex = _compile_component(part)
+    try:
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        mtime = _dir_mtime(directory)
+        if mtime is not None:
+            scanned[directory] = mtime
+    except OSError:
+        return
+
+    for entry in entries:
+        if entry.name.startswith('.') and not part.startswith('.'):
+            continue
+        if not regex.match(os.path.normcase(entry.name)):
+            continue
+        shown = os.path.join(prefix, entry.name) if prefix else entry.name
+        try:
+            if last:
+                if entry.is_file():
+                    yield shown
+            elif entry.is_dir():
+                yield from _glob_level(entry.path, shown, remaining, scanned)
+        except OSError:
+            continue
+
+def _prune(cache: dict, now: float):
+    if len(cache) > CACHE_MAX_ENTRIES:
+        for key in [k for k, v in cache.items() if v[0] <= now]:
+            del cache[key]
+        if len(cache) > CACHE_MAX_ENTRIES:
+            cache.clear()
+
+def glob_candidates(p: str, limit: Union[int, None] = None) -> List[str]:
+    """
+    If the path contains glob chars, return matching files (up to `limit`, stopping the scan early).
+    Else return [p]. Results are cached for CACHE_TTL_SECONDS unless a scanned directory changes.
+    """
+    if not has_glob(p):
+        return [p]
+
+    key = (p, limit, None if os.path.isabs(p) else os.getcwd())
+    now = time.monotonic()
+    with _CACHE_LOCK:
+        cached = _GLOB_CACHE.get(key)
+    if cached and cached[0] > now and all(_dir_mtime(d) == m for d, m in cached[2].items()):
+        with _CACHE_LOCK:
+            _STATS['glob_hits'] += 1
+        return list(cached[1])
+
+    scanned: Dict[str, int] = {}
+    matches = []
+    for match in _iter_glob(p, scanned):
+        matches.append(match)
+        if limit is not None and len(matches) >= limit:
+            break
+
+    with _CACHE_LOCK:
+        _STATS['glob_misses'] += 1
+        _GLOB_CACHE[key] = (now + CACHE_TTL_SECONDS, matches, scanned)
+        _prune(_GLOB_CACHE, now)
+    return list(matches)
+
+# ---------- Cached resolve ----------
+
+def resolve(candidate: str) -> Tuple[Union[str, None], bool]:
+    """
+    Path(candidate).resolve(strict=True), cached briefly. Returns (resolved path or None if missing, is_file).
+    Only hits are cached, so a file created right after a miss is seen immediately.
+    """
+    key = (candidate, None if os.path.isabs(candidate) else os.getcwd())
+    now = time.monotonic()
+    with _CACHE_LOCK:
+        cached = _RESOLVE_CACHE.get(key)
+        if cached and cached[0] > now:
+            _STATS['resolve_hits'] += 1
+            return cached[1], cached[2]
+
+    try:
+        path = Path(candidate).resolve(strict=True)
+    except FileNotFoundError:
+        with _CACHE_LOCK:
+            _STATS['resolve_misses'] += 1
+        return None, False
+
+    resolved, is_file = str(path), path.is_file()
+    with _CACHE_LOCK:
+        _STATS['resolve_misses'] += 1
+        _RESOLVE_CACHE[key] = (now + CACHE_TTL_SECONDS, resolved, is_file)
+        _prune(_RESOLVE_CACHE, now)
+    return resolved, is_file
+
+def resolve_single_file(raw: str, max_matches: int = 200) -> Tuple[Union[str, None], Union[str, None], List[str]]:
+    """
+    Returns (resolved_path, error_message, matches_list_if_ambiguous)
+    - resolved_path: absolute path string if exactly one file resolved, else None
+    - error_message: error string or None
+    - matches_list_if_ambiguous: up to max_matches absolute paths if multiple matches
+    """
+    expanded = expand_path(raw)
+    # Two matches are enough to prove ambiguity; only list more if we have to report them.
+    candidates = glob_candidates(expanded, limit=2)
+
+    if not candidates:
+        return None, f'No files match path: {raw} (expanded: {expanded})', []
+
+    if len(candidates) > 1:
+        candidates = glob_candidates(expanded)
+        matches = sorted(resolve(c)[0] or os.path.abspath(c) for c in candidates)[:max_matches]
+        return None, f'Ambiguous path matched multiple files ({len(candidates)}).', matches
+
+    candidate = candidates[0]
+    resolved, is_file = resolve(candidate)
+    if resolved is None:
+        return None, f'File not found at path: {raw} (expanded: {candidate})', []
+
+    if not is_file:
+        return None, f'Path is not a file: {resolved}', []
+
+    return resolved, None, []
+
+def cache_stats() -> Dict[str, int]:
+    with _CACHE_LOCK:
+        return dict(_STATS)
+
+def clear_caches():
+    with _CACHE_LOCK:
+        _GLOB_CACHE.clear()
+        _RESOLVE_CACHE.clear()
+
+def get_stats() -> Dict[str, dict]:
+    """
+    Cache counters in the shape the server's /metrics collector expects.
+    """
+    stats = cache_stats()
+    return {'caches': {
+        'glob': {'hits': stats['glob_hits'], 'misses': stats['glob_misses']},
+        'resolve': {'hits': stats['resolve_hits'], 'misses': stats['resolve_misses']},
+    }}
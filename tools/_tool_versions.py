@@ -0,0 +1,98 @@
+# tools/_tool_versions.py
+# On-disk version history of tool files, shared by tool_creator (which writes versions) and the server
+# (which labels every loaded tool with its version).
+#
+# A version is identified by the hash of its source. Every version tool_creator installs is also kept
+# as tools/.versions/<tool_name>/<seq>-<version>.py, so it can be rolled back to later; only the newest
+# MCP_TOOL_VERSIONS_KEPT (default 5) per tool are kept.
+
+import os
+import re
+import time
+import hashlib
+import tempfile
+
+VERSIONS_DIRNAME = ".versions"
+VERSIONS_KEPT = int(os.environ.get("MCP_TOOL_VERSIONS_KEPT", "5"))
+
+_ENTRY = re.compile(r"^(\d+)-([0-9a-f]+)\.py$")
+
+def source_version(source):
+    """
+    The version id of a tool's source (bytes or str): the first 12 hex digits of its SHA-256.
+    """
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+    return hashlib.sha256(source).hexdigest()[:12]
+
+def atomic_write(path, data):
+    """
+    Replaces path with data (bytes) in one step: readers see the old file or the new one, never a mix.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _history_dir(tools_dir, tool_name):
+    return os.path.join(tools_dir, VERSIONS_DIRNAME, tool_name)
+
+def history(tools_dir, tool_name):
+    """
+    Archived versions of a tool, oldest first: [{"seq", "version", "path", "created"}].
+    """
+    directory = _history_dir(tools_dir, tool_name)
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    entries = []
+    for name in names:
+        match = _ENTRY.match(name)
+        if match:
+            path = os.path.join(directory, name)
+            entries.append({"seq": int(match.group(1)), "version": match.group(2), "path": path, "created": os.path.getmtime(path)})
+    entries.sort(key=lambda e: e["seq"])
+    return entries
+
+def archive(tools_dir, tool_name, source):
+    """
+    Adds source to the tool's history (unless it is already the newest entry) and prunes old entries.
+    Returns the history entry.
+    """
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+    version = source_version(source)
+    entries = history(tools_dir, tool_name)
+    if entries and entries[-1]["version"] == version:
+        return entries[-1]
+    directory = _history_dir(tools_dir, tool_name)
+    os.makedirs(directory, exist_ok=True)
+    seq = entries[-1]["seq"] + 1 if entries else 1
+    path = os.path.join(directory, f"{seq:04d}-{version}.py")
+    atomic_write(path, source)
+    entry = {"seq": seq, "version": version, "path": path, "created": time.time()}
+    prune(tools_dir, tool_name)
+    return entry
+
+def prune(tools_dir, tool_name, keep=None):
+    """
+    Deletes all but the newest `keep` (default VERSIONS_KEPT) archived versions.
+    """
+    keep = VERSIONS_KEPT if keep is None else keep
+    entries = history(tools_dir, tool_name)
+    for entry in entries[:max(0, len(entries) - max(keep, 1))]:
+        try:
+            os.remove(entry["path"])
+        except OSError:
+            pass
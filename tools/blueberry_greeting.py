@@ -1,6 +1,10 @@
 # tools/blueberry_greeting.py
 # A new tool created dynamically by tool_creator.
 
+import logging
+
+logger = logging.getLogger("mcp.tools.blueberry_greeting")
+
 def get_meta():
     """
     Returns metadata describing the tool.
@@ -26,7 +30,7 @@ def run(tool_input):
     """
     # The tool's name is hardcoded here to ensure it's always available.
     tool_name = "blueberry_greeting"
-    print(f"[blueberry_greeting] tool was executed with input: {tool_input}")
+    logger.debug("Tool was executed with input keys: %s", sorted(tool_input))
     
     message = tool_input.get('message', 'No message provided.')
 
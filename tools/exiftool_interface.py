@@ -2,16 +2,38 @@
 import subprocess
 import json
 import os
-import glob
-from pathlib import Path
+import time
+import queue
+import atexit
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Tuple, Union
 
+import _deadline
+import _path_resolver
+
+# ExifTool executable; point this at a stand-in script to test without a real install.
+EXIFTOOL_PATH = os.environ.get('EXIFTOOL_PATH', 'exiftool')
+# Number of long-lived `exiftool -stay_open` processes. 0 runs a fresh process per call instead.
+EXIFTOOL_POOL_SIZE = int(os.environ.get('EXIFTOOL_POOL_SIZE', str(min(4, os.cpu_count() or 1))))
+DEFAULT_TIMEOUT_SECONDS = 300
+# A failed availability check is retried after this long, in case ExifTool gets installed meanwhile.
+AVAILABILITY_RETRY_SECONDS = 30
+# Batch mode: upper bound on files per call, and on files handed to one ExifTool command.
+MAX_BATCH_FILES = 10000
+MAX_SHARD_FILES = 100
+# Entries kept in the read cache (keyed by path, mtime and size).
+METADATA_CACHE_SIZE = int(os.environ.get('EXIFTOOL_CACHE_SIZE', '10000'))
+
 def get_meta():
     return {
         'name': 'exiftool_interface',
         'description': (
             "Interact with ExifTool for reading/writing metadata on image/media files. "
-            "Supports ~, environment variables, relative paths, and globs. Requires ExifTool in PATH."
+            "Supports ~, environment variables, relative paths, and globs. Requires ExifTool in PATH. "
+            "Set batch=true (or pass file_paths) to read or write many files in one call."
         ),
         'input_schema': {
             'type': 'object',
@@ -20,6 +42,16 @@ def get_meta():
                     'type': 'string',
                     'description': 'Path to the image/media file. Supports ~, $ENV_VARS, ../, and globs like *.jpg'
                 },
+                'file_paths': {
+                    'type': 'array',
+                    'items': {'type': 'string'},
+                    'description': 'Batch mode: list of paths or globs to process in one call (implies batch=true).'
+                },
+                'batch': {
+                    'type': 'boolean',
+                    'description': 'Allow file_path globs to match many files; all matches are processed in parallel shards.',
+                    'default': False
+                },
                 'operation': {
                     'type': 'string',
                     'enum': ['read', 'write'],
@@ -34,112 +66,512 @@ def get_meta():
                     'type': 'object',
                     'additionalProperties': {'type': 'string'},
                     'description': 'Optional for "write": dict of tag->string value pairs to write.'
+                },
+                'timeout_seconds': {
+                    'type': 'number',
+                    'description': f'Optional: maximum time for the ExifTool command (default {DEFAULT_TIMEOUT_SECONDS}).'
                 }
             },
-            'required': ['file_path', 'operation']
+            'required': ['operation']
         }
     }
 
 # ---------- Path handling helpers ----------
 
-def _expand_user(p: str) -> str:
+def _resolve_single_path(raw: str) -> Tuple[Union[str, None], Union[str, None], List[str]]:
+    """
+    Returns (resolved_path, error_message, matches_list_if_ambiguous)
+    - resolved_path: absolute path string if exactly one file resolved, else None
+    - error_message: error string or None
+    - matches_list_if_ambiguous: list of absolute paths if multiple matches
+    """
+    return _path_resolver.resolve_single_file(raw, max_matches=200)
+
+# ---------- ExifTool availability ----------
+
+_AVAILABILITY = {'error': None, 'checked_at': None}
+_AVAILABILITY_LOCK = threading.Lock()
+
+def _probe_exiftool() -> Union[None, str]:
+    try:
+        subprocess.run([EXIFTOOL_PATH, '-ver'], check=True, capture_output=True, text=True, timeout=5)
+        return None
+    except FileNotFoundError:
+        return 'ExifTool is not installed or not found in system PATH.'
+    except subprocess.CalledProcessError as e:
+        return f'ExifTool found but version check failed: {e.stderr.strip()}'
+    except subprocess.TimeoutExpired:
+        return 'ExifTool version check timed out.'
+    except Exception as e:
+        return f'Unexpected error during ExifTool check: {e}'
+
+def _check_exiftool() -> Union[None, str]:
+    """
+    Runs `exiftool -ver` once per process; a success is remembered for good, a failure for a short while.
+    """
+    with _AVAILABILITY_LOCK:
+        checked_at = _AVAILABILITY['checked_at']
+        if checked_at is not None and (_AVAILABILITY['error'] is None or time.monotonic() - checked_at < AVAILABILITY_RETRY_SECONDS):
+            return _AVAILABILITY['error']
+        _AVAILABILITY['error'] = _probe_exiftool()
+        _AVAILABILITY['checked_at'] = time.monotonic()
+        return _AVAILABILITY['error']
+
+# ---------- Persistent ExifTool processes ----------
+
+class ExifToolError(Exception):
+    """
+    Raised when ExifTool reports an error for a command.
+    """
+
+class _ExifToolCrashed(ExifToolError):
+    pass
+
+class _ExifToolProcess:
     """
-    Robust ~ and ~user expansion with fallbacks.
+    One `exiftool -stay_open True -@ -` process. Arguments are written one per line to stdin, and each
+    command is framed by -executeN; ExifTool prints {readyN} to stdout and (via -echo4) {readyN} and the
+    exit status to stderr when done.
     """
-    p = (p or "").strip().strip('"').strip("'")
-    if not p.startswith('~'):
-        return p
 
-    # "~" or "~/" case
-    if p == '~' or p.startswith('~/'):
-        home = os.environ.get('HOME') or os.environ.get('USERPROFILE')
-        if not home:
+    def __init__(self, executable: str):
+        self.proc = subprocess.Popen(
+            [executable, '-stay_open', 'True', '-@', '-'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        self.stdout_lines: 'queue.Queue[Union[bytes, None]]' = queue.Queue()
+        self.stderr_lines: 'queue.Queue[Union[bytes, None]]' = queue.Queue()
+        self.counter = 0
+        for stream, lines in ((self.proc.stdout, self.stdout_lines), (self.proc.stderr, self.stderr_lines)):
+            threading.Thread(target=self._pump, args=(stream, lines), daemon=True).start()
+
+    @staticmethod
+    def _pump(stream, lines):
+        for line in iter(stream.readline, b''):
+            lines.put(line)
+        lines.put(None)
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def execute(self, args: List[str], timeout: float) -> Tuple[str, str, int]:
+        """
+        Returns (stdout, stderr, exit status) of one command, like a one-off exiftool run.
+        """
+        self.counter += 1
+        token = f'{{ready{self.counter}}}'
+        # stdout ends with -executeN's own {readyN}; stderr with this echo, which carries the command's status.
+        payload = '\n'.join(list(args) + ['-echo4', token + ' ${status}', f'-execute{self.counter}']) + '\n'
+        deadline = time.monotonic() + timeout
+        try:
+            self.proc.stdin.write(payload.encode('utf-8'))
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise _ExifToolCrashed(f'ExifTool process exited unexpectedly ({e})')
+        stdout, _ = self._collect(self.stdout_lines, token, deadline, timeout)
+        stderr, status = self._collect(self.stderr_lines, token, deadline, timeout)
+        try:
+            returncode = int(status)
+        except ValueError:
+            # An ExifTool without ${status} support echoes it verbatim; rely on Error lines alone.
+            returncode = 0
+        return stdout, stderr, returncode
+
+    def _collect(self, lines, token, deadline, timeout) -> Tuple[str, str]:
+        """
+        Reads lines up to the one starting with token. Returns (the text before it, the rest of that line).
+        """
+        collected = []
+        while True:
+            remaining = deadline - time.monotonic()
             try:
-                import pwd
-                home = pwd.getpwuid(os.getuid()).pw_dir
-            except Exception:
-                home = None
-        return (home + p[1:]) if home else str(Path(p).expanduser())
-
-    # "~username" on POSIX
-    if os.name != 'nt':
+                # Short waits, so an aborted call is noticed; the pool then kills this process.
+                line = lines.get(timeout=min(remaining, _deadline.POLL_SECONDS)) if remaining > 0 else lines.get_nowait()
+            except queue.Empty:
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(EXIFTOOL_PATH, timeout)
+                _deadline.check()
+                continue
+            if line is None:
+                raise _ExifToolCrashed('ExifTool process exited unexpectedly')
+            text = line.decode('utf-8', errors='ignore')
+            marker = text.rstrip('\r\n')
+            if marker == token or marker.startswith(token + ' '):
+                return ''.join(collected), marker[len(token):].strip()
+            collected.append(text)
+
+    def close(self):
         try:
-            import pwd
-            user = p[1:].split('/', 1)[0]
-            rest = p[1 + len(user):]
-            home = pwd.getpwnam(user).pw_dir
-            return home + rest
+            if self.alive():
+                self.proc.stdin.write(b'-stay_open\nFalse\n')
+                self.proc.stdin.flush()
+                self.proc.wait(timeout=2)
         except Exception:
             pass
+        self.kill()
 
-    return str(Path(p).expanduser())
+    def kill(self):
+        if self.alive():
+            self.proc.kill()
+            self.proc.wait()
+
+class _ExifToolPool:
+    """
+    Hands out idle ExifTool processes, starting new ones on demand up to `size`.
+    Processes that time out or crash are killed and replaced on the next call.
+    """
 
-def _expand_path(p: str) -> str:
-    p = _expand_user(p)
-    p = os.path.expandvars(p)
-    return os.path.normpath(p)
+    def __init__(self, executable: str, size: int):
+        self.executable = executable
+        self.slots = threading.BoundedSemaphore(size)
+        self.idle: 'queue.LifoQueue[_ExifToolProcess]' = queue.LifoQueue()
+        self.all: List[_ExifToolProcess] = []
+        self.lock = threading.Lock()
+
+    def execute(self, args: List[str], timeout: float) -> Tuple[str, str, int]:
+        wait_until = time.monotonic() + timeout
+        while not self.slots.acquire(timeout=min(max(wait_until - time.monotonic(), 0), _deadline.POLL_SECONDS)):
+            if time.monotonic() >= wait_until:
+                raise subprocess.TimeoutExpired(self.executable, timeout)
+            _deadline.check()
+        try:
+            proc = self._checkout()
+            try:
+                result = proc.execute(args, timeout)
+            except BaseException:
+                # Its output stream is now out of sync (or it is gone); never reuse it.
+                self._discard(proc)
+                raise
+            self.idle.put(proc)
+            return result
+        finally:
+            self.slots.release()
+
+    def _checkout(self) -> _ExifToolProcess:
+        while True:
+            try:
+                proc = self.idle.get_nowait()
+            except queue.Empty:
+                proc = _ExifToolProcess(self.executable)
+                with self.lock:
+                    self.all.append(proc)
+                return proc
+            if proc.alive():
+                return proc
+            self._discard(proc)
+
+    def _discard(self, proc: _ExifToolProcess):
+        with self.lock:
+            if proc in self.all:
+                self.all.remove(proc)
+        # A discarded process is dead, hung or mid-command; asking it to exit politely would only wait.
+        proc.kill()
+
+    def close(self):
+        with self.lock:
+            procs, self.all = self.all, []
+        for proc in procs:
+            proc.close()
+
+_POOL: Union[_ExifToolPool, None] = None
+_POOL_LOCK = threading.Lock()
+
+def _get_pool() -> _ExifToolPool:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = _ExifToolPool(EXIFTOOL_PATH, EXIFTOOL_POOL_SIZE)
+            atexit.register(_POOL.close)
+        return _POOL
+
+def close():
+    """
+    Stops this module's persistent ExifTool processes. Called by the server when this version of the
+    tool has been replaced and its last call has finished.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        atexit.unregister(pool.close)
+        pool.close()
 
-def _glob_candidates(p: str) -> List[str]:
-    # Return file matches if glob chars present; else return [p]
-    if any(ch in p for ch in ['*', '?', '[']):
-        return [m for m in glob.glob(p) if os.path.isfile(m)]
-    return [p]
+def _error_lines(stderr: str) -> List[str]:
+    return [line for line in stderr.splitlines() if line.startswith('Error')]
 
-def _resolve_single_path(raw: str) -> Tuple[Union[str, None], Union[str, None], List[str]]:
+def _errors_by_file(stderr: str, paths: List[str]) -> Dict[str, str]:
     """
-    Returns (resolved_path, error_message, matches_list_if_ambiguous)
-    - resolved_path: absolute path string if exactly one file resolved, else None
-    - error_message: error string or None
-    - matches_list_if_ambiguous: list of absolute paths if multiple matches
+    Maps each of paths that ExifTool names in an "Error: ... - <file>" line to its error message(s).
+    Names are matched exactly, so /x/a.jpg doesn't pick up errors about /x/a.jpg.bak or /y/x/a.jpg.
+    """
+    wanted = set(paths)
+    found: Dict[str, List[str]] = {}
+    for line in _error_lines(stderr):
+        # The file name is whatever follows a " - " separator; try the earliest first, as names may contain one.
+        start = line.find(' - ')
+        while start != -1:
+            name = line[start + 3:]
+            if name in wanted:
+                found.setdefault(name, []).append(line)
+                break
+            start = line.find(' - ', start + 1)
+    return {path: ' '.join(lines) for path, lines in found.items()}
+
+def _argfile_safe(arg: str) -> bool:
+    """
+    Whether arg survives ExifTool's -@ argument file (the stay_open pool's input) unchanged. Lines are
+    split on newlines, trimmed of surrounding whitespace, and skipped when they start with '#'.
+    """
+    return '\n' not in arg and '\r' not in arg and arg == arg.strip() and not arg.startswith('#')
+
+def _exec_exiftool(args: List[str], timeout: float) -> Tuple[str, str]:
     """
-    expanded = _expand_path(raw)
-    candidates = _glob_candidates(expanded)
+    Runs one ExifTool command and returns (stdout, stderr), whatever ExifTool reported. A nonzero exit
+    status without an Error line of its own gets one, in pool and one-off mode alike.
+    """
+    # Arguments the -@ argument file would alter need a one-off process.
+    if EXIFTOOL_POOL_SIZE > 0 and all(_argfile_safe(a) for a in args):
+        stdout, stderr, returncode = _get_pool().execute(args, timeout)
+    else:
+        result = _deadline.run([EXIFTOOL_PATH] + args, capture_output=True, text=True, errors='ignore', timeout=timeout)
+        stdout, stderr, returncode = result.stdout, result.stderr, result.returncode
+    if returncode != 0 and not _error_lines(stderr):
+        return stdout, f'Error: exiftool exited with status {returncode}. {stderr.strip()}'
+    return stdout, stderr
+
+def _run_exiftool(args: List[str], timeout: float) -> str:
+    """
+    Runs one ExifTool command and returns its stdout. Raises ExifToolError or subprocess.TimeoutExpired.
+    """
+    stdout, stderr = _exec_exiftool(args, timeout)
+    if _error_lines(stderr):
+        raise ExifToolError(stderr.strip())
+    return stdout
 
-    if not candidates:
-        return None, f'No files match path: {raw} (expanded: {expanded})', []
+# ---------- Metadata cache ----------
 
-    if len(candidates) > 1:
-        matches = sorted(str(Path(c).resolve()) for c in candidates)[:200]
-        return None, f'Ambiguous path matched multiple files ({len(candidates)}).', matches
+_METADATA_CACHE: 'OrderedDict[str, Tuple[int, int, Dict[str, Any]]]' = OrderedDict()
+_METADATA_CACHE_LOCK = threading.Lock()
+_METADATA_CACHE_STATS = {'hits': 0, 'misses': 0}
 
-    candidate = candidates[0]
+def _file_signature(path: str) -> Union[Tuple[int, int], None]:
     try:
-        resolved = Path(candidate).resolve(strict=True)
-    except FileNotFoundError:
-        return None, f'File not found at path: {raw} (expanded: {candidate})', []
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
 
-    if not resolved.is_file():
-        return None, f'Path is not a file: {resolved}', []
+def _cache_get(path: str, signature) -> Union[Dict[str, Any], None]:
+    if signature is None or METADATA_CACHE_SIZE <= 0:
+        return None
+    with _METADATA_CACHE_LOCK:
+        entry = _METADATA_CACHE.get(path)
+        if entry is None or (entry[0], entry[1]) != signature:
+            _METADATA_CACHE_STATS['misses'] += 1
+            return None
+        _METADATA_CACHE_STATS['hits'] += 1
+        _METADATA_CACHE.move_to_end(path)
+        return entry[2]
+
+def _cache_put(path: str, signature, metadata: Dict[str, Any]):
+    if signature is None or METADATA_CACHE_SIZE <= 0:
+        return
+    with _METADATA_CACHE_LOCK:
+        _METADATA_CACHE[path] = (signature[0], signature[1], metadata)
+        _METADATA_CACHE.move_to_end(path)
+        while len(_METADATA_CACHE) > METADATA_CACHE_SIZE:
+            _METADATA_CACHE.popitem(last=False)
+
+def _cache_invalidate(paths: List[str]):
+    # Writes may keep the mtime (-P), so don't rely on the signature changing.
+    with _METADATA_CACHE_LOCK:
+        for path in paths:
+            _METADATA_CACHE.pop(path, None)
+
+def get_stats() -> Dict[str, Any]:
+    """
+    Metadata cache counters, scraped by the server's /metrics endpoint.
+    """
+    with _METADATA_CACHE_LOCK:
+        return {'caches': {'metadata': dict(_METADATA_CACHE_STATS, size=len(_METADATA_CACHE))}}
 
-    return str(resolved), None, []
+def _select_tags(metadata: Dict[str, Any], tags_to_read: List[str]) -> Dict[str, Any]:
+    if not tags_to_read:
+        return metadata
+    # Only include requested tags that exist
+    return {tag: metadata.get(tag) for tag in tags_to_read if tag in metadata}
 
-# ---------- ExifTool availability ----------
+# ---------- Batch mode ----------
 
-def _check_exiftool() -> Union[None, str]:
-    try:
-        subprocess.run(['exiftool', '-ver'], check=True, capture_output=True, text=True, timeout=5)
-        return None
-    except FileNotFoundError:
-        return 'ExifTool is not installed or not found in system PATH.'
-    except subprocess.CalledProcessError as e:
-        return f'ExifTool found but version check failed: {e.stderr.strip()}'
-    except subprocess.TimeoutExpired:
-        return 'ExifTool version check timed out.'
-    except Exception as e:
-        return f'Unexpected error during ExifTool check: {e}'
+def _resolve_many(raw_paths: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Expands each path or glob to existing files. Returns (unique resolved paths in order, {raw: error}).
+    """
+    resolved: Dict[str, None] = {}
+    errors: Dict[str, str] = {}
+    for raw in raw_paths:
+        if not isinstance(raw, str) or not raw.strip():
+            errors[str(raw)] = 'Path must be a non-empty string.'
+            continue
+        expanded = _path_resolver.expand_path(raw)
+        candidates = _path_resolver.glob_candidates(expanded)
+        if not candidates:
+            errors[raw] = f'No files match path: {raw} (expanded: {expanded})'
+            continue
+        for candidate in candidates:
+            path, is_file = _path_resolver.resolve(candidate)
+            if path is None:
+                errors[raw] = f'File not found at path: {raw} (expanded: {candidate})'
+            elif is_file:
+                resolved[path] = None
+            else:
+                errors[raw] = f'Path is not a file: {path}'
+    return list(resolved), errors
+
+def _shards(paths: List[str]) -> List[List[str]]:
+    # Enough shards to keep every pool process busy, but never more than MAX_SHARD_FILES per command.
+    workers = max(EXIFTOOL_POOL_SIZE, 1)
+    size = min(MAX_SHARD_FILES, max(1, -(-len(paths) // workers)))
+    return [paths[i:i + size] for i in range(0, len(paths), size)]
+
+def _map_shards(func, shards: List[List[str]]):
+    # Each shard runs in a copy of the caller's context, so it sees the call's deadline and trace.
+    contexts = [contextvars.copy_context() for _ in shards]
+    with ThreadPoolExecutor(max_workers=max(1, min(max(EXIFTOOL_POOL_SIZE, 1), len(shards)))) as executor:
+        return list(executor.map(lambda context, shard: context.run(func, shard), contexts, shards))
+
+def _batch_read(paths: List[str], tags_to_read: List[str], timeout: float, errors: Dict[str, str]) -> Dict[str, Any]:
+    data: Dict[str, Any] = {}
+    signatures = {}
+    misses = []
+    for path in paths:
+        signatures[path] = _file_signature(path)
+        cached = _cache_get(path, signatures[path])
+        if cached is None:
+            misses.append(path)
+        else:
+            data[path] = cached
+
+    def read_shard(shard):
+        try:
+            stdout, stderr = _exec_exiftool(['-json'] + shard, timeout)
+        except subprocess.TimeoutExpired:
+            return {}, {p: 'ExifTool read operation timed out.' for p in shard}
+        except Exception as e:
+            return {}, {p: f'ExifTool read failed: {e}' for p in shard}
+        try:
+            records = json.loads(stdout) if stdout.strip() else []
+        except json.JSONDecodeError as e:
+            return {}, {p: f'Failed to parse ExifTool JSON output: {e}' for p in shard}
+        found = {record.get('SourceFile'): record for record in records if isinstance(record, dict)}
+        missing = {p: (' '.join(_error_lines(stderr)) or 'ExifTool returned no metadata.') for p in shard if p not in found}
+        return found, missing
+
+    for found, missing in _map_shards(read_shard, _shards(misses)):
+        errors.update(missing)
+        for path, metadata in found.items():
+            if path in signatures:
+                _cache_put(path, signatures[path], metadata)
+                data[path] = metadata
+
+    return {
+        'data': {path: _select_tags(data[path], tags_to_read) for path in paths if path in data},
+        'cache_hits': len(paths) - len(misses)
+    }
+
+def _batch_write(paths: List[str], write_args: List[str], timeout: float, errors: Dict[str, str]) -> Dict[str, Any]:
+    def write_shard(shard):
+        try:
+            stdout, stderr = _exec_exiftool(write_args + shard, timeout)
+        except subprocess.TimeoutExpired:
+            return shard, '', {p: 'ExifTool write operation timed out.' for p in shard}
+        except Exception as e:
+            return shard, '', {p: f'ExifTool write failed: {e}' for p in shard}
+        # ExifTool names the failing file in its error lines; an error naming none applies to the whole shard.
+        error = ' '.join(_error_lines(stderr))
+        failed = _errors_by_file(stderr, shard) or ({p: error for p in shard} if error else {})
+        return shard, stdout.strip(), failed
+
+    summaries = []
+    for shard, summary, failed in _map_shards(write_shard, _shards(paths)):
+        _cache_invalidate(shard)
+        if summary:
+            summaries.append(summary)
+        errors.update(failed)
+
+    return {'updated_files': [p for p in paths if p not in errors], 'summary': summaries}
+
+def _run_batch(raw_paths: List[str], operation: str, tags_to_read: List[str], write_args: List[str], timeout: float) -> Dict[str, Any]:
+    paths, errors = _resolve_many(raw_paths)
+    if len(paths) > MAX_BATCH_FILES:
+        return {'status': 'error', 'message': f'Batch matched {len(paths)} files; the limit is {MAX_BATCH_FILES}.'}
+    if not paths:
+        return {'status': 'error', 'message': 'No files matched.', 'errors': errors}
+
+    if operation == 'read':
+        out = _batch_read(paths, tags_to_read, timeout, errors)
+    else:
+        out = _batch_write(paths, write_args, timeout, errors)
+
+    failed = sum(1 for p in paths if p in errors)
+    message = f'{operation.capitalize()} {len(paths) - failed} of {len(paths)} files.'
+    if errors:
+        message += f' {len(errors)} path(s) failed; see errors.'
+    result = {
+        'status': 'success' if not errors else 'error',
+        'message': message,
+        'count': len(paths) - failed
+    }
+    result.update(out)
+    if errors:
+        result['errors'] = errors
+    return result
 
 # ---------- Main tool API ----------
 
+def _build_write_args(metadata_to_write: Any) -> Tuple[List[str], Union[str, None]]:
+    if not isinstance(metadata_to_write, dict) or not metadata_to_write:
+        return [], 'metadata_to_write is required for "write" and must be a non-empty object.'
+
+    # Ensure all values are strings (per schema)
+    write_args = []
+    for tag, value in metadata_to_write.items():
+        if not isinstance(value, str):
+            return [], f'Invalid value type for "{tag}". Must be a string.'
+        write_args.append(f'-{tag}={value}')
+    return write_args, None
+
 def run(tool_input: Dict[str, Any]) -> Dict[str, Any]:
     file_path = tool_input.get('file_path')
+    file_paths = tool_input.get('file_paths')
+    batch = bool(tool_input.get('batch', False)) or file_paths is not None
     operation = tool_input.get('operation')
     tags_to_read = tool_input.get('tags_to_read', [])
     metadata_to_write = tool_input.get('metadata_to_write', {})
+    timeout = tool_input.get('timeout_seconds', DEFAULT_TIMEOUT_SECONDS)
 
-    if not isinstance(file_path, str) or not file_path.strip():
+    if file_paths is not None and (not isinstance(file_paths, list) or not file_paths):
+        return {'status': 'error', 'message': 'file_paths must be a non-empty list of strings.'}
+    if file_paths is None and (not isinstance(file_path, str) or not file_path.strip()):
         return {'status': 'error', 'message': 'file_path is required as a non-empty string.'}
     if operation not in ('read', 'write'):
         return {'status': 'error', 'message': f'Invalid operation: "{operation}". Must be "read" or "write".'}
+    if not isinstance(timeout, (int, float)) or timeout <= 0:
+        return {'status': 'error', 'message': 'timeout_seconds must be a positive number.'}
+    # Never wait past the request's own deadline.
+    timeout = _deadline.timeout(timeout)
+
+    write_args: List[str] = []
+    if operation == 'write':
+        write_args, err = _build_write_args(metadata_to_write)
+        if err:
+            return {'status': 'error', 'message': err}
+
+    if batch:
+        avail_err = _check_exiftool()
+        if avail_err:
+            return {'status': 'error', 'message': avail_err}
+        return _run_batch(file_paths if file_paths is not None else [file_path], operation, tags_to_read, write_args, timeout)
 
     resolved_path, err, matches = _resolve_single_path(file_path)
     if err:
@@ -152,58 +584,48 @@ def run(tool_input: Dict[str, Any]) -> Dict[str, Any]:
     if avail_err:
         return {'status': 'error', 'message': avail_err}
 
-    base_command = ['exiftool']
-
     if operation == 'read':
-        command = base_command + ['-json', resolved_path]
+        command = ['-json', resolved_path]
+        stdout = None
         try:
-            result = subprocess.run(command, check=True, capture_output=True, text=True, errors='ignore', timeout=300)
-            output_data = json.loads(result.stdout) if result.stdout.strip() else []
-            metadata: Dict[str, Any] = output_data[0] if output_data else {}
-
-            if tags_to_read:
-                # Only include requested tags that exist
-                metadata = {tag: metadata.get(tag) for tag in tags_to_read if tag in metadata}
+            signature = _file_signature(resolved_path)
+            metadata = _cache_get(resolved_path, signature)
+            if metadata is None:
+                stdout = _run_exiftool(command, timeout)
+                output_data = json.loads(stdout) if stdout.strip() else []
+                metadata = output_data[0] if output_data else {}
+                _cache_put(resolved_path, signature, metadata)
 
             # Return raw metadata as "data" (no vague message)
             return {
                 'status': 'success',
                 'resolved_path': resolved_path,
-                'data': metadata
+                'data': _select_tags(metadata, tags_to_read)
             }
 
         except json.JSONDecodeError as e:
-            snippet = (result.stdout or '')[:500] if 'result' in locals() else 'N/A'
+            snippet = (stdout or '')[:500]
             return {'status': 'error', 'message': f'Failed to parse ExifTool JSON output: {e}. Output snippet: {snippet}'}
-        except subprocess.CalledProcessError as e:
-            return {'status': 'error', 'message': f'ExifTool read failed: {e.stderr.strip()}. Command: {" ".join(command)}'}
+        except ExifToolError as e:
+            return {'status': 'error', 'message': f'ExifTool read failed: {e}. Command: exiftool {" ".join(command)}'}
         except subprocess.TimeoutExpired:
             return {'status': 'error', 'message': 'ExifTool read operation timed out.'}
         except Exception as e:
             return {'status': 'error', 'message': f'Unexpected error during read: {e}'}
 
     # operation == 'write'
-    if not isinstance(metadata_to_write, dict) or not metadata_to_write:
-        return {'status': 'error', 'message': 'metadata_to_write is required for "write" and must be a non-empty object.'}
-
-    # Ensure all values are strings (per schema)
-    write_args = []
-    for tag, value in metadata_to_write.items():
-        if not isinstance(value, str):
-            return {'status': 'error', 'message': f'Invalid value type for "{tag}". Must be a string.'}
-        write_args.append(f'-{tag}={value}')
-
-    command = base_command + write_args + [resolved_path]
+    command = write_args + [resolved_path]
 
     try:
-        result = subprocess.run(command, check=True, capture_output=True, text=True, errors='ignore', timeout=300)
+        stdout = _run_exiftool(command, timeout)
+        _cache_invalidate([resolved_path])
         return {
             'status': 'success',
             'resolved_path': resolved_path,
-            'data': json.loads(json.dumps({'summary': result.stdout.strip()}, indent=2))
+            'data': {'summary': stdout.strip()}
         }
-    except subprocess.CalledProcessError as e:
-        return {'status': 'error', 'message': f'ExifTool write failed: {e.stderr.strip()}. Command: {" ".join(command)}'}
+    except ExifToolError as e:
+        return {'status': 'error', 'message': f'ExifTool write failed: {e}. Command: exiftool {" ".join(command)}'}
     except subprocess.TimeoutExpired:
         return {'status': 'error', 'message': 'ExifTool write operation timed out.'}
     except Exception as e:
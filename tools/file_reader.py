@@ -2,6 +2,11 @@
 # An example of a dynamically loadable tool with self-describing metadata.
 
 import os
+import logging
+
+import _path_resolver
+
+logger = logging.getLogger("mcp.tools.file_reader")
 
 def get_meta():
     """
@@ -15,7 +20,7 @@ def get_meta():
             "properties": {
                 "filepath": {
                     "type": "string",
-                    "description": "The relative or absolute path to the file to be read."
+                    "description": "The relative or absolute path to the file to be read. Supports ~ and environment variables like $HOME."
                 }
             },
             "required": ["filepath"]
@@ -33,9 +38,8 @@ def run(tool_input):
     Returns:
         dict: A dictionary containing the result of the tool's operation.
     """
-    print(f"[file_reader] Received input: {tool_input}")
-
     filepath = tool_input.get('filepath')
+    logger.debug("Reading %s", filepath)
 
     if not filepath:
         return {
@@ -46,6 +50,7 @@ def run(tool_input):
     # SECURITY NOTE: In a real application, you would need to strictly validate
     # this path to prevent directory traversal attacks.
     try:
+        filepath = _path_resolver.expand_path(filepath)
         if os.path.exists(filepath):
             with open(filepath, 'r', encoding='utf-8') as f:
                 content = f.read()
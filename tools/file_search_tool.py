@@ -0,0 +1,360 @@
+# tools/file_search_tool.py
+# Fast text search over a directory tree, backed by a persistent, incrementally updated trigram index.
+
+import os
+import re
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional
+
+import _deadline
+import _path_resolver
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_parse
+
+INDEX_DIR = os.environ.get('MCP_SEARCH_INDEX_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'mcp_file_search')
+# Larger files aren't indexed; searches scan them line by line instead.
+MAX_FILE_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_RESULTS = 200
+DEFAULT_EXCLUDE_DIRS = ('.git', '.hg', '.svn', 'node_modules', '__pycache__', '.venv', 'venv', '.mypy_cache', '.pytest_cache')
+MAX_QUERY_TRIGRAMS = 64
+
+# One lock per index file, so concurrent requests don't refresh the same index at once.
+_INDEX_LOCKS: Dict[str, threading.Lock] = {}
+_INDEX_LOCKS_GUARD = threading.Lock()
+
+def get_meta():
+    return {
+        'name': 'file_search_tool',
+        'description': (
+            'Searches the text content of all files under a directory for a substring or regular expression and '
+            'returns matching lines with line numbers. Uses a persistent trigram index that is updated incrementally '
+            '(only changed files are re-read), so repeated searches over the same tree are fast.'
+        ),
+        'input_schema': {
+            'type': 'object',
+            'properties': {
+                'path': {'type': 'string', 'description': 'Root directory to search. Supports ~ and $ENV_VARS.'},
+                'query': {'type': 'string', 'description': 'Substring or regular expression to search for. Not needed for operation "index".'},
+                'regex': {'type': 'boolean', 'description': 'Treat query as a Python regular expression.', 'default': False},
+                'ignore_case': {'type': 'boolean', 'description': 'Case-insensitive matching.', 'default': False},
+                'max_results': {'type': 'integer', 'description': f'Maximum matching lines to return (default {DEFAULT_MAX_RESULTS}).', 'default': DEFAULT_MAX_RESULTS},
+                'operation': {
+                    'type': 'string',
+                    'enum': ['search', 'index'],
+                    'description': '"search" (default) refreshes the index and searches; "index" only builds/refreshes the index.',
+                    'default': 'search'
+                },
+                'refresh': {'type': 'boolean', 'description': 'Re-check files for changes before searching. Set false to search the index as-is.', 'default': True}
+            },
+            'required': ['path']
+        }
+    }
+
+# ---------- Index storage ----------
+
+def _index_path_for(root: str) -> str:
+    digest = hashlib.sha1(root.encode('utf-8', 'surrogateescape')).hexdigest()[:16]
+    return os.path.join(INDEX_DIR, f'{digest}.sqlite3')
+
+def _lock_for(index_path: str) -> threading.Lock:
+    with _INDEX_LOCKS_GUARD:
+        lock = _INDEX_LOCKS.get(index_path)
+        if lock is None:
+            lock = _INDEX_LOCKS[index_path] = threading.Lock()
+        return lock
+
+def _connect(index_path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    conn = sqlite3.connect(index_path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            path TEXT UNIQUE NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS trigrams (
+            tri TEXT NOT NULL,
+            file_id INTEGER NOT NULL,
+            PRIMARY KEY (tri, file_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS trigrams_by_file ON trigrams (file_id);
+    ''')
+    return conn
+
+# ---------- Indexing ----------
+
+def _iter_files(root: str):
+    """
+    Yields (relative_path, stat_result) for every regular file under root, skipping noise directories.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        _deadline.check()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in DEFAULT_EXCLUDE_DIRS:
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield os.path.relpath(entry.path, root), entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+
+def _read_text(path: str) -> Optional[str]:
+    """
+    Returns the decoded text of a file, or None for binary, oversized or unreadable files.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read(MAX_FILE_BYTES + 1)
+    except OSError:
+        return None
+    if len(data) > MAX_FILE_BYTES or b'\x00' in data[:8192]:
+        return None
+    return data.decode('utf-8', errors='replace')
+
+def _strip_ending(line: str) -> str:
+    if line.endswith('\n'):
+        line = line[:-1]
+    return line[:-1] if line.endswith('\r') else line
+
+def _lines(text: str) -> List[str]:
+    """
+    Splits text on "\n" only, like a file is read line by line (str.splitlines() also breaks on
+    \f, \v, a lone \r and others, which would throw off line numbers).
+    """
+    lines = text.split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    return [line[:-1] if line.endswith('\r') else line for line in lines]
+
+def _scan_large_file(path: str, matcher, rel_path: str, matches: List[dict], max_results: int) -> Optional[bool]:
+    """
+    Streams a file too large to index, appending matching lines. Returns True if max_results was
+    reached, False otherwise, or None if the file is binary or unreadable.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if b'\x00' in f.read(8192):
+                return None
+            f.seek(0)
+            for line_no, raw in enumerate(f, start=1):
+                if line_no % 10000 == 0:
+                    _deadline.check()
+                line = _strip_ending(raw.decode('utf-8', errors='replace'))
+                if matcher.search(line):
+                    if len(matches) >= max_results:
+                        return True
+                    matches.append({'path': rel_path, 'line': line_no, 'text': line[:1000]})
+    except OSError:
+        return None
+    return False
+
+def _trigrams(text: str):
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _refresh(conn: sqlite3.Connection, root: str) -> Dict[str, int]:
+    """
+    Brings the index up to date with the tree: only files whose mtime or size changed are re-read.
+    """
+    known = {path: (fid, mtime_ns, size) for fid, path, mtime_ns, size in conn.execute('SELECT id, path, mtime_ns, size FROM files')}
+    seen = set()
+    added = updated = 0
+
+    with conn:
+        for rel_path, st in _iter_files(root):
+            seen.add(rel_path)
+            previous = known.get(rel_path)
+            if previous and previous[1] == st.st_mtime_ns and previous[2] == st.st_size:
+                continue
+
+            if previous:
+                fid = previous[0]
+                conn.execute('DELETE FROM trigrams WHERE file_id = ?', (fid,))
+                conn.execute('UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?', (st.st_mtime_ns, st.st_size, fid))
+                updated += 1
+            else:
+                fid = conn.execute('INSERT INTO files (path, mtime_ns, size) VALUES (?, ?, ?)', (rel_path, st.st_mtime_ns, st.st_size)).lastrowid
+                added += 1
+
+            # Binary and oversized files stay in the files table (so they aren't re-checked) but get no trigrams;
+            # searches always scan oversized ones (see _candidate_rows).
+            text = _read_text(os.path.join(root, rel_path))
+            if text:
+                conn.executemany('INSERT OR IGNORE INTO trigrams (tri, file_id) VALUES (?, ?)', ((t, fid) for t in _trigrams(text)))
+
+        removed = [(fid,) for path, (fid, _, _) in known.items() if path not in seen]
+        if removed:
+            conn.executemany('DELETE FROM trigrams WHERE file_id = ?', removed)
+            conn.executemany('DELETE FROM files WHERE id = ?', removed)
+
+    return {'files_indexed': len(seen), 'added': added, 'updated': updated, 'removed': len(removed)}
+
+# ---------- Querying ----------
+
+def _regex_literals(pattern: str) -> List[str]:
+    """
+    Returns literal runs that every match of the pattern must contain.
+    Conservative: only top-level literal sequences are used; anything with alternation yields no pruning.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return []
+
+    runs, current = [], []
+    for op, arg in parsed:
+        if op is sre_parse.LITERAL:
+            current.append(chr(arg))
+            continue
+        if op is sre_parse.BRANCH:
+            return []
+        if current:
+            runs.append(''.join(current))
+            current = []
+    if current:
+        runs.append(''.join(current))
+    return runs
+
+def _candidate_rows(conn: sqlite3.Connection, literals: List[str]) -> List[tuple]:
+    """
+    Returns (path, size) of the files that may match: those containing every trigram of the literals,
+    plus files too large to have been indexed. Without usable trigrams, every file.
+    """
+    required = set()
+    for literal in literals:
+        required |= _trigrams(literal)
+    if not required:
+        return conn.execute('SELECT path, size FROM files ORDER BY path').fetchall()
+
+    # Only the (bounded) trigrams are bound as variables; the matching ids never leave SQLite.
+    tris = sorted(required)[:MAX_QUERY_TRIGRAMS]
+    placeholders = ','.join('?' * len(tris))
+    return conn.execute(
+        f'''SELECT path, size FROM files
+            WHERE id IN (SELECT file_id FROM trigrams WHERE tri IN ({placeholders}) GROUP BY file_id HAVING COUNT(*) = ?)
+               OR size > ?
+            ORDER BY path''',
+        (*tris, len(tris), MAX_FILE_BYTES)
+    ).fetchall()
+
+def _search(conn, root, query, use_regex, ignore_case, max_results):
+    flags = re.IGNORECASE if ignore_case else 0
+    matcher = re.compile(query if use_regex else re.escape(query), flags)
+    literals = _regex_literals(query) if use_regex else [query]
+
+    rows = _candidate_rows(conn, literals)
+
+    matches = []
+    truncated = False
+    large_files_scanned = 0
+    for rel_path, size in rows:
+        _deadline.check()
+        path = os.path.join(root, rel_path)
+        if size > MAX_FILE_BYTES:
+            reached = _scan_large_file(path, matcher, rel_path, matches, max_results)
+            if reached is not None:
+                large_files_scanned += 1
+            if reached:
+                truncated = True
+                break
+            continue
+        text = _read_text(path)
+        if not text or not matcher.search(text):
+            continue
+        for line_no, line in enumerate(_lines(text), start=1):
+            if matcher.search(line):
+                if len(matches) >= max_results:
+                    truncated = True
+                    break
+                matches.append({'path': rel_path, 'line': line_no, 'text': line[:1000]})
+        if truncated:
+            break
+
+    return matches, len(rows), truncated, large_files_scanned
+
+# ---------- Main tool API ----------
+
+def run(tool_input: Dict[str, Any]) -> Dict[str, Any]:
+    raw_path = tool_input.get('path')
+    query = tool_input.get('query')
+    operation = tool_input.get('operation', 'search')
+    use_regex = bool(tool_input.get('regex', False))
+    ignore_case = bool(tool_input.get('ignore_case', False))
+    max_results = tool_input.get('max_results', DEFAULT_MAX_RESULTS)
+    refresh = tool_input.get('refresh', True)
+
+    if not isinstance(raw_path, str) or not raw_path.strip():
+        return {'status': 'error', 'message': 'path is required as a non-empty string.'}
+    if operation not in ('search', 'index'):
+        return {'status': 'error', 'message': f'Invalid operation: "{operation}". Must be "search" or "index".'}
+    if operation == 'search' and (not isinstance(query, str) or not query):
+        return {'status': 'error', 'message': 'query is required as a non-empty string for "search".'}
+    if not isinstance(max_results, int) or max_results < 1:
+        return {'status': 'error', 'message': 'max_results must be a positive integer.'}
+
+    expanded_path = _path_resolver.expand_path(raw_path)
+    root, is_file = _path_resolver.resolve(expanded_path)
+    if root is None:
+        return {'status': 'error', 'message': f"Path does not exist: '{expanded_path}'"}
+    if is_file or not os.path.isdir(root):
+        return {'status': 'error', 'message': f"Path is not a directory: '{expanded_path}'"}
+
+    if use_regex and operation == 'search':
+        try:
+            re.compile(query)
+        except re.error as e:
+            return {'status': 'error', 'message': f'Invalid regular expression: {e}'}
+
+    index_path = _index_path_for(root)
+    started = time.perf_counter()
+    try:
+        conn = _connect(index_path)
+        try:
+            stats = None
+            if refresh or operation == 'index':
+                with _lock_for(index_path):
+                    stats = _refresh(conn, root)
+            if operation == 'index':
+                return {
+                    'status': 'success',
+                    'message': f'Indexed {stats["files_indexed"]} files under {root}.',
+                    'index_path': index_path,
+                    'index_stats': stats,
+                    'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+                }
+            matches, candidates, truncated, large_files_scanned = _search(conn, root, query, use_regex, ignore_case, max_results)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        return {'status': 'error', 'message': f'Search index error ({index_path}): {e}'}
+    except Exception as e:
+        return {'status': 'error', 'message': f'Search failed: {e.__class__.__name__}: {e}'}
+
+    return {
+        'status': 'success',
+        'root': root,
+        'matches': matches,
+        'match_count': len(matches),
+        'truncated': truncated,
+        'candidate_files': candidates,
+        'large_files_scanned': large_files_scanned,
+        'index_stats': stats,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
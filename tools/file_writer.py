@@ -3,6 +3,57 @@
 
 import os
 import re
+import time
+import uuid
+import hashlib
+import shutil
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("mcp.tools.file_writer")
+
+DURABILITY_POLICIES = ("none", "fsync", "fsync_dir")
+WRITE_MODES = ("overwrite", "append", "patch")
+MAX_BATCH_WORKERS = 8
+UPLOAD_ACTIONS = ("begin", "append", "commit", "abort")
+# Upload sessions idle for longer than this are discarded along with their temp files.
+UPLOAD_TTL_SECONDS = 3600
+# 0 means no limit on the total size of a chunked upload.
+MAX_UPLOAD_BYTES = int(os.environ.get("MCP_MAX_UPLOAD_BYTES", "0"))
+
+# upload_id -> session dict; see _upload_begin().
+_UPLOADS = {}
+_UPLOADS_LOCK = threading.Lock()
+
+_PROBED_UMASK = None
+
+def _umask():
+    """
+    The process umask, read without changing it: os.umask() can only query by setting it, which would
+    briefly give files created meanwhile by other threads the wrong permissions.
+    """
+    global _PROBED_UMASK
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    if _PROBED_UMASK is None:
+        # No /proc (macOS, older kernels): create a file asking for 0777 and see what the umask leaves.
+        fd, probe_path = tempfile.mkstemp(prefix=".umask-probe.")
+        os.close(fd)
+        os.remove(probe_path)
+        probe_fd = os.open(probe_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o777)
+        try:
+            _PROBED_UMASK = 0o777 & ~os.fstat(probe_fd).st_mode
+        finally:
+            os.close(probe_fd)
+            os.remove(probe_path)
+    return _PROBED_UMASK
 
 def get_meta():
     """
@@ -10,7 +61,7 @@ def get_meta():
     """
     return {
         "name": "file_writer",
-        "description": "Writes or overwrites a file with the provided content. Use this to save text, code, or any string data to a file on the local filesystem.",
+        "description": "Writes or overwrites a file with the provided content. Use this to save text, code, or any string data to a file on the local filesystem. Overwrites are atomic (readers never see a partially written file). Can also append, patch part of an existing file (mode 'patch' with a unified diff or line-range edits, so only the changed lines need to be sent), and write many files in one call via 'files'.",
         "input_schema": {
             "type": "object",
             "properties": {
@@ -21,37 +72,442 @@ def get_meta():
                 "content": {
                     "type": "string",
                     "description": "The string content to be written into the file. If the content contains a markdown code block, only the code will be extracted and written."
+                },
+                "mode": {
+                    "type": "string",
+                    "enum": list(WRITE_MODES),
+                    "description": "'overwrite' (default) replaces the file. 'append' adds the content, exactly as given, to the end of the file. 'patch' applies 'patch' or 'edits' to the existing file; 'content' is not used.",
+                    "default": "overwrite"
+                },
+                "patch": {
+                    "type": "string",
+                    "description": "For mode 'patch': a unified diff (as produced by `diff -u` or `git diff`) against the current file. Hunks whose context no longer matches are reported as conflicts and nothing is written."
+                },
+                "edits": {
+                    "type": "array",
+                    "description": "For mode 'patch': line-range replacements against the current file. Ranges are 1-based and inclusive and must not overlap; use end_line = start_line - 1 to insert before start_line.",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "start_line": {"type": "integer"},
+                            "end_line": {"type": "integer"},
+                            "replacement": {"type": "string", "description": "New text for the range. Empty string deletes the lines."},
+                            "expected": {"type": "string", "description": "Optional current text of the range; the edit is a conflict if it differs."}
+                        },
+                        "required": ["start_line", "end_line", "replacement"]
+                    }
+                },
+                "base_sha256": {
+                    "type": "string",
+                    "description": "For mode 'patch': SHA-256 of the file the patch was made against (returned as 'sha256' by previous writes). The patch is rejected if the file has changed since."
+                },
+                "atomic": {
+                    "type": "boolean",
+                    "description": "For overwrites, write to a temporary file in the same directory and rename it over the target. Defaults to true.",
+                    "default": True
+                },
+                "durability": {
+                    "type": "string",
+                    "enum": list(DURABILITY_POLICIES),
+                    "description": "'none' (default) leaves flushing to the OS, 'fsync' syncs the file data, 'fsync_dir' also syncs the parent directory so the rename itself survives a crash.",
+                    "default": "none"
+                },
+                "upload": {
+                    "type": "object",
+                    "description": "Chunked upload for large content, so the server never holds the whole file in memory. Call with action 'begin' (plus 'filepath') to get an upload_id, then 'append' each 'chunk' in order, then 'commit' to atomically move the file into place (or 'abort'). Content is written exactly as sent. Raw bytes can also be PUT to /mcp/upload/<upload_id> instead of using 'append'.",
+                    "properties": {
+                        "action": {"type": "string", "enum": list(UPLOAD_ACTIONS)},
+                        "upload_id": {"type": "string", "description": "Returned by 'begin'; required for the other actions."},
+                        "chunk": {"type": "string", "description": "For 'append': the next piece of content."},
+                        "offset": {"type": "integer", "description": "For 'append': optional byte offset the chunk starts at. A mismatch is rejected, which makes retries safe."},
+                        "expected_sha256": {"type": "string", "description": "For 'commit': optional SHA-256 of the full content; the commit fails if it differs."}
+                    },
+                    "required": ["action"]
+                },
+                "files": {
+                    "type": "array",
+                    "description": "Batch mode: a list of files to write in parallel in one call. Each item takes 'filepath' and the same 'content'/'mode'/'patch'/'edits'/'base_sha256' fields as a single write. 'atomic' and 'durability' apply to all of them.",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "filepath": {"type": "string"},
+                            "content": {"type": "string"},
+                            "mode": {"type": "string", "enum": list(WRITE_MODES)},
+                            "patch": {"type": "string"},
+                            "edits": {"type": "array", "items": {"type": "object"}},
+                            "base_sha256": {"type": "string"}
+                        },
+                        "required": ["filepath"]
+                    }
                 }
             },
-            "required": ["filepath", "content"]
+            "required": []
         }
     }
 
-def run(tool_input):
+def _prepare_content(content):
     """
-    Writes the provided content to the specified filepath.
-    If the content contains a python markdown block, it extracts the code first.
+    Check for a python markdown block and extract the code if it exists.
+    This makes the tool more robust to verbose AI outputs.
+    """
+    code_match = re.search(r"```python\n(.*?)```", content, re.DOTALL)
+    if code_match:
+        logger.debug("Found python code block. Extracting code.")
+        return code_match.group(1).strip()
+    # If no block is found, use the content as-is.
+    return content.strip()
+
+def _fsync_directory(directory):
+    # Directories can't be fsynced on Windows; the rename is as durable as the OS makes it there.
+    if os.name == "nt":
+        return
+    fd = os.open(directory or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _copy_owner(path, st):
+    # Only root may give a file away; otherwise keep at least the group, where that is allowed.
+    if not hasattr(os, "chown"):
+        return
+    try:
+        os.chown(path, st.st_uid, st.st_gid)
+    except OSError:
+        try:
+            os.chown(path, -1, st.st_gid)
+        except OSError:
+            pass
+
+def _move_into_place(tmp_path, target, durability):
+    """
+    Renames tmp_path over target (a resolved path, not a symlink), keeping target's owner and mode.
+    A target with other hard links is overwritten in place instead, so all of its names see the new
+    content; that write is not atomic.
     """
-    filepath = tool_input.get('filepath')
-    content = tool_input.get('content')
+    try:
+        st = os.stat(target)
+    except FileNotFoundError:
+        st = None
+    if st is not None and st.st_nlink > 1:
+        with open(tmp_path, "rb") as src, open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+            if durability != "none":
+                dst.flush()
+                os.fsync(dst.fileno())
+        os.unlink(tmp_path)
+        return
+    # mkstemp creates files as 0600 and owned by us. chown first: it may clear setuid/setgid bits.
+    if st is None:
+        os.chmod(tmp_path, 0o666 & ~_umask())
+    else:
+        _copy_owner(tmp_path, st)
+        os.chmod(tmp_path, st.st_mode & 0o7777)
+    os.replace(tmp_path, target)
+    if durability == "fsync_dir":
+        _fsync_directory(os.path.dirname(target))
+
+def _atomic_replace(filepath, data, durability, newline=None):
+    """
+    Writes data to a temp file next to filepath, then renames it into place. A symlink is followed,
+    so the file it points to is replaced, not the link.
+    """
+    target = os.path.realpath(filepath)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=f".{os.path.basename(target)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline=newline) as f:
+            f.write(data)
+            if durability != "none":
+                f.flush()
+                os.fsync(f.fileno())
+        _move_into_place(tmp_path, target, durability)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
 
+class PatchConflict(Exception):
+    """
+    Raised when a patch or edit does not match the current file content.
+    """
+
+def _split_lines(text):
+    """
+    Splits text on "\n" only (not the other separators str.splitlines() knows) into lines without
+    terminators. Returns (lines, endings, ends_with_newline): each line's own ending ("\r\n" or "\n"),
+    so files with mixed line endings are reassembled byte-for-byte. The last line's entry is the file's
+    usual ending when the file doesn't end with a newline.
+    """
+    parts = text.split("\n")
+    ends_with_newline = parts[-1] == ""
+    if ends_with_newline:
+        # An empty file counts as newline-terminated, so lines added to it get a trailing newline.
+        parts.pop()
+    lines, endings = [], []
+    for part in parts:
+        if part.endswith("\r"):
+            lines.append(part[:-1])
+            endings.append("\r\n")
+        else:
+            lines.append(part)
+            endings.append("\n")
+    if parts and not ends_with_newline:
+        lines[-1] = parts[-1]
+        endings[-1] = _usual_ending(endings[:-1])
+    return lines, endings, ends_with_newline
+
+def _usual_ending(endings):
+    return "\r\n" if endings.count("\r\n") > len(endings) / 2 else "\n"
+
+def _join_lines(lines, endings, ends_with_newline):
+    text = "".join(line + ending for line, ending in zip(lines, endings))
+    if lines and not ends_with_newline:
+        text = text[:-len(endings[-1])]
+    return text
+
+def _new_endings(count, replaced, usual):
+    """
+    Endings for `count` lines written in place of lines ending with `replaced`: position by position,
+    then the last replaced line's (or the file's usual) ending.
+    """
+    fill = replaced[-1] if replaced else usual
+    return [replaced[i] if i < len(replaced) else fill for i in range(count)]
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+def _parse_unified_diff(patch):
+    """
+    Parses a single-file unified diff into hunks of {"old_start", "old", "new", "ops", "eof_newline"}.
+    ops lists the hunk's (tag, text) lines in order. eof_newline is True/False when a
+    '\\ No newline at end of file' marker decides it, else None.
+    """
+    hunks = []
+    current = None
+    last_tag = None
+    patch_lines = patch.split("\n")
+    if patch_lines[-1] == "":
+        patch_lines.pop()
+    for line in patch_lines:
+        # A diff of a CRLF file (or a diff saved with CRLF) carries a \r on every line.
+        if line.endswith("\r"):
+            line = line[:-1]
+        header = _HUNK_HEADER.match(line)
+        if header:
+            current = {"old_start": int(header.group(1)), "old": [], "new": [], "ops": [], "eof_newline": None}
+            hunks.append(current)
+            continue
+        if current is None:
+            # File headers (---/+++, diff --git, index ...) before the first hunk.
+            continue
+        if line.startswith("\\"):
+            # The marker refers to the line just before it.
+            if last_tag in (" ", "+"):
+                current["eof_newline"] = False
+            elif last_tag == "-" and current["eof_newline"] is None:
+                current["eof_newline"] = True
+            continue
+        tag, text = (line[:1] or " "), line[1:]
+        if tag == " ":
+            current["old"].append(text)
+            current["new"].append(text)
+        elif tag == "-":
+            current["old"].append(text)
+        elif tag == "+":
+            current["new"].append(text)
+        else:
+            raise ValueError(f"Malformed unified diff line: {line[:80]!r}")
+        current["ops"].append((tag, text))
+        last_tag = tag
+
+    if not hunks:
+        raise ValueError("Patch contains no hunks.")
+    return hunks
+
+def _find_hunk(lines, old, expected_at):
+    """
+    Finds where a hunk's old lines occur, preferring the stated position and then the nearest offset.
+    """
+    if not old:
+        return min(max(expected_at, 0), len(lines))
+    limit = len(lines) - len(old)
+    for delta in range(0, len(lines) + 1):
+        for pos in (expected_at - delta, expected_at + delta) if delta else (expected_at,):
+            if 0 <= pos <= limit and lines[pos:pos + len(old)] == old:
+                return pos
+    return None
+
+def _apply_unified_diff(lines, endings, ends_with_newline, patch):
+    hunks = _parse_unified_diff(patch)
+    result, result_endings = list(lines), list(endings)
+    usual = _usual_ending(endings)
+    offset = 0
+    for number, hunk in enumerate(hunks, start=1):
+        # A zero-length old range names the line *after* which to insert.
+        base = hunk["old_start"] - (1 if hunk["old"] else 0)
+        pos = _find_hunk(result, hunk["old"], base + offset)
+        if pos is None:
+            raise PatchConflict(f"Hunk {number} (@@ -{hunk['old_start']}) does not match the current file content.")
+        old_endings = result_endings[pos:pos + len(hunk["old"])]
+        new_endings = []
+        replaced = []
+        k = 0
+        for tag, _ in hunk["ops"]:
+            if tag == " ":
+                replaced = []
+                new_endings.append(old_endings[k])
+                k += 1
+            elif tag == "-":
+                replaced.append(old_endings[k])
+                k += 1
+            else:
+                # Added lines take the ending of a removed line they replace, else of the line above.
+                if replaced:
+                    new_endings.append(replaced.pop(0))
+                elif new_endings:
+                    new_endings.append(new_endings[-1])
+                elif pos > 0:
+                    new_endings.append(result_endings[pos - 1])
+                else:
+                    new_endings.append(usual)
+        result[pos:pos + len(hunk["old"])] = hunk["new"]
+        result_endings[pos:pos + len(hunk["old"])] = new_endings
+        offset = pos - base + len(hunk["new"]) - len(hunk["old"])
+        if hunk["eof_newline"] is not None:
+            ends_with_newline = hunk["eof_newline"]
+    return result, result_endings, ends_with_newline
+
+def _apply_edits(lines, endings, edits):
+    if not isinstance(edits, list) or not edits:
+        raise ValueError("'edits' must be a non-empty list.")
+
+    normalized = []
+    for number, edit in enumerate(edits, start=1):
+        start, end = edit.get("start_line"), edit.get("end_line")
+        replacement = edit.get("replacement")
+        if not isinstance(start, int) or not isinstance(end, int) or not isinstance(replacement, str):
+            raise ValueError(f"Edit {number} needs integer start_line/end_line and a string replacement.")
+        if start < 1 or end < start - 1 or end > len(lines):
+            raise ValueError(f"Edit {number} range {start}-{end} is outside the file ({len(lines)} lines).")
+        if "expected" in edit:
+            expected = edit["expected"]
+            current = lines[start - 1:end]
+            if current != _split_lines(expected)[0]:
+                raise PatchConflict(f"Edit {number} expected text does not match lines {start}-{end}.")
+        normalized.append((start, end, _split_lines(replacement)[0]))
+
+    normalized.sort(key=lambda e: (e[0], e[1]))
+    for (s1, e1, _), (s2, _, _) in zip(normalized, normalized[1:]):
+        if s2 <= e1:
+            raise PatchConflict(f"Edits overlap at lines {s2}-{e1}.")
+
+    result, result_endings = list(lines), list(endings)
+    usual = _usual_ending(endings)
+    # Apply bottom-up so earlier line numbers stay valid.
+    for start, end, new_lines in reversed(normalized):
+        replaced = result_endings[start - 1:end] or result_endings[start - 2:start - 1]
+        result[start - 1:end] = new_lines
+        result_endings[start - 1:end] = _new_endings(len(new_lines), replaced, usual)
+    return result, result_endings
+
+def _sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _patch_one(spec, atomic, durability):
+    """
+    Applies a unified diff or line edits to an existing file and writes it only if the content changed.
+    """
+    filepath = spec.get("filepath")
+    patch, edits = spec.get("patch"), spec.get("edits")
+    if (patch is None) == (edits is None):
+        return {"status": "error", "filepath": filepath, "message": "Mode 'patch' needs exactly one of 'patch' or 'edits'."}
+
+    try:
+        # newline="" keeps \r\n intact so the file is reassembled with its own line endings.
+        with open(filepath, "r", encoding="utf-8", newline="") as f:
+            original = f.read()
+    except FileNotFoundError:
+        return {"status": "error", "filepath": filepath, "message": f"Cannot patch missing file: '{filepath}'."}
+    except Exception as e:
+        return {"status": "error", "filepath": filepath, "message": f"Failed to read file for patching: {str(e)}"}
+
+    original_hash = _sha256(original)
+    base_sha256 = spec.get("base_sha256")
+    if base_sha256 and base_sha256 != original_hash:
+        return {
+            "status": "error",
+            "filepath": filepath,
+            "conflict": True,
+            "message": f"'{filepath}' has changed since the patch was made (sha256 {original_hash}).",
+            "sha256": original_hash
+        }
+
+    lines, endings, ends_with_newline = _split_lines(original)
+    try:
+        if patch is not None:
+            new_lines, new_endings, ends_with_newline = _apply_unified_diff(lines, endings, ends_with_newline, patch)
+        else:
+            new_lines, new_endings = _apply_edits(lines, endings, edits)
+    except PatchConflict as e:
+        return {"status": "error", "filepath": filepath, "conflict": True, "message": str(e), "sha256": original_hash}
+    except ValueError as e:
+        return {"status": "error", "filepath": filepath, "message": str(e)}
+
+    updated = _join_lines(new_lines, new_endings, ends_with_newline)
+    updated_hash = _sha256(updated)
+    if updated_hash == original_hash:
+        return {
+            "status": "success",
+            "filepath": filepath,
+            "unchanged": True,
+            "sha256": original_hash,
+            "message": f"Patch left '{filepath}' unchanged; nothing written."
+        }
+
+    try:
+        if atomic:
+            _atomic_replace(filepath, updated, durability, newline="")
+        else:
+            with open(filepath, "w", encoding="utf-8", newline="") as f:
+                f.write(updated)
+                if durability != "none":
+                    f.flush()
+                    os.fsync(f.fileno())
+            if durability == "fsync_dir":
+                _fsync_directory(os.path.dirname(filepath))
+    except Exception as e:
+        return {"status": "error", "filepath": filepath, "message": f"Failed to write to file: {str(e)}"}
+
+    return {
+        "status": "success",
+        "filepath": filepath,
+        "unchanged": False,
+        "sha256": updated_hash,
+        "message": f"Successfully patched '{filepath}' ({len(lines)} -> {len(new_lines)} lines)."
+    }
+
+def _write_one(spec, atomic=True, durability="none"):
+    """
+    Writes a single file described by spec (filepath, content, mode, ...) and returns a result dict.
+    """
+    filepath = spec.get("filepath")
+    content = spec.get("content")
+    mode = spec.get("mode", "overwrite")
+
+    if mode not in WRITE_MODES:
+        return {"status": "error", "filepath": filepath, "message": f"Invalid mode: '{mode}'. Must be one of {', '.join(WRITE_MODES)}."}
+    if mode == "patch":
+        if filepath is None:
+            return {"status": "error", "message": "Input must include 'filepath'."}
+        return _patch_one(spec, atomic, durability)
     if filepath is None or content is None:
         return {
             "status": "error",
             "message": "Input must include both 'filepath' and 'content'."
         }
 
-    # --- NEW LOGIC ---
-    # Check for a python markdown block and extract the code if it exists.
-    # This makes the tool more robust to verbose AI outputs.
-    code_match = re.search(r"```python\n(.*?)```", content, re.DOTALL)
-    if code_match:
-        print("[file_writer] Found python code block. Extracting code.")
-        content_to_write = code_match.group(1).strip()
-    else:
-        # If no block is found, use the content as-is.
-        content_to_write = content.strip()
-
+    content_to_write = _prepare_content(content) if mode == "overwrite" else content
 
     # SECURITY WARNING: In a real-world scenario, you would want to
     # heavily sanitize this filepath to prevent writing to sensitive system files.
@@ -61,16 +517,230 @@ def run(tool_input):
         if directory:
             os.makedirs(directory, exist_ok=True)
 
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content_to_write)
+        if mode == "append":
+            with open(filepath, "a", encoding="utf-8") as f:
+                f.write(content_to_write)
+                if durability != "none":
+                    f.flush()
+                    os.fsync(f.fileno())
+            if durability == "fsync_dir":
+                _fsync_directory(directory)
+            verb = "appended"
+        elif atomic:
+            _atomic_replace(filepath, content_to_write, durability)
+            verb = "wrote"
+        else:
+            with open(filepath, "w", encoding="utf-8") as f:
+                f.write(content_to_write)
+                if durability != "none":
+                    f.flush()
+                    os.fsync(f.fileno())
+            if durability == "fsync_dir":
+                _fsync_directory(directory)
+            verb = "wrote"
 
-        return {
+        result = {
             "status": "success",
-            "message": f"Successfully wrote {len(content_to_write)} characters to '{filepath}'."
+            "filepath": filepath,
+            "message": f"Successfully {verb} {len(content_to_write)} characters to '{filepath}'."
         }
+        if mode == "overwrite":
+            # Lets the caller send base_sha256 with a later patch.
+            result["sha256"] = _sha256(content_to_write)
+        return result
     except Exception as e:
         return {
             "status": "error",
+            "filepath": filepath,
             "message": f"Failed to write to file: {str(e)}"
         }
 
+def _sweep_uploads():
+    """
+    Drops upload sessions that have been idle longer than UPLOAD_TTL_SECONDS.
+    """
+    cutoff = time.monotonic() - UPLOAD_TTL_SECONDS
+    with _UPLOADS_LOCK:
+        stale = [uid for uid, session in _UPLOADS.items() if session["last_activity"] < cutoff]
+        sessions = [_UPLOADS.pop(uid) for uid in stale]
+    for session in sessions:
+        _discard_upload(session)
+
+def _discard_upload(session):
+    with session["lock"]:
+        try:
+            session["file"].close()
+        except Exception:
+            pass
+        try:
+            os.unlink(session["tmp_path"])
+        except OSError:
+            pass
+
+def _upload_begin(spec):
+    filepath = spec.get("filepath")
+    if not filepath:
+        return {"status": "error", "message": "Upload 'begin' requires 'filepath'."}
+
+    _sweep_uploads()
+    try:
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The temp file lives next to the target (behind any symlink) so commit is a same-filesystem rename.
+        target = os.path.realpath(filepath)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=f".{os.path.basename(target)}.", suffix=".upload")
+    except Exception as e:
+        return {"status": "error", "message": f"Failed to start upload: {str(e)}"}
+
+    upload_id = uuid.uuid4().hex
+    with _UPLOADS_LOCK:
+        _UPLOADS[upload_id] = {
+            "filepath": filepath,
+            "target": target,
+            "tmp_path": tmp_path,
+            "file": os.fdopen(fd, "wb"),
+            "size": 0,
+            "hash": hashlib.sha256(),
+            "last_activity": time.monotonic(),
+            "lock": threading.Lock()
+        }
+    return {
+        "status": "success",
+        "message": f"Started upload to '{filepath}'.",
+        "upload_id": upload_id,
+        "expires_after_idle_seconds": UPLOAD_TTL_SECONDS
+    }
+
+def _upload_append(session, upload, chunk):
+    if isinstance(chunk, str):
+        chunk = chunk.encode("utf-8")
+    if not isinstance(chunk, (bytes, bytearray)):
+        return {"status": "error", "message": "Upload 'append' requires a string 'chunk'."}
+
+    offset = upload.get("offset")
+    if offset is not None and offset != session["size"]:
+        return {
+            "status": "error",
+            "message": f"Chunk offset {offset} does not match the {session['size']} bytes received so far.",
+            "expected_offset": session["size"]
+        }
+    if MAX_UPLOAD_BYTES and session["size"] + len(chunk) > MAX_UPLOAD_BYTES:
+        return {"status": "error", "message": f"Upload exceeds the maximum size of {MAX_UPLOAD_BYTES} bytes."}
+
+    session["file"].write(chunk)
+    session["hash"].update(chunk)
+    session["size"] += len(chunk)
+    return {"status": "success", "message": f"Received {len(chunk)} bytes.", "size": session["size"]}
+
+def _upload_commit(session, upload, durability):
+    digest = session["hash"].hexdigest()
+    expected = upload.get("expected_sha256")
+    if expected and expected != digest:
+        return {"status": "error", "message": f"Upload checksum mismatch: expected {expected}, received {digest}.", "sha256": digest}
+
+    filepath = session["filepath"]
+    f = session["file"]
+    f.flush()
+    if durability != "none":
+        os.fsync(f.fileno())
+    f.close()
+    _move_into_place(session["tmp_path"], session["target"], durability)
+
+    return {
+        "status": "success",
+        "message": f"Successfully wrote {session['size']} bytes to '{filepath}'.",
+        "filepath": filepath,
+        "size": session["size"],
+        "sha256": digest
+    }
+
+def _run_upload(upload, spec, durability):
+    """
+    Handles one step of a chunked upload session (begin/append/commit/abort).
+    """
+    if not isinstance(upload, dict) or upload.get("action") not in UPLOAD_ACTIONS:
+        return {"status": "error", "message": f"'upload.action' must be one of {', '.join(UPLOAD_ACTIONS)}."}
+
+    action = upload["action"]
+    if action == "begin":
+        return _upload_begin(spec)
+
+    upload_id = upload.get("upload_id")
+    with _UPLOADS_LOCK:
+        session = _UPLOADS.get(upload_id)
+        if session is not None and action == "abort":
+            _UPLOADS.pop(upload_id)
+    if session is None:
+        return {"status": "error", "message": f"Unknown or expired upload_id: '{upload_id}'."}
+
+    if action == "abort":
+        _discard_upload(session)
+        return {"status": "success", "message": f"Aborted upload to '{session['filepath']}'."}
+
+    try:
+        with session["lock"]:
+            if session["file"].closed:
+                return {"status": "error", "message": f"Upload '{upload_id}' is already finished."}
+            session["last_activity"] = time.monotonic()
+            if action == "append":
+                return _upload_append(session, upload, upload.get("chunk"))
+            result = _upload_commit(session, upload, durability)
+    except Exception as e:
+        result = {"status": "error", "message": f"Upload failed: {str(e)}"}
+
+    # Reaching here means a commit (successful or not) or a failed append; either way the session is over.
+    with _UPLOADS_LOCK:
+        _UPLOADS.pop(upload_id, None)
+    if result["status"] != "success":
+        _discard_upload(session)
+    return result
+
+def _run_batch(files, atomic, durability):
+    if not isinstance(files, list) or not files:
+        return {"status": "error", "message": "'files' must be a non-empty list of {filepath, content} objects."}
+
+    targets = [item.get("filepath") for item in files if isinstance(item, dict)]
+    if len(targets) != len(files):
+        return {"status": "error", "message": "Every item in 'files' must be an object with 'filepath' and 'content'."}
+    if len(set(targets)) != len(targets):
+        # Parallel writes to the same path would race; make the caller merge them.
+        return {"status": "error", "message": "Each filepath may appear only once in 'files'."}
+
+    def write(item):
+        return _write_one(item, atomic, durability)
+
+    with ThreadPoolExecutor(max_workers=min(MAX_BATCH_WORKERS, len(files))) as pool:
+        results = list(pool.map(write, files))
+
+    failed = sum(1 for r in results if r["status"] != "success")
+    return {
+        "status": "success" if not failed else "error",
+        "message": f"Wrote {len(results) - failed} of {len(results)} files." + (f" {failed} failed." if failed else ""),
+        "results": results
+    }
+
+def run(tool_input):
+    """
+    Writes the provided content to the specified filepath, or every entry of 'files' in batch mode.
+    If the content contains a python markdown block, it extracts the code first.
+    In 'patch' mode, applies a diff or line edits to the existing file instead.
+    With 'upload', runs one step of a chunked upload session.
+    """
+    atomic = bool(tool_input.get("atomic", True))
+    durability = tool_input.get("durability", "none")
+    if durability not in DURABILITY_POLICIES:
+        return {
+            "status": "error",
+            "message": f"Invalid durability: '{durability}'. Must be one of {', '.join(DURABILITY_POLICIES)}."
+        }
+
+    if "upload" in tool_input:
+        return _run_upload(tool_input.get("upload"), tool_input, durability)
+
+    if "files" in tool_input:
+        return _run_batch(tool_input.get("files"), atomic, durability)
+
+    result = _write_one(tool_input, atomic, durability)
+    result.pop("filepath", None)
+    return result
@@ -2,6 +2,8 @@
 import os
 import google.generativeai as genai
 
+import _deadline
+
 def get_meta():
     return {
         'name': 'gemini_code_generator',
@@ -39,7 +41,9 @@ def run(tool_input):
         if not prompt:
             return {'status': 'error', 'message': 'Prompt is required for code generation.'}
 
-        response = model.generate_content(prompt)
+        # Bound the API call by whatever is left of the request's deadline.
+        time_left = _deadline.timeout()
+        response = model.generate_content(prompt, request_options={'timeout': time_left} if time_left is not None else None)
         
         # Extracting text content from the response parts
         if response and response.parts:
@@ -2,6 +2,8 @@
 import os
 import google.generativeai as genai
 
+import _deadline
+
 def get_meta():
     return {
         'name': 'gemini_query_tool',
@@ -37,7 +39,9 @@ def run(tool_input):
         if not question:
             return {'status': 'error', 'message': 'Missing required input: question.'}
 
-        response = model.generate_content(question)
+        # Bound the API call by whatever is left of the request's deadline.
+        time_left = _deadline.timeout()
+        response = model.generate_content(question, request_options={'timeout': time_left} if time_left is not None else None)
 
         if response.candidates:
             # Assuming we want the text from the first part of the first candidate
@@ -1,6 +1,10 @@
 # tools/goodbye_cruel_world.py
 # A simple tool that is similar to the hello_world tool.
 
+import logging
+
+logger = logging.getLogger("mcp.tools.goodbye_cruel_world")
+
 def get_meta():
     """
     Returns metadata describing the tool for an AI to understand its purpose and usage.
@@ -29,8 +33,8 @@ def run(tool_input):
     Returns:
         dict: A dictionary containing the result of the tool's operation.
     """
-    # You can print to the server's console for debugging purposes.
-    print(f"[goodbye_cruel_world] tool was executed with input: {tool_input}")
+    # Log through the server's logger; records carry the request's trace IDs.
+    logger.debug("Tool was executed with input keys: %s", sorted(tool_input))
 
     # The dictionary returned here will be sent back to the client
     # as the 'output' in the JSON response.
@@ -2,6 +2,8 @@
 import os
 import google.generativeai as genai
 
+import _deadline
+
 def get_meta():
     return {
         'name': 'joke_generator_tool',
@@ -27,7 +29,9 @@ def run(tool_input):
         model = genai.GenerativeModel('gemini-2.0-flash')
 
         # Generate a joke using Gemini
-        response = model.generate_content("Tell me a short, family-friendly joke.")
+        # Bound the API call by whatever is left of the request's deadline.
+        time_left = _deadline.timeout()
+        response = model.generate_content("Tell me a short, family-friendly joke.", request_options={'timeout': time_left} if time_left is not None else None)
         joke_text = response.text
 
         return {
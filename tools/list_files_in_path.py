@@ -1,31 +1,194 @@
 # tools/list_files_in_path.py
 import os
+import re
+import json
+import base64
+import fnmatch
+
+import _deadline
+import _path_resolver
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
 
 def get_meta():
     return {
         "name": "list_files_in_path",
-        "description": "Lists files and directories at a given path, expanding user and environment variables in the path.",
+        "description": (
+            "Lists files and directories at a given path, expanding user and environment variables in the path. "
+            "Each entry reports its type (file, dir, symlink, other) and optionally size/mtime. Supports recursive "
+            "walks with max depth, include/exclude globs, and cursor-based pagination for very large trees."
+        ),
         "input_schema": {
             "type": "object",
             "properties": {
                 "path": {
                     "type": "string",
                     "description": "The path to list files from. Can include `~` for home directory or environment variables like `$HOME`."
+                },
+                "recursive": {
+                    "type": "boolean",
+                    "description": "Walk subdirectories as well. Defaults to false (only the given directory).",
+                    "default": False
+                },
+                "max_depth": {
+                    "type": "integer",
+                    "description": "Maximum depth to descend when recursive (1 = only the given directory). Unlimited if omitted."
+                },
+                "include": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Glob patterns (e.g. ['*.py']) matched against the entry name or relative path. Only matching entries are returned; directories are still walked."
+                },
+                "exclude": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Glob patterns (e.g. ['.git', 'node_modules']) for entries to skip. Excluded directories are not walked."
+                },
+                "stat": {
+                    "type": "boolean",
+                    "description": "Include size and mtime for each entry.",
+                    "default": False
+                },
+                "page_size": {
+                    "type": "integer",
+                    "description": f"Maximum entries per page (default {DEFAULT_PAGE_SIZE}, max {MAX_PAGE_SIZE}).",
+                    "default": DEFAULT_PAGE_SIZE
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Opaque next_cursor value from a previous call, to fetch the following page."
+                },
+                "stream": {
+                    "type": "boolean",
+                    "description": "Stream every entry as newline-delimited JSON instead of returning a page. Ignores page_size and cursor.",
+                    "default": False
                 }
             },
             "required": ["path"]
         }
     }
 
+# ---------- Cursor and filter helpers ----------
+
+def _encode_cursor(parts):
+    raw = json.dumps(parts, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def _decode_cursor(cursor):
+    try:
+        parts = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError(f"Invalid cursor: '{cursor}'")
+    if not isinstance(parts, list) or not parts or not all(isinstance(p, str) for p in parts):
+        raise ValueError(f"Invalid cursor: '{cursor}'")
+    return parts
+
+def _compile_globs(patterns):
+    """
+    Compiles a list of glob patterns into a single regex, or None if there are none.
+    """
+    if not patterns:
+        return None
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    return re.compile("|".join(fnmatch.translate(os.path.normcase(p)) for p in patterns))
+
+def _matches(regex, name, rel_path):
+    return bool(regex.match(os.path.normcase(name)) or regex.match(os.path.normcase(rel_path)))
+
+def _entry_type(entry):
+    # DirEntry caches d_type from the directory read, so these checks are free on most platforms.
+    if entry.is_symlink():
+        return "symlink"
+    if entry.is_dir(follow_symlinks=False):
+        return "dir"
+    if entry.is_file(follow_symlinks=False):
+        return "file"
+    return "other"
+
+def _sorted_scandir(directory):
+    _deadline.check()
+    try:
+        with os.scandir(directory) as it:
+            return sorted(it, key=lambda e: e.name)
+    except (PermissionError, FileNotFoundError, NotADirectoryError):
+        # Unreadable or vanished subdirectories are skipped rather than failing the whole walk.
+        return []
+
+# ---------- Walker ----------
+
+def _walk(root, max_depth, include_re, exclude_re, with_stat, resume_after=None):
+    """
+    Yields (parts, entry_dict) in a stable depth-first, name-sorted order.
+
+    With resume_after (a list of path components of the last entry already returned), subtrees that sort
+    entirely before it are pruned, so resuming a page costs O(depth) directory reads rather than a rewalk.
+    """
+    # Each stack frame: (directory path, relative parts, depth, sorted entries iterator, cursor parts or None)
+    stack = [(root, [], 1, iter(_sorted_scandir(root)), resume_after)]
+
+    while stack:
+        directory, parts, depth, entries, on_cursor = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+
+        name = entry.name
+        entry_parts = parts + [name]
+        emit = True
+        child_cursor = None
+
+        if on_cursor is not None:
+            target = on_cursor[0]
+            if name < target:
+                continue
+            if name == target:
+                # Already returned on a previous page; only its subtree may still hold unseen entries.
+                emit = False
+                child_cursor = on_cursor[1:] or None
+            # Once past the cursor in this directory, the rest of it is unseen.
+            stack[-1] = (directory, parts, depth, entries, None if name > target else on_cursor)
+
+        rel_path = "/".join(entry_parts)
+        if exclude_re is not None and _matches(exclude_re, name, rel_path):
+            continue
+
+        kind = _entry_type(entry)
+
+        if emit and (include_re is None or _matches(include_re, name, rel_path)):
+            item = {"name": name, "path": rel_path, "type": kind}
+            if with_stat:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                    item["size"] = st.st_size
+                    item["mtime"] = st.st_mtime
+                except OSError:
+                    item["size"] = None
+                    item["mtime"] = None
+            yield entry_parts, item
+
+        if kind == "dir" and (max_depth is None or depth < max_depth):
+            # child_cursor is None when the cursor named this directory itself: all of its children are unseen.
+            stack.append((entry.path, entry_parts, depth + 1, iter(_sorted_scandir(entry.path)), child_cursor))
+
+def _stream(walker):
+    for _, item in walker:
+        yield item
+
+# ---------- Main tool API ----------
+
 def run(tool_input):
     path = tool_input.get("path")
 
     if not path:
         return {"status": "error", "message": "Path input is required."}
 
+    expanded_path = path
     try:
         # Expand user (~) and environment variables ($VAR) in the path
-        expanded_path = os.path.expanduser(os.path.expandvars(path))
+        expanded_path = _path_resolver.expand_path(path)
 
         if not os.path.exists(expanded_path):
             return {"status": "error", "message": f"Path does not exist: '{expanded_path}'"}
@@ -33,9 +196,54 @@ def run(tool_input):
         if not os.path.isdir(expanded_path):
             return {"status": "error", "message": f"Path is not a directory: '{expanded_path}'"}
 
-        files_and_dirs = os.listdir(expanded_path)
-        return {"status": "success", "path": expanded_path, "array": files_and_dirs}
+        recursive = bool(tool_input.get("recursive", False))
+        max_depth = tool_input.get("max_depth")
+        if not recursive:
+            max_depth = 1
+        elif max_depth is not None:
+            if not isinstance(max_depth, int) or max_depth < 1:
+                return {"status": "error", "message": "max_depth must be a positive integer."}
+
+        include_re = _compile_globs(tool_input.get("include"))
+        exclude_re = _compile_globs(tool_input.get("exclude"))
+        with_stat = bool(tool_input.get("stat", False))
+
+        # Fail fast on an unreadable root instead of returning an empty listing.
+        os.scandir(expanded_path).close()
+
+        if tool_input.get("stream"):
+            return _stream(_walk(expanded_path, max_depth, include_re, exclude_re, with_stat))
+
+        page_size = tool_input.get("page_size", DEFAULT_PAGE_SIZE)
+        if not isinstance(page_size, int) or page_size < 1:
+            return {"status": "error", "message": "page_size must be a positive integer."}
+        page_size = min(page_size, MAX_PAGE_SIZE)
+
+        cursor = tool_input.get("cursor")
+        resume_after = _decode_cursor(cursor) if cursor else None
+
+        entries = []
+        last_parts = None
+        next_cursor = None
+        for parts, item in _walk(expanded_path, max_depth, include_re, exclude_re, with_stat, resume_after):
+            if len(entries) == page_size:
+                next_cursor = _encode_cursor(last_parts)
+                break
+            entries.append(item)
+            last_parts = parts
+
+        return {
+            "status": "success",
+            "path": expanded_path,
+            "array": [item["path"] for item in entries],
+            "entries": entries,
+            "count": len(entries),
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        }
 
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
     except PermissionError:
         return {"status": "error", "message": f"Permission denied to access path: '{expanded_path}'"}
     except Exception as e:
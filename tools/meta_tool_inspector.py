@@ -2,8 +2,10 @@
 # This tool inspects all other tools in its directory and returns their metadata.
 
 import os
+import logging
 import importlib.util
-import traceback
+
+logger = logging.getLogger("mcp.tools.meta_tool_inspector")
 
 def run(tool_input):
     """
@@ -19,11 +21,11 @@ def run(tool_input):
     tools_directory = os.path.dirname(__file__)
     available_tools = []
 
-    print("[meta_tool_inspector] Starting tool discovery...")
+    logger.debug("Starting tool discovery")
 
     for filename in os.listdir(tools_directory):
-        # Skip this file itself, private files, and non-python files
-        if filename == os.path.basename(__file__) or not filename.endswith(".py") or filename.startswith("__"):
+        # Skip this file itself, private files and helper modules (_*.py), and non-python files
+        if filename == os.path.basename(__file__) or not filename.endswith(".py") or filename.startswith("_"):
             continue
 
         tool_name = filename[:-3]
@@ -39,12 +41,12 @@ def run(tool_input):
             if hasattr(module, "get_meta") and callable(module.get_meta):
                 meta_info = module.get_meta()
                 available_tools.append(meta_info)
-                print(f"  [+] Found metadata for tool: '{tool_name}'")
+                logger.debug("Found metadata for tool '%s'", tool_name)
             else:
-                print(f"  [-] Warning: Tool '{tool_name}' has no get_meta() function.")
+                logger.warning("Tool '%s' has no get_meta() function", tool_name)
 
         except Exception:
-            print(f"  [!] Error inspecting tool '{tool_name}': {traceback.format_exc()}")
+            logger.exception("Error inspecting tool '%s'", tool_name)
 
     return {
         "status": "success",
@@ -2,6 +2,8 @@
 import subprocess
 import sys
 
+import _deadline
+
 def get_meta():
     """
     Returns the meta information of the tool as a dictionary.
@@ -38,7 +40,8 @@ def run(tool_input):
     try:
         # Execute the script in a subprocess to capture stdout and stderr
         # This is safer than using exec() within the main server process.
-        result = subprocess.run(
+        # _deadline.run also kills it if the call's deadline passes or the client goes away.
+        result = _deadline.run(
             [sys.executable, script_path],
             capture_output=True,
             text=True,
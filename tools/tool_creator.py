@@ -1,7 +1,36 @@
 # tools/tool_creator.py
 # This tool's only job is to write a given string of code to a new tool file.
+# With "replace": true it installs a new version of an existing tool, and with "rollback": true it
+# reinstalls an earlier one. New code is compiled and test-loaded in a separate process before it
+# replaces anything; the server then swaps the new version in (see _tool_versions.py).
 
 import os
+import sys
+import subprocess
+
+import _deadline
+import _tool_versions
+
+# How long the test load of new tool code may take.
+SMOKE_LOAD_TIMEOUT_SECONDS = float(os.environ.get("TOOL_CREATOR_SMOKE_LOAD_TIMEOUT", "30"))
+
+# Runs in a fresh interpreter: imports the code from stdin as the tool module and checks its contract.
+_SMOKE_LOAD = r"""
+import sys, json, types
+tools_directory, tool_name, tool_path = sys.argv[1:4]
+sys.path.insert(0, tools_directory)
+module = types.ModuleType(tool_name)
+module.__file__ = tool_path
+exec(compile(sys.stdin.buffer.read(), tool_path, "exec"), module.__dict__)
+if not callable(getattr(module, "run", None)):
+    sys.exit("The tool must define a run(tool_input) function.")
+if not callable(getattr(module, "get_meta", None)):
+    sys.exit("The tool must define a get_meta() function.")
+meta = module.get_meta()
+if not isinstance(meta, dict):
+    sys.exit("get_meta() must return a dict.")
+print(json.dumps({"name": meta.get("name")}))
+"""
 
 def get_meta():
     """
@@ -9,7 +38,11 @@ def get_meta():
     """
     return {
         "name": "tool_creator",
-        "description": "Creates a new Python tool file from a given string of code. Use this to save a new, fully-formed tool to the filesystem.",
+        "description": (
+            "Creates a new Python tool file from a given string of code. Use this to save a new, fully-formed tool to the filesystem. "
+            "Set replace=true to install a new version of an existing tool, or rollback=true (without tool_code) to go back to its "
+            "previous version (or to a given version)."
+        ),
         "input_schema": {
             "type": "object",
             "properties": {
@@ -20,20 +53,83 @@ def get_meta():
                 "tool_code": {
                     "type": "string",
                     "description": "A string containing the full, valid Python code for the new tool. Must include get_meta() and run() functions."
+                },
+                "replace": {
+                    "type": "boolean",
+                    "description": "Replace an existing tool with tool_code. Calls already running finish on the old version."
+                },
+                "rollback": {
+                    "type": "boolean",
+                    "description": "Reinstall the version before the current one (or 'version') instead of writing tool_code."
+                },
+                "version": {
+                    "type": "string",
+                    "description": "With rollback: the version id to reinstall, as returned when it was created."
                 }
             },
-            "required": ["tool_name", "tool_code"]
+            "required": ["tool_name"]
         }
     }
 
+def _smoke_load(tools_directory, tool_name, tool_path, source):
+    """
+    Compiles and imports source in a separate interpreter. Returns an error message, or None if it loads.
+    """
+    try:
+        compile(source, tool_path, "exec")
+    except SyntaxError as e:
+        return f"The tool code does not compile: {e.msg} (line {e.lineno})."
+    try:
+        result = _deadline.run(
+            [sys.executable, "-c", _SMOKE_LOAD, tools_directory, tool_name, tool_path],
+            input=source, capture_output=True, timeout=SMOKE_LOAD_TIMEOUT_SECONDS,
+        )
+    except subprocess.TimeoutExpired:
+        return f"Loading the tool code took longer than {SMOKE_LOAD_TIMEOUT_SECONDS:g}s."
+    if result.returncode != 0:
+        details = result.stderr.decode("utf-8", errors="replace").strip().splitlines()
+        return f"The tool code failed to load: {details[-1] if details else 'exit code ' + str(result.returncode)}"
+    return None
+
+def _rollback(tools_directory, tool_name, tool_path, version):
+    if not os.path.exists(tool_path):
+        return {"status": "error", "message": f"There is no tool named '{tool_name}' to roll back."}
+    with open(tool_path, 'rb') as f:
+        current = _tool_versions.source_version(f.read())
+    entries = _tool_versions.history(tools_directory, tool_name)
+    if version:
+        target = next((e for e in reversed(entries) if e["version"] == version), None)
+        if target is None:
+            return {"status": "error", "message": f"Tool '{tool_name}' has no archived version '{version}'."}
+    else:
+        target = next((e for e in reversed(entries) if e["version"] != current), None)
+        if target is None:
+            return {"status": "error", "message": f"Tool '{tool_name}' has no earlier version to roll back to."}
+
+    with open(target["path"], 'rb') as f:
+        source = f.read()
+    _tool_versions.atomic_write(tool_path, source)
+    _tool_versions.archive(tools_directory, tool_name, source)
+    return {
+        "status": "success",
+        "message": f"Rolled tool '{tool_name}' back to version {target['version']}.",
+        "created_tool_name": tool_name,
+        "version": target["version"],
+        "previous_version": current,
+        "rolled_back": True,
+    }
+
 def run(tool_input):
     """
-    Writes the provided tool_code to a new .py file named after tool_name.
+    Writes the provided tool_code to a new .py file named after tool_name, or replaces/rolls back an
+    existing tool when asked to.
     """
     tool_name = tool_input.get('tool_name')
     tool_code = tool_input.get('tool_code')
+    replace = bool(tool_input.get('replace'))
+    rollback = bool(tool_input.get('rollback'))
 
-    if not tool_name or not tool_code:
+    if not tool_name or (not tool_code and not rollback):
         return {
             "status": "error",
             "message": "Input must include both 'tool_name' and 'tool_code'."
@@ -45,29 +141,63 @@ def run(tool_input):
             "message": f"'{tool_name}' is not a valid Python identifier. Please use letters, numbers, and underscores."
         }
 
-    tools_directory = os.path.dirname(__file__)
+    tools_directory = os.path.dirname(os.path.abspath(__file__))
     new_tool_path = os.path.join(tools_directory, f"{tool_name}.py")
 
-    if os.path.exists(new_tool_path):
+    if tool_name == 'tool_creator':
+        return {
+            "status": "error",
+            "message": "tool_creator cannot replace itself."
+        }
+
+    # tools/_*.py are shared helpers every tool imports, not tools (the server doesn't load them).
+    if tool_name.startswith('_'):
         return {
             "status": "error",
-            "message": f"A tool named '{tool_name}' already exists at {new_tool_path}."
+            "message": f"'{tool_name}' starts with an underscore; that name is reserved for shared helper modules."
         }
 
     try:
-        with open(new_tool_path, 'w', encoding='utf-8') as f:
-            # Write the code exactly as provided by the AI
-            f.write(tool_code.strip())
+        if rollback:
+            return _rollback(tools_directory, tool_name, new_tool_path, tool_input.get('version'))
+
+        exists = os.path.exists(new_tool_path)
+        if exists and not replace:
+            return {
+                "status": "error",
+                "message": f"A tool named '{tool_name}' already exists at {new_tool_path}. Set replace=true to install a new version."
+            }
+
+        # Write the code exactly as provided by the AI
+        source = tool_code.strip().encode('utf-8')
+        error = _smoke_load(tools_directory, tool_name, new_tool_path, source)
+        if error:
+            return {"status": "error", "message": error}
+
+        previous_version = None
+        if exists:
+            with open(new_tool_path, 'rb') as f:
+                previous = f.read()
+            previous_version = _tool_versions.source_version(previous)
+            # Tools that predate versioning (or were edited by hand) get archived too, so they can be rolled back to.
+            _tool_versions.archive(tools_directory, tool_name, previous)
+        entry = _tool_versions.archive(tools_directory, tool_name, source)
+        _tool_versions.atomic_write(new_tool_path, source)
 
         # Return the name of the created tool for the server to load.
+        if exists:
+            message = f"Successfully replaced tool '{tool_name}' with version {entry['version']}."
+        else:
+            message = f"Successfully created and dynamically loaded new tool '{tool_name}'."
         return {
             "status": "success",
-            "message": f"Successfully created and dynamically loaded new tool '{tool_name}'.",
-            "created_tool_name": tool_name
+            "message": message,
+            "created_tool_name": tool_name,
+            "version": entry["version"],
+            "previous_version": previous_version,
         }
     except Exception as e:
         return {
             "status": "error",
             "message": f"Failed to create tool file: {str(e)}"
         }
-